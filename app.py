@@ -102,6 +102,17 @@ app.config["RECEIPT_IMPORT_ASYNC_ENABLED"] = os.environ.get(
     "0" if os.name == "nt" else "1",
 )
 app.config["RECEIPT_TEMP_FILE_TTL_SECONDS"] = os.environ.get("RECEIPT_TEMP_FILE_TTL_SECONDS", "300")
+# Parsed receipt imports cached by content hash; 0 entries disables the cache.
+app.config["RECEIPT_CACHE_TTL_SECONDS"] = os.environ.get("RECEIPT_CACHE_TTL_SECONDS", "604800")
+app.config["RECEIPT_CACHE_MAX_ENTRIES"] = os.environ.get("RECEIPT_CACHE_MAX_ENTRIES", "500")
+# Each open import-events stream holds a web worker; the browser falls back to polling when it ends.
+app.config["RECEIPT_IMPORT_SSE_SECONDS"] = os.environ.get("RECEIPT_IMPORT_SSE_SECONDS", "60")
+# Per-recipient window in which pushes/emails are de-duplicated and merged into one digest (0 disables).
+app.config["NOTIFICATION_COALESCE_SECONDS"] = os.environ.get("NOTIFICATION_COALESCE_SECONDS", "20")
+# Monthly tenant_audit_log partitions older than this are detached by the maintenance job;
+# with an archive directory set they are exported there as gzipped CSV and dropped.
+app.config["AUDIT_LOG_RETENTION_MONTHS"] = os.environ.get("AUDIT_LOG_RETENTION_MONTHS", "12")
+app.config["AUDIT_LOG_ARCHIVE_DIR"] = os.environ.get("AUDIT_LOG_ARCHIVE_DIR", "")
 
 def get_db_url():
     # Read both possible env names
@@ -204,6 +215,99 @@ def bootstrap_admin(username, floor):
         click.echo(f"temporary password: {password}")
         click.echo("This password is shown only once. The account must change it on first login.")
 
+@app.cli.command("queue-health-sampler")
+@click.option("--interval", default=5, show_default=True, type=float, help="Seconds between samples.")
+@click.option("--metrics-interval", default=60, show_default=True, type=float, help="Seconds between metrics points.")
+def queue_health_sampler(interval, metrics_interval):
+    """Continuously publish RQ queue health snapshots to Redis.
+
+    Status pollers and the platform dashboards read these snapshots instead
+    of walking the RQ registries on every request. Each queue's metrics time
+    series (System Health charts) is appended every --metrics-interval.
+    Run with: flask --app app.py queue-health-sampler
+    """
+    from blueprints.queue_health import run_queue_health_sampler
+
+    with app.app_context():
+        click.echo(f"Sampling queue health every {interval}s, metrics every {metrics_interval}s.")
+        run_queue_health_sampler(interval=interval, metrics_interval=metrics_interval)
+
+@app.cli.command("run-workers")
+@click.option("--tasks", default=lambda: int(os.environ.get("RQ_TASK_WORKERS", "1")), show_default="RQ_TASK_WORKERS or 1", type=int, help="OCR / receipt import worker processes.")
+@click.option("--notifications", default=lambda: int(os.environ.get("RQ_NOTIFICATION_WORKERS", "1")), show_default="RQ_NOTIFICATION_WORKERS or 1", type=int, help="Push notification worker processes (reserved, never take OCR jobs).")
+@click.option("--emails", default=lambda: int(os.environ.get("RQ_EMAIL_WORKERS", "1")), show_default="RQ_EMAIL_WORKERS or 1", type=int, help="Email worker processes (reserved, never take OCR jobs).")
+@click.option("--task-max-jobs", default=lambda: int(os.environ.get("RQ_TASK_MAX_JOBS", "25")), show_default="RQ_TASK_MAX_JOBS or 25", type=int, help="Recycle an OCR worker after this many jobs (0 = never).")
+@click.option("--max-jobs", default=lambda: int(os.environ.get("RQ_WORKER_MAX_JOBS", "500")), show_default="RQ_WORKER_MAX_JOBS or 500", type=int, help="Recycle a notification/email worker after this many jobs (0 = never).")
+def run_workers(tasks, notifications, emails, task_max_jobs, max_jobs):
+    """Supervise per-queue RQ worker processes.
+
+    OCR jobs get their own pool so a long receipt import never delays pushes
+    or emails. Crashed workers are restarted and workers are recycled after
+    a number of jobs to cap memory growth.
+    Run with: flask --app app.py run-workers
+    """
+    from blueprints.worker_supervisor import WorkerSupervisor
+
+    if min(tasks, notifications, emails) < 0 or notifications + emails < 1:
+        raise click.BadParameter("Keep at least one notification or email worker; counts cannot be negative.")
+
+    supervisor = WorkerSupervisor(
+        redis_url,
+        pool_sizes={"tasks": tasks, "notifications": notifications, "emails": emails},
+        max_jobs={"tasks": task_max_jobs, "notifications": max_jobs, "emails": max_jobs},
+    )
+    click.echo(
+        f"Supervising {tasks} OCR, {notifications} notification and {emails} email worker(s). "
+        f"Recycling after {task_max_jobs or 'unlimited'} / {max_jobs or 'unlimited'} jobs."
+    )
+    supervisor.run()
+
+@app.cli.command("reconcile-dish-usage")
+def reconcile_dish_usage_command():
+    """Rebuild dish_usage_stats from menus, suggestions, votes and feedback.
+
+    The counters are kept current on every write; this repairs drift left
+    by bulk SQL or failed writes and fills the table after the migration.
+    Run with: flask --app app.py reconcile-dish-usage
+    """
+    from blueprints.dish_usage import reconcile_dish_usage
+
+    with app.app_context():
+        corrected = reconcile_dish_usage()
+        db.session.commit()
+    click.echo(f"Corrected {corrected} dish usage row(s).")
+
+
+@app.cli.command("maintenance")
+@click.option("--job", "jobs", multiple=True, help="Run only this job (repeatable). Default: all jobs.")
+@click.option("--list", "list_jobs", is_flag=True, help="List the available jobs and exit.")
+def maintenance(jobs, list_jobs):
+    """Run periodic housekeeping that used to run inside GET requests.
+
+    Auto-completes past tea tasks, removes duplicate print reports, sweeps
+    stale receipt uploads, prunes push subscriptions, freezes settled budget
+    periods, keeps the audit log partitioned and rolled up, refreshes the
+    platform dashboard metrics and rescans the dish catalog for
+    near-duplicates. Safe to re-run;
+    deploy/ajs-pantry-maintenance.timer runs it every 15 minutes.
+    Run with: flask --app app.py maintenance
+    """
+    from blueprints.maintenance import MAINTENANCE_JOBS, run_maintenance
+
+    if list_jobs:
+        for name, job in MAINTENANCE_JOBS.items():
+            click.echo(f"{name}: {job.__doc__}")
+        return
+
+    unknown = [name for name in jobs if name not in MAINTENANCE_JOBS]
+    if unknown:
+        raise click.BadParameter(f"Unknown job(s): {', '.join(unknown)}", param_hint="--job")
+
+    with app.app_context():
+        results = run_maintenance(list(jobs) or None)
+    for name, result in results.items():
+        click.echo(f"{name}: {result}")
+
 from blueprints.utils import (
     _get_active_floor,
     _get_current_user,
@@ -515,7 +619,8 @@ def send_email():
     from blueprints.utils import send_email_notification
 
     try:
-        send_email_notification(to_email, subject, html_content)
+        # Callers of the internal API expect their message delivered as sent.
+        send_email_notification(to_email, subject, html_content, coalesce=False)
     except Exception:
         logging.exception("Failed to dispatch internal email to %s", to_email)
         return jsonify({"error": "Failed to send email"}), 500
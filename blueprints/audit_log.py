@@ -0,0 +1,308 @@
+"""tenant_audit_log upkeep: monthly partitions, daily rollups and archival.
+
+On Postgres the audit table is range-partitioned by month on ``created_at``
+(migration d2f6b0c8e413). The maintenance job keeps partitions created ahead
+of time, so rows normally never land in the default partition; if the job
+was down long enough that they did, it moves them into the new month's
+partition. It detaches months past the retention window, optionally
+exporting them first.
+
+Charts and totals read ``tenant_audit_daily_count``. It holds one row per
+(tenant, action, UTC day) for completed days only. Whatever happened after
+the last rolled-up day is counted live; that is today's partition, plus any
+days the job missed.
+"""
+import csv
+import gzip
+import logging
+import os
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, select, text
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "tenant_audit_log_p"
+PARTITION_MONTHS_AHEAD = 2
+
+
+def _month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _is_partitioned():
+    from app import db
+
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return False
+    relkind = db.session.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass('tenant_audit_log')")
+    ).scalar()
+    return relkind == 'p'
+
+
+def _attached_partitions():
+    """``{partition_name: month_start}`` of the monthly partitions still attached."""
+    from app import db
+
+    names = db.session.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass('tenant_audit_log')"
+        )
+    ).scalars()
+    partitions = {}
+    for name in names:
+        suffix = name[len(PARTITION_PREFIX):] if name.startswith(PARTITION_PREFIX) else ''
+        if len(suffix) == 6 and suffix.isdigit():
+            partitions[name] = date(int(suffix[:4]), int(suffix[4:]), 1)
+    return partitions
+
+
+def _default_partition():
+    """Name of the attached DEFAULT partition, or None."""
+    from app import db
+
+    return db.session.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass('tenant_audit_log') "
+            "AND pg_get_expr(child.relpartbound, child.oid) = 'DEFAULT'"
+        )
+    ).scalar()
+
+
+def _create_partition_from_default(name, default_name, month):
+    """
+    Create ``name`` for ``month`` when the default partition already holds rows
+    in that range (Postgres refuses the plain CREATE ... PARTITION OF then):
+    detach the default, create the partition, move the rows, re-attach.
+    """
+    from app import db
+    from models import TenantAuditLog
+
+    bounds = {'start': month, 'end': _add_months(month, 1)}
+    columns = ', '.join(column.name for column in TenantAuditLog.__table__.columns)
+    in_range = "created_at >= :start AND created_at < :end"
+    db.session.execute(text(f"ALTER TABLE tenant_audit_log DETACH PARTITION {default_name}"))
+    db.session.execute(text(
+        f"CREATE TABLE {name} PARTITION OF tenant_audit_log "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{bounds['end'].isoformat()}')"
+    ))
+    moved = db.session.execute(
+        text(f"INSERT INTO {name} ({columns}) SELECT {columns} FROM {default_name} WHERE {in_range}"),
+        bounds,
+    ).rowcount
+    db.session.execute(text(f"DELETE FROM {default_name} WHERE {in_range}"), bounds)
+    db.session.execute(text(f"ALTER TABLE tenant_audit_log ATTACH PARTITION {default_name} DEFAULT"))
+    return moved
+
+
+def ensure_audit_log_partitions(months_ahead=PARTITION_MONTHS_AHEAD):
+    """Create the monthly partitions for this month and the next ``months_ahead``."""
+    from app import db
+
+    if not _is_partitioned():
+        return 0
+    existing = set(_attached_partitions().values())
+    default_name = _default_partition()
+    current = _month_start(datetime.utcnow().date())
+    created = 0
+    for offset in range(months_ahead + 1):
+        month = _add_months(current, offset)
+        if month in existing:
+            continue
+        name = f"{PARTITION_PREFIX}{month:%Y%m}"
+        stranded = default_name and db.session.execute(
+            text(f"SELECT 1 FROM {default_name} WHERE created_at >= :start AND created_at < :end LIMIT 1"),
+            {'start': month, 'end': _add_months(month, 1)},
+        ).first()
+        if stranded:
+            moved = _create_partition_from_default(name, default_name, month)
+            logger.warning("Moved %s audit log rows from %s into %s", moved, default_name, name)
+        else:
+            db.session.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF tenant_audit_log "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+            ))
+        db.session.commit()
+        created += 1
+    return created
+
+
+def rollup_audit_log():
+    """Roll completed days since the last rollup into tenant_audit_daily_count."""
+    from app import db
+    from models import TenantAuditDailyCount, TenantAuditLog
+
+    today = datetime.utcnow().date()
+    last_day = db.session.query(func.max(TenantAuditDailyCount.day)).scalar()
+    if last_day is not None:
+        start = last_day + timedelta(days=1)
+    else:
+        first_event = db.session.query(func.min(TenantAuditLog.created_at)).scalar()
+        if first_event is None:
+            return 0
+        start = first_event.date()
+    if start >= today:
+        return 0
+
+    day = func.date(TenantAuditLog.created_at)
+    grouped = (
+        select(TenantAuditLog.tenant_id, TenantAuditLog.action, day, func.count(TenantAuditLog.id))
+        .where(
+            TenantAuditLog.created_at >= datetime.combine(start, datetime.min.time()),
+            TenantAuditLog.created_at < datetime.combine(today, datetime.min.time()),
+        )
+        .group_by(TenantAuditLog.tenant_id, TenantAuditLog.action, day)
+    )
+    db.session.execute(delete(TenantAuditDailyCount).where(TenantAuditDailyCount.day >= start))
+    result = db.session.execute(
+        insert(TenantAuditDailyCount).from_select(
+            ['tenant_id', 'action', 'day', 'event_count'],
+            grouped,
+        )
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def _config_int(name, default):
+    try:
+        return int(current_app.config.get(name) or default)
+    except (TypeError, ValueError):
+        return default
+
+
+def _export_partition(name, archive_dir):
+    from app import db
+    from models import TenantAuditLog
+
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.csv.gz")
+    columns = [column.name for column in TenantAuditLog.__table__.columns]
+    rows = db.session.execute(
+        text(f"SELECT {', '.join(columns)} FROM {name} ORDER BY id").execution_options(yield_per=1000)
+    )
+    with gzip.open(path + ".tmp", "wt", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def archive_audit_log_partitions(retention_months=None, archive_dir=None):
+    """
+    Detach monthly partitions that ended before the retention window. With an
+    archive directory configured, each is exported as gzipped CSV and dropped.
+    Rollups are kept, so charts and totals still cover archived months.
+    """
+    from app import db
+
+    if not _is_partitioned():
+        return 0
+    retention_months = retention_months or _config_int("AUDIT_LOG_RETENTION_MONTHS", 12)
+    archive_dir = archive_dir if archive_dir is not None else current_app.config.get("AUDIT_LOG_ARCHIVE_DIR")
+    cutoff = _add_months(_month_start(datetime.utcnow().date()), -retention_months)
+
+    # Roll up first, so nothing leaves the table before it is counted.
+    rollup_audit_log()
+
+    archived = 0
+    for name, month in sorted(_attached_partitions().items(), key=lambda item: item[1]):
+        if _add_months(month, 1) > cutoff:
+            continue
+        if archive_dir:
+            path = _export_partition(name, archive_dir)
+            logger.info("Exported audit log partition %s to %s", name, path)
+        db.session.execute(text(f"ALTER TABLE tenant_audit_log DETACH PARTITION {name}"))
+        if archive_dir:
+            db.session.execute(text(f"DROP TABLE {name}"))
+        db.session.commit()
+        archived += 1
+    return archived
+
+
+def maintain_audit_log():
+    """
+    Create upcoming audit log partitions, roll up finished days and archive
+    old months. Each step runs on its own, so one failing doesn't skip the rest.
+    """
+    from app import db
+
+    results = {}
+    for key, step in (
+        ('partitions_created', ensure_audit_log_partitions),
+        ('rollup_rows', rollup_audit_log),
+        ('partitions_archived', archive_audit_log_partitions),
+    ):
+        try:
+            results[key] = step()
+        except Exception as exc:
+            db.session.rollback()
+            logger.exception("Audit log maintenance step %s failed", key)
+            results[key] = f"failed: {exc}"
+    return results
+
+
+def audit_log_stats(trend_days=30):
+    """
+    Totals for the platform audit page: all-time count, per-action counts,
+    daily counts for the last ``trend_days`` days and the known actions.
+    Rolled-up days come from the rollup table; the rest is counted live.
+    """
+    from app import db
+    from models import TenantAuditDailyCount, TenantAuditLog
+
+    last_day = db.session.query(func.max(TenantAuditDailyCount.day)).scalar()
+    live_criteria = []
+    if last_day is not None:
+        live_criteria.append(
+            TenantAuditLog.created_at >= datetime.combine(last_day + timedelta(days=1), datetime.min.time())
+        )
+
+    action_counts = {}
+    for action, count in (
+        db.session.query(TenantAuditDailyCount.action, func.sum(TenantAuditDailyCount.event_count))
+        .group_by(TenantAuditDailyCount.action)
+    ):
+        action_counts[action] = int(count or 0)
+    for action, count in (
+        db.session.query(TenantAuditLog.action, func.count(TenantAuditLog.id))
+        .filter(*live_criteria)
+        .group_by(TenantAuditLog.action)
+    ):
+        action_counts[action] = action_counts.get(action, 0) + count
+
+    trend_start = datetime.utcnow().date() - timedelta(days=trend_days - 1)
+    daily_counts = {}
+    for day, count in (
+        db.session.query(TenantAuditDailyCount.day, func.sum(TenantAuditDailyCount.event_count))
+        .filter(TenantAuditDailyCount.day >= trend_start)
+        .group_by(TenantAuditDailyCount.day)
+    ):
+        daily_counts[str(day)] = int(count or 0)
+    live_day = func.date(TenantAuditLog.created_at)
+    for day, count in (
+        db.session.query(live_day, func.count(TenantAuditLog.id))
+        .filter(TenantAuditLog.created_at >= datetime.combine(trend_start, datetime.min.time()), *live_criteria)
+        .group_by(live_day)
+    ):
+        daily_counts[str(day)] = daily_counts.get(str(day), 0) + count
+
+    return {
+        'total_logs': sum(action_counts.values()),
+        'action_counts': action_counts,
+        'daily_counts': daily_counts,
+        'actions': sorted(action_counts),
+    }
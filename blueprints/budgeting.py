@@ -1,11 +1,13 @@
+from bisect import bisect_left, bisect_right
 from datetime import date, timedelta
 
 from flask import g
-from sqlalchemy import func, or_, and_
+from sqlalchemy import func, or_, true
 from sqlalchemy.orm import joinedload
 
 from app import db
-from models import Bill, Budget, Expense, FacultyBudgetCycle
+from models import Bill, Budget, BudgetPeriodSnapshot, Expense, FacultyBudgetCycle
+from .bulk_writes import bulk_delete, bulk_insert
 from .utils import visible_budget_condition
 
 
@@ -20,82 +22,158 @@ def _tenant_scoped_query(query, tenant_id=None):
     return query
 
 
-def _sum_period_bills(floor, start_date, end_date=None, cycle_id=None, tenant_id=None, faculty_workflow_enabled=False, is_current=False):
-    if faculty_workflow_enabled:
-        submission_id = None
-        target_cycle_id = cycle_id
+def _resolve_tenant_id(tenant_id=None):
+    return tenant_id if tenant_id is not None else getattr(g, 'tenant_id', None)
 
-        if not target_cycle_id and is_current:
-            from models import FacultyBudgetCycle
-            active_cycle = _tenant_scoped_query(FacultyBudgetCycle.query, tenant_id).filter_by(status='active').first()
-            if active_cycle:
-                target_cycle_id = active_cycle.id
-
-        if target_cycle_id:
-            from models import FacultyReportSubmission
-            sub = _tenant_scoped_query(FacultyReportSubmission.query, tenant_id).filter_by(
-                cycle_id=target_cycle_id,
-                floor=floor
-            ).first()
-            if sub and sub.status in ['submitted', 'verified']:
-                submission_id = sub.id
-
-        if submission_id:
-            # Submitted to Faculty: count bills linked to submission
-            query = _tenant_scoped_query(db.session.query(func.sum(Bill.total_amount)), tenant_id).filter(
-                Bill.floor == floor,
-                Bill.report_submission_id == submission_id
-            )
-            return _coerce_float(query.scalar())
-        else:
-            # Active / unsubmitted cycle in Faculty Mode:
-            # Spent amount is strictly synced to the floor's latest compiled Print Report!
-            from models import ExpensePrintReport, ExpensePrintReportBill
-
-            print_report = None
-            if target_cycle_id:
-                print_report = _tenant_scoped_query(ExpensePrintReport.query, tenant_id).filter_by(
-                    cycle_id=target_cycle_id,
-                    floor=floor
-                ).order_by(ExpensePrintReport.created_at.desc()).first()
-
-            if not print_report:
-                print_report = _tenant_scoped_query(ExpensePrintReport.query, tenant_id).filter_by(
-                    floor=floor
-                ).order_by(ExpensePrintReport.created_at.desc()).first()
-
-            if print_report:
-                linked_sum = _tenant_scoped_query(
-                    db.session.query(func.sum(Bill.total_amount))
-                    .join(ExpensePrintReportBill, ExpensePrintReportBill.bill_id == Bill.id),
-                    tenant_id
-                ).filter(ExpensePrintReportBill.print_report_id == print_report.id).scalar()
-
-                if linked_sum is not None:
-                    return _coerce_float(linked_sum)
-                return float(print_report.total_spent or 0.0)
-
-            return 0.0
-    else:
-        # Non-faculty tenant: count unlinked bills in this period's date range
-        query = _tenant_scoped_query(db.session.query(func.sum(Bill.total_amount)), tenant_id).filter(
-            Bill.floor == floor,
-            Bill.report_submission_id.is_(None),
-            Bill.bill_date >= start_date
-        )
-        if end_date is not None:
-            query = query.filter(Bill.bill_date <= end_date)
-        return _coerce_float(query.scalar())
 
-
-def _sum_period_legacy_expenses(floor, start_date, end_date=None, tenant_id=None):
-    query = _tenant_scoped_query(db.session.query(func.sum(Expense.amount)), tenant_id).filter(
-        Expense.floor == floor,
-        Expense.date >= start_date,
+def _running_daily_totals(day_column, amount_column, criteria, tenant_id=None):
+    """
+    Per-day totals with a running sum (window function) over them, so the
+    total of any date range is two lookups instead of a query.
+    """
+    daily = (
+        _tenant_scoped_query(
+            db.session.query(day_column.label('day'), func.sum(amount_column).label('amount')),
+            tenant_id,
+        )
+        .filter(*criteria)
+        .group_by(day_column)
+        .subquery()
     )
-    if end_date is not None:
-        query = query.filter(Expense.date <= end_date)
-    return _coerce_float(query.scalar())
+    rows = (
+        db.session.query(daily.c.day, func.sum(daily.c.amount).over(order_by=daily.c.day))
+        .order_by(daily.c.day)
+        .all()
+    )
+    return [row[0] for row in rows], [row[1] for row in rows]
+
+
+def _range_total(running_totals, start_date, end_date=None):
+    days, totals = running_totals
+    lo = bisect_left(days, start_date)
+    hi = len(days) if end_date is None else bisect_right(days, end_date)
+    if hi <= lo:
+        return 0.0
+    return _coerce_float(totals[hi - 1] - (totals[lo - 1] if lo else 0))
+
+
+class _FloorSpending:
+    """
+    Everything the ledger sums for one floor, fetched once: running daily
+    bill and legacy expense totals, the floor's Faculty submissions and
+    print reports, and the bill sums linked to them.
+    """
+
+    def __init__(self, floor, periods, tenant_id=None, faculty_workflow_enabled=False):
+        from models import ExpensePrintReport, ExpensePrintReportBill, FacultyReportSubmission
+
+        self.faculty_workflow_enabled = faculty_workflow_enabled
+        first_start = min((period['start_date'] for period in periods), default=None)
+        self.expenses = ([], [])
+        self.bills = ([], [])
+        if first_start is None:
+            return
+
+        self.expenses = _running_daily_totals(
+            Expense.date,
+            Expense.amount,
+            [Expense.floor == floor, Expense.date >= first_start],
+            tenant_id,
+        )
+        if not faculty_workflow_enabled:
+            self.bills = _running_daily_totals(
+                Bill.bill_date,
+                Bill.total_amount,
+                [Bill.floor == floor, Bill.report_submission_id.is_(None), Bill.bill_date >= first_start],
+                tenant_id,
+            )
+            return
+
+        self.submissions = {
+            row.cycle_id: row
+            for row in _tenant_scoped_query(
+                db.session.query(FacultyReportSubmission.id, FacultyReportSubmission.cycle_id, FacultyReportSubmission.status),
+                tenant_id,
+            ).filter(FacultyReportSubmission.floor == floor)
+        }
+        submitted_ids = [row.id for row in self.submissions.values() if row.status in ['submitted', 'verified']]
+        self.submission_sums = {}
+        if submitted_ids:
+            self.submission_sums = dict(
+                _tenant_scoped_query(db.session.query(Bill.report_submission_id, func.sum(Bill.total_amount)), tenant_id)
+                .filter(Bill.floor == floor, Bill.report_submission_id.in_(submitted_ids))
+                .group_by(Bill.report_submission_id)
+                .all()
+            )
+
+        self.latest_report_by_cycle = {}
+        self.latest_report = None
+        reports = (
+            _tenant_scoped_query(
+                db.session.query(ExpensePrintReport.id, ExpensePrintReport.cycle_id, ExpensePrintReport.total_spent),
+                tenant_id,
+            )
+            .filter(ExpensePrintReport.floor == floor)
+            .order_by(ExpensePrintReport.created_at.desc(), ExpensePrintReport.id.desc())
+            .all()
+        )
+        for report in reports:
+            self.latest_report = self.latest_report or report
+            self.latest_report_by_cycle.setdefault(report.cycle_id, report)
+
+        report_ids = {report.id for report in self.latest_report_by_cycle.values()}
+        self.linked_sums = {}
+        if report_ids:
+            linked_query = (
+                db.session.query(ExpensePrintReportBill.print_report_id, func.sum(Bill.total_amount))
+                .select_from(Bill)
+                .join(ExpensePrintReportBill, ExpensePrintReportBill.bill_id == Bill.id)
+                .filter(ExpensePrintReportBill.print_report_id.in_(report_ids))
+            )
+            resolved_tenant_id = _resolve_tenant_id(tenant_id)
+            if resolved_tenant_id is not None:
+                linked_query = linked_query.filter(ExpensePrintReportBill.tenant_id == resolved_tenant_id)
+            self.linked_sums = dict(linked_query.group_by(ExpensePrintReportBill.print_report_id).all())
+
+    def bills_spent(self, start_date, end_date=None, cycle_id=None):
+        if not self.faculty_workflow_enabled:
+            # Non-faculty tenant: count unlinked bills in this period's date range
+            return _range_total(self.bills, start_date, end_date)
+
+        submission = self.submissions.get(cycle_id) if cycle_id else None
+        if submission and submission.status in ['submitted', 'verified']:
+            # Submitted to Faculty: count bills linked to submission
+            return _coerce_float(self.submission_sums.get(submission.id))
+
+        # Active / unsubmitted cycle in Faculty Mode:
+        # Spent amount is strictly synced to the floor's latest compiled Print Report!
+        print_report = self.latest_report_by_cycle.get(cycle_id) if cycle_id else None
+        print_report = print_report or self.latest_report
+        if print_report:
+            linked_sum = self.linked_sums.get(print_report.id)
+            if linked_sum is not None:
+                return _coerce_float(linked_sum)
+            return float(print_report.total_spent or 0.0)
+        return 0.0
+
+    def legacy_expenses_spent(self, start_date, end_date=None):
+        return _range_total(self.expenses, start_date, end_date)
+
+    def is_settled(self, period, today):
+        """Whether a period's spent amount can no longer change by itself."""
+        if period['is_synthetic']:
+            return False
+        if not self.faculty_workflow_enabled:
+            return period['effective_end_date'] is not None and period['effective_end_date'] < today
+        # Faculty floors: only closed cycles whose spend is pinned to their own
+        # submission or print report. Other periods follow the floor's latest
+        # print report, which keeps moving.
+        if not period['cycle_id'] or period['status'] != 'closed':
+            return False
+        submission = self.submissions.get(period['cycle_id'])
+        if submission and submission.status in ['submitted', 'verified']:
+            return True
+        return period['cycle_id'] in self.latest_report_by_cycle
 
 
 def _make_period_from_budget(budget):
@@ -137,7 +215,34 @@ def _make_synthetic_active_cycle_period(active_cycle):
     }
 
 
-def build_floor_budget_ledger(floor, tenant_id=None, faculty_workflow_enabled=True):
+def _same_amount(stored, value):
+    return abs(float(stored or 0) - value) < 0.005
+
+
+def _load_snapshots(floor, tenant_id, faculty_workflow_enabled):
+    rows = _tenant_scoped_query(BudgetPeriodSnapshot.query, tenant_id).filter(
+        BudgetPeriodSnapshot.floor == floor,
+        BudgetPeriodSnapshot.faculty_workflow_enabled.is_(bool(faculty_workflow_enabled)),
+    )
+    return {(row.source_type, row.source_id): row for row in rows}
+
+
+def _snapshot_matches(snapshot, period, opening_balance):
+    # Budget edits change these, so an edited period falls back to live.
+    return (
+        snapshot is not None
+        and snapshot.start_date == period['start_date']
+        and snapshot.effective_end_date == period['effective_end_date']
+        and _same_amount(snapshot.allocated_amount, period['allocated_amount'])
+        and _same_amount(snapshot.opening_balance, opening_balance)
+    )
+
+
+def _build_ledger(floor, tenant_id=None, faculty_workflow_enabled=True, use_snapshots=True):
+    """
+    Returns the ledger plus the index range ``(first_live, first_unsettled)``
+    of periods that were computed live and may now be frozen.
+    """
     budgets = (
         _tenant_scoped_query(Budget.query.options(joinedload(Budget.cycle)), tenant_id)
         .filter(Budget.floor == floor, visible_budget_condition(True))
@@ -165,7 +270,7 @@ def build_floor_budget_ledger(floor, tenant_id=None, faculty_workflow_enabled=Tr
 
     periods.sort(key=lambda row: (row['start_date'], row['created_at'], row['source_type'], row['source_id'] or 0))
 
-    running_balance = 0.0
+    current_flags = []
     for idx, period in enumerate(periods):
         next_start = periods[idx + 1]['start_date'] if idx + 1 < len(periods) else None
         if faculty_workflow_enabled:
@@ -181,6 +286,7 @@ def build_floor_budget_ledger(floor, tenant_id=None, faculty_workflow_enabled=Tr
                 effective_end = next_start - timedelta(days=1)
             if effective_end and effective_end < period['start_date']:
                 effective_end = period['start_date']
+        period['effective_end_date'] = effective_end
 
         is_current_period = False
         if faculty_workflow_enabled:
@@ -188,24 +294,49 @@ def build_floor_budget_ledger(floor, tenant_id=None, faculty_workflow_enabled=Tr
                 is_current_period = (period['cycle_id'] == active_cycle.id)
             else:
                 is_current_period = (idx == len(periods) - 1)
+        current_flags.append(is_current_period)
 
-        spent_amount = _sum_period_bills(
-            floor=floor,
-            start_date=period['start_date'],
-            end_date=effective_end,
-            cycle_id=period['cycle_id'],
-            tenant_id=tenant_id,
-            faculty_workflow_enabled=faculty_workflow_enabled,
-            is_current=is_current_period
-        )
+    # Settled periods frozen earlier are taken as-is, oldest first, for as
+    # long as each one still lines up with the ledger around it.
+    running_balance = 0.0
+    first_live = 0
+    snapshots = _load_snapshots(floor, tenant_id, faculty_workflow_enabled) if use_snapshots and periods else {}
+    for period in periods:
+        snapshot = snapshots.get((period['source_type'], period['source_id']))
+        if period['is_synthetic'] or not _snapshot_matches(snapshot, period, running_balance):
+            break
+        period['opening_balance'] = float(snapshot.opening_balance)
+        period['available_budget'] = period['opening_balance'] + period['allocated_amount']
+        period['spent_amount'] = float(snapshot.spent_amount)
+        period['closing_balance'] = float(snapshot.closing_balance)
+        period['is_current'] = False
+        running_balance = period['closing_balance']
+        first_live += 1
+
+    spending = _FloorSpending(
+        floor,
+        periods[first_live:],
+        tenant_id=tenant_id,
+        faculty_workflow_enabled=faculty_workflow_enabled,
+    )
+
+    today = date.today()
+    first_unsettled = None
+    for idx in range(first_live, len(periods)):
+        period = periods[idx]
+        effective_end = period['effective_end_date']
+        is_current_period = current_flags[idx]
+
+        # A current period always belongs to the active cycle (or there is
+        # none), so the period's own cycle_id is the one to look up.
+        spent_amount = spending.bills_spent(period['start_date'], effective_end, cycle_id=period['cycle_id'])
         if not (faculty_workflow_enabled and (period['cycle_id'] or is_current_period)):
-            spent_amount += _sum_period_legacy_expenses(floor, period['start_date'], effective_end, tenant_id=tenant_id)
+            spent_amount += spending.legacy_expenses_spent(period['start_date'], effective_end)
 
         opening_balance = running_balance
         available_budget = opening_balance + period['allocated_amount']
         closing_balance = available_budget - spent_amount
 
-        period['effective_end_date'] = effective_end
         period['opening_balance'] = opening_balance
         period['available_budget'] = available_budget
         period['spent_amount'] = spent_amount
@@ -213,6 +344,11 @@ def build_floor_budget_ledger(floor, tenant_id=None, faculty_workflow_enabled=Tr
         period['is_current'] = False
 
         running_balance = closing_balance
+        if first_unsettled is None and not spending.is_settled(period, today):
+            first_unsettled = idx
+
+    if first_unsettled is None:
+        first_unsettled = len(periods)
 
     current_period = None
     if active_cycle:
@@ -246,4 +382,108 @@ def build_floor_budget_ledger(floor, tenant_id=None, faculty_workflow_enabled=Tr
         'carryforward_balance': carryforward_balance,
         'has_period_history': bool(periods),
         'today': date.today(),
-    }
+    }, (first_live, first_unsettled)
+
+
+def build_floor_budget_ledger(floor, tenant_id=None, faculty_workflow_enabled=True, use_snapshots=True):
+    """
+    Running budget ledger for a floor. Settled periods come from
+    ``budget_period_snapshot`` when their snapshot still lines up; only the
+    rest is summed live.
+    """
+    ledger, _ = _build_ledger(floor, tenant_id, faculty_workflow_enabled, use_snapshots)
+    return ledger
+
+
+def freeze_settled_budget_periods(floor, tenant_id=None, faculty_workflow_enabled=True):
+    """
+    Snapshot every settled period not frozen yet, up to the first period
+    that can still change. Returns the number of snapshots written.
+    """
+    ledger, (first_live, first_unsettled) = _build_ledger(floor, tenant_id, faculty_workflow_enabled)
+    chronological = list(reversed(ledger['periods']))
+    settled = [period for period in chronological[first_live:first_unsettled] if not period['is_synthetic']]
+    if not settled:
+        return 0
+
+    for source_type in {period['source_type'] for period in settled}:
+        bulk_delete(
+            BudgetPeriodSnapshot,
+            BudgetPeriodSnapshot.floor == floor,
+            BudgetPeriodSnapshot.source_type == source_type,
+            BudgetPeriodSnapshot.source_id.in_([p['source_id'] for p in settled if p['source_type'] == source_type]),
+            tenant_id=tenant_id,
+        )
+    bulk_insert(BudgetPeriodSnapshot, [
+        {
+            'floor': floor,
+            'source_type': period['source_type'],
+            'source_id': period['source_id'],
+            'faculty_workflow_enabled': bool(faculty_workflow_enabled),
+            'start_date': period['start_date'],
+            'effective_end_date': period['effective_end_date'],
+            'allocated_amount': round(period['allocated_amount'], 2),
+            'opening_balance': round(period['opening_balance'], 2),
+            'spent_amount': round(period['spent_amount'], 2),
+            'closing_balance': round(period['closing_balance'], 2),
+        }
+        for period in settled
+    ], tenant_id=tenant_id)
+    return len(settled)
+
+
+def invalidate_budget_snapshots(floor=None, since=None, tenant_id=None):
+    """
+    Drop snapshots a back-dated edit may have changed: periods of ``floor``
+    (every floor when None) running on or after ``since`` (all when None).
+    Later snapshots would no longer line up anyway; removing them too keeps
+    the table honest.
+    """
+    tenant_id = _resolve_tenant_id(tenant_id)
+    if tenant_id is None:
+        return 0
+    criteria = [true()]
+    if floor is not None:
+        criteria.append(BudgetPeriodSnapshot.floor == floor)
+    if since is not None:
+        criteria.append(or_(
+            BudgetPeriodSnapshot.effective_end_date.is_(None),
+            BudgetPeriodSnapshot.effective_end_date >= since,
+            BudgetPeriodSnapshot.start_date >= since,
+        ))
+    return bulk_delete(BudgetPeriodSnapshot, *criteria, tenant_id=tenant_id)
+
+
+def invalidate_budget_snapshots_for_bills(bills, tenant_id=None):
+    """
+    Invalidate from the earliest date each floor's ``bills`` can affect: the
+    bill date, or the start of the Faculty cycle a bill is submitted under.
+    Accepts Bill objects or rows with floor, bill_date and report_submission_id.
+    """
+    from models import FacultyReportSubmission
+
+    since_by_floor = {}
+    submission_ids = set()
+    for bill in bills:
+        if bill.bill_date is not None:
+            current = since_by_floor.get(bill.floor)
+            since_by_floor[bill.floor] = bill.bill_date if current is None else min(current, bill.bill_date)
+        if bill.report_submission_id:
+            submission_ids.add(bill.report_submission_id)
+
+    if submission_ids:
+        cycle_starts = (
+            _tenant_scoped_query(
+                db.session.query(FacultyReportSubmission.floor, func.min(FacultyBudgetCycle.start_date))
+                .join(FacultyBudgetCycle, FacultyBudgetCycle.id == FacultyReportSubmission.cycle_id),
+                tenant_id,
+            )
+            .filter(FacultyReportSubmission.id.in_(submission_ids))
+            .group_by(FacultyReportSubmission.floor)
+            .all()
+        )
+        for floor, start_date in cycle_starts:
+            current = since_by_floor.get(floor)
+            since_by_floor[floor] = start_date if current is None else min(current, start_date)
+
+    return sum(invalidate_budget_snapshots(floor, since, tenant_id=tenant_id) for floor, since in since_by_floor.items())
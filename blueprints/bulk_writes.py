@@ -0,0 +1,160 @@
+"""Set-based bulk writes: a fixed number of statements however many rows.
+
+The ``do_orm_execute`` tenant listener only scopes SELECTs, so every helper
+here adds ``tenant_id = g.tenant_id`` to its statement itself (and stamps it
+on inserted rows) for models using ``TenantMixin``. Writes go through the
+current session, so they commit or roll back with the rest of the request.
+"""
+from flask import g
+from sqlalchemy import and_, cast, column, delete, insert, literal, select, union_all, update, values
+
+# Postgres caps a statement at 65535 bind parameters; SQLite at 32766.
+MAX_BIND_PARAMS = 30000
+# SQLite has no VALUES column aliases; rows become a UNION ALL of SELECTs,
+# which it caps at 500 terms.
+SQLITE_MAX_COMPOUND_SELECT = 500
+
+
+def _session():
+    from app import db
+    return db.session
+
+
+def _tenant_id(tenant_id=None):
+    if tenant_id is not None:
+        return tenant_id
+    return getattr(g, 'tenant_id', None)
+
+
+def _is_tenant_model(model):
+    return 'tenant_id' in model.__table__.c
+
+
+def _tenant_criteria(model, tenant_id):
+    if _is_tenant_model(model) and tenant_id is not None:
+        return [model.tenant_id == tenant_id]
+    return []
+
+
+def _chunks(rows, width, limit=None):
+    size = max(1, MAX_BIND_PARAMS // max(1, width))
+    if limit:
+        size = min(size, limit)
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _rows_with_shared_keys(rows):
+    keys = list(rows[0])
+    for row in rows[1:]:
+        if set(row) != set(keys):
+            raise ValueError("Bulk rows must all set the same columns.")
+    return keys
+
+
+def _rows_source(rows, keys, table_columns, postgres):
+    if postgres:
+        return values(
+            *[column(name, table_columns[name].type) for name in keys],
+            name='bulk_rows',
+        ).data([tuple(row[name] for name in keys) for row in rows])
+    selects = [
+        select(*[literal(row[name], table_columns[name].type).label(name) for name in keys])
+        for row in rows
+    ]
+    return (union_all(*selects) if len(selects) > 1 else selects[0]).subquery('bulk_rows')
+
+
+def bulk_insert(model, rows, returning=None, tenant_id=None):
+    """
+    Insert ``rows`` (dicts of column values) with multi-row
+    ``INSERT ... VALUES (...), (...) RETURNING``.
+
+    ``tenant_id`` is filled in from ``g`` for tenant models; a row naming a
+    different tenant is rejected. Returns the ``returning`` columns (default:
+    primary key) as a list of rows in insert order.
+    """
+    if not rows:
+        return []
+    tenant_id = _tenant_id(tenant_id)
+    if _is_tenant_model(model):
+        stamped = []
+        for row in rows:
+            if row.get('tenant_id') not in (None, tenant_id):
+                raise ValueError(f"Refusing to insert {model.__name__} into another tenant.")
+            stamped.append({**row, 'tenant_id': tenant_id})
+        rows = stamped
+
+    keys = _rows_with_shared_keys(rows)
+    returning = returning or list(model.__table__.primary_key.columns)
+    session = _session()
+    results = []
+    for chunk in _chunks(rows, len(keys)):
+        stmt = insert(model).values(chunk).returning(*returning)
+        results.extend(session.execute(stmt).all())
+    return results
+
+
+def bulk_update(model, rows, key='id', where=(), returning=None, tenant_id=None):
+    """
+    Apply per-row values with one ``UPDATE ... FROM (VALUES ...)`` (a
+    ``UNION ALL`` subquery outside Postgres).
+
+    ``rows`` are dicts holding ``key`` plus the columns to set; all rows must
+    set the same columns. ``where`` adds extra criteria (e.g. a floor check);
+    rows failing it, or belonging to another tenant, are left untouched.
+    Returns the ``returning`` columns (default: ``key``) of updated rows.
+    """
+    if not rows:
+        return []
+    keys = _rows_with_shared_keys(rows)
+    if key not in keys:
+        raise ValueError(f"Bulk update rows must include the key column {key!r}.")
+    set_columns = [name for name in keys if name != key]
+    table_columns = model.__table__.c
+    key_column = getattr(model, key)
+    returning = returning or [key_column]
+    criteria = _tenant_criteria(model, _tenant_id(tenant_id)) + list(where)
+    session = _session()
+
+    postgres = session.get_bind().dialect.name == 'postgresql'
+
+    def typed(data, name):
+        # Casts keep VALUES columns (NULLs, string ids) from being typed as
+        # text. SQLite's literals are already typed, and its CAST to DATETIME
+        # would turn timestamps into numbers.
+        return cast(data.c[name], table_columns[name].type) if postgres else data.c[name]
+
+    results = []
+    for chunk in _chunks(rows, len(keys), limit=None if postgres else SQLITE_MAX_COMPOUND_SELECT):
+        data = _rows_source(chunk, keys, table_columns, postgres)
+        stmt = (
+            update(model)
+            .where(key_column == typed(data, key), *criteria)
+            .values({name: typed(data, name) for name in set_columns})
+            .returning(*returning)
+            .execution_options(synchronize_session=False)
+        )
+        results.extend(session.execute(stmt).all())
+    return results
+
+
+def bulk_set(model, values_, *where, tenant_id=None):
+    """Set the same ``values_`` on every matching row; returns the row count."""
+    criteria = _tenant_criteria(model, _tenant_id(tenant_id)) + list(where)
+    stmt = update(model).where(and_(*criteria)).values(values_).execution_options(synchronize_session=False)
+    return _session().execute(stmt).rowcount
+
+
+def bulk_delete(model, *where, returning=None, tenant_id=None):
+    """
+    Delete every matching row with one ``DELETE``. Returns the ``returning``
+    columns of deleted rows, or the row count when ``returning`` is omitted.
+    """
+    if not where:
+        raise ValueError("bulk_delete needs at least one criterion.")
+    criteria = _tenant_criteria(model, _tenant_id(tenant_id)) + list(where)
+    stmt = delete(model).where(and_(*criteria)).execution_options(synchronize_session=False)
+    if returning:
+        return _session().execute(stmt.returning(*returning)).all()
+    return _session().execute(stmt).rowcount
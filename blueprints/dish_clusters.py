@@ -0,0 +1,267 @@
+"""Near-duplicate detection for the global dish catalog.
+
+Matching on ``normalized_name`` only catches case and spacing differences;
+"Chicken Biryani", "chicken biriyani" and "Biryani - Chicken" stay apart.
+The maintenance job (``flask maintenance --job dish-duplicates``) compares
+active dish names pairwise, but only within blocks of names that share a
+blocking key: a token prefix, a token's consonant skeleton, or the whole
+name with spaces removed. Pairs scoring at least ``SIMILARITY_THRESHOLD``
+are linked, and each connected group is stored as a ``DishDuplicateCluster``
+with its members' reference counts (read from ``dish_usage_stats``). The catalog admin reviews the stored
+queue and sends a cluster to the merge preview.
+"""
+import hashlib
+import re
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import delete, select
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+DIGITS_RE = re.compile(r'[0-9]+')
+STOPWORDS = frozenset({'and', 'with', 'the', 'of', 'n'})
+SIMILARITY_THRESHOLD = 0.8
+# Tokens shorter than this must match exactly ("egg" is not "veg").
+MIN_FUZZY_TOKEN_LENGTH = 4
+# Keys shared by more names than this ("chi" for every chicken dish) say
+# little about duplication; such names still meet through their other keys.
+MAX_BLOCK_SIZE = 200
+REFERENCE_COUNT_BATCH = 500
+
+
+def dish_tokens(normalized_name):
+    tokens = TOKEN_RE.findall(normalized_name or '')
+    return [token for token in tokens if token not in STOPWORDS] or tokens
+
+
+def _skeleton(token):
+    # First letter plus the remaining consonants, repeats collapsed:
+    # "biryani" and "biriyani" both give "brn", "pulao" and "pulav" "plv".
+    skeleton = token[0] + re.sub('[aeiouy]', '', token[1:])
+    return re.sub(r'(.)\1+', r'\1', skeleton)
+
+
+def blocking_keys(tokens):
+    keys = {'n:' + ''.join(sorted(tokens))}
+    for token in tokens:
+        if len(token) < 2:
+            continue
+        keys.add('p:' + token[:3])
+        keys.add('s:' + _skeleton(token))
+    return keys
+
+
+def _edit_distance(a, b, limit):
+    """Levenshtein distance, or ``limit + 1`` once it is known to exceed ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    # Only cells within ``limit`` of the diagonal can stay under the limit.
+    over = limit + 1
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        low, high = max(1, i - limit), min(len(b), i + limit)
+        current = [over] * (len(b) + 1)
+        current[0] = i if i <= limit else over
+        for j in range(low, high + 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (a[i - 1] != b[j - 1]),
+            )
+        if min(current[low - 1:high + 1]) > limit:
+            return over
+        previous = current
+    return min(previous[-1], over)
+
+
+def _edit_ratio(a, b):
+    longest = max(len(a), len(b))
+    if not longest:
+        return 1.0
+    limit = int(longest * (1 - SIMILARITY_THRESHOLD))
+    distance = _edit_distance(a, b, limit)
+    return 0.0 if distance > limit else 1 - distance / longest
+
+
+def name_similarity(tokens_a, tokens_b):
+    """
+    Score two token lists between 0 and 1. It is the better of two scores.
+    The first is a token-set overlap, where tokens of
+    ``MIN_FUZZY_TOKEN_LENGTH`` or more may also match at a close edit
+    distance. The second is an edit ratio of the sorted tokens joined
+    without spaces, which catches "paneertikka" against "paneer tikka".
+    Numbers must agree exactly: "chicken 65" and "chicken 66" score 0.
+    """
+    set_a, set_b = set(tokens_a), set(tokens_b)
+    if not set_a or not set_b:
+        return 0.0
+    if set(DIGITS_RE.findall(' '.join(set_a))) != set(DIGITS_RE.findall(' '.join(set_b))):
+        return 0.0
+    matched = len(set_a & set_b)
+    unmatched_b = set_b - set_a
+    for token in sorted(set_a - set_b):
+        if len(token) < MIN_FUZZY_TOKEN_LENGTH:
+            continue
+        for other in sorted(unmatched_b):
+            if len(other) >= MIN_FUZZY_TOKEN_LENGTH and _edit_ratio(token, other) >= SIMILARITY_THRESHOLD:
+                unmatched_b.discard(other)
+                matched += 1
+                break
+    token_score = matched / (len(set_a) + len(set_b) - matched)
+    if token_score >= 1.0:
+        return 1.0
+    compact_score = _edit_ratio(''.join(sorted(set_a)), ''.join(sorted(set_b)))
+    return max(token_score, compact_score)
+
+
+def find_duplicate_clusters(names):
+    """
+    Group ``{dish_id: normalized_name}`` into near-duplicate clusters.
+    Returns ``[(sorted member ids, similarity)]``, where similarity is the
+    weakest pair score that linked the cluster.
+    """
+    tokens = {dish_id: dish_tokens(name) for dish_id, name in names.items()}
+    blocks = defaultdict(list)
+    for dish_id, dish_token_list in tokens.items():
+        if not dish_token_list:
+            continue
+        for key in blocking_keys(dish_token_list):
+            blocks[key].append(dish_id)
+
+    parent = {}
+    weakest = {}
+
+    def find(dish_id):
+        parent.setdefault(dish_id, dish_id)
+        while parent[dish_id] != dish_id:
+            parent[dish_id] = parent[parent[dish_id]]
+            dish_id = parent[dish_id]
+        return dish_id
+
+    compared = set()
+    for key, members in blocks.items():
+        if len(members) < 2 or (len(members) > MAX_BLOCK_SIZE and not key.startswith('n:')):
+            continue
+        members.sort()
+        for index, left in enumerate(members):
+            for right in members[index + 1:]:
+                if (left, right) in compared:
+                    continue
+                compared.add((left, right))
+                score = name_similarity(tokens[left], tokens[right])
+                if score < SIMILARITY_THRESHOLD:
+                    continue
+                root_left, root_right = find(left), find(right)
+                link = min(score, weakest.get(root_left, 1.0), weakest.get(root_right, 1.0))
+                if root_left != root_right:
+                    parent[root_right] = root_left
+                weakest[root_left] = link
+
+    groups = defaultdict(list)
+    for dish_id in parent:
+        groups[find(dish_id)].append(dish_id)
+    return [
+        (sorted(members), round(weakest.get(root, 1.0), 3))
+        for root, members in groups.items()
+        if len(members) > 1
+    ]
+
+
+def member_key(dish_ids):
+    return hashlib.sha1(','.join(str(dish_id) for dish_id in sorted(dish_ids)).encode()).hexdigest()
+
+
+def _batched_reference_counts(dish_ids):
+    from .dish_usage import dish_usage_counts
+
+    counts = {}
+    for start in range(0, len(dish_ids), REFERENCE_COUNT_BATCH):
+        counts.update(dish_usage_counts(dish_ids[start:start + REFERENCE_COUNT_BATCH]))
+    return counts
+
+
+def _delete_open_clusters(cluster_id_select):
+    from app import db
+    from models import DishDuplicateCluster, DishDuplicateClusterMember
+
+    cluster_ids = list(set(db.session.execute(cluster_id_select).scalars()))
+    if not cluster_ids:
+        return
+    db.session.execute(
+        delete(DishDuplicateClusterMember).where(DishDuplicateClusterMember.cluster_id.in_(cluster_ids))
+    )
+    db.session.execute(
+        delete(DishDuplicateCluster).where(DishDuplicateCluster.id.in_(cluster_ids))
+    )
+
+
+def refresh_dish_clusters():
+    """Re-cluster active dishes and replace the open review queue."""
+    from app import db
+    from models import Dish, DishDuplicateCluster, DishDuplicateClusterMember, normalize_dish_name
+
+    names = {
+        dish_id: normalized_name or normalize_dish_name(name)
+        for dish_id, name, normalized_name in (
+            db.session.query(Dish.id, Dish.name, Dish.normalized_name)
+            .filter(Dish.is_archived == False)
+            .all()
+        )
+    }
+    dismissed = {
+        key for key, in db.session.query(DishDuplicateCluster.member_key).filter_by(status='dismissed')
+    }
+    clusters = [
+        (member_ids, similarity)
+        for member_ids, similarity in find_duplicate_clusters(names)
+        if member_key(member_ids) not in dismissed
+    ]
+    counts = _batched_reference_counts(sorted({dish_id for member_ids, _ in clusters for dish_id in member_ids}))
+
+    _delete_open_clusters(select(DishDuplicateCluster.id).where(DishDuplicateCluster.status == 'open'))
+    for member_ids, similarity in clusters:
+        members = [
+            DishDuplicateClusterMember(
+                dish_id=dish_id,
+                main_menus=counts[dish_id]['main_menus'],
+                side_menus=counts[dish_id]['side_menus'],
+                suggestions=counts[dish_id]['suggestions'],
+            )
+            for dish_id in member_ids
+        ]
+        db.session.add(DishDuplicateCluster(
+            member_key=member_key(member_ids),
+            status='open',
+            similarity=similarity,
+            dish_count=len(member_ids),
+            total_references=sum(m.main_menus + m.side_menus + m.suggestions for m in members),
+            members=members,
+        ))
+    db.session.commit()
+    return {'dishes': len(names), 'clusters': len(clusters)}
+
+
+def discard_clusters_for_dishes(dish_ids):
+    """Drop open clusters that include any of ``dish_ids`` (e.g. after a merge)."""
+    from models import DishDuplicateCluster, DishDuplicateClusterMember
+
+    _delete_open_clusters(
+        select(DishDuplicateClusterMember.cluster_id)
+        .join(DishDuplicateCluster, DishDuplicateCluster.id == DishDuplicateClusterMember.cluster_id)
+        .where(DishDuplicateCluster.status == 'open', DishDuplicateClusterMember.dish_id.in_(dish_ids))
+    )
+
+
+def dismiss_cluster(cluster, user_id):
+    cluster.status = 'dismissed'
+    cluster.reviewed_at = datetime.utcnow()
+    cluster.reviewed_by_id = user_id
+
+
+def suggested_canonical_id(cluster):
+    """The member with the most references; the oldest dish wins ties."""
+    best = max(
+        cluster.members,
+        key=lambda m: (m.main_menus + m.side_menus + m.suggestions, -m.dish_id),
+    )
+    return best.dish_id
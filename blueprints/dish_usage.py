@@ -0,0 +1,125 @@
+"""Dish usage counters (``dish_usage_stats``).
+
+Each row counts, for one dish in one tenant, the menus serving it as main,
+as side and in either role (a menu using it as both counts once in
+``menus``), the suggestions naming it, the votes on those suggestions and
+the feedback left on menus that served it. The flush hook in models.py
+adjusts the counters as rows are written, so the dish admin, merge preview,
+duplicate scan and faculty meal insights read them instead of grouping
+Menu and Suggestion.
+
+``reconcile_dish_usage`` recounts from the source tables. It is run after
+bulk rewrites that bypass the hook (dish merges) and by
+``flask reconcile-dish-usage`` to repair drift.
+"""
+from collections import defaultdict
+
+from sqlalchemy import delete, func, select, union
+
+def _expected_usage(dish_ids=None):
+    """``{(tenant_id, dish_id): {column: count}}`` counted from the source tables."""
+    from app import db
+    from models import Feedback, Menu, Suggestion, SuggestionVote
+
+    expected = defaultdict(dict)
+
+    def collect(column, statement, dish_column):
+        if dish_ids is not None:
+            statement = statement.where(dish_column.in_(dish_ids))
+        for tenant_id, dish_id, count in db.session.execute(statement):
+            if dish_id is not None:
+                expected[(tenant_id, dish_id)][column] = count
+
+    collect('main_menus', select(Menu.tenant_id, Menu.dish_id, func.count(Menu.id))
+            .group_by(Menu.tenant_id, Menu.dish_id), Menu.dish_id)
+    collect('side_menus', select(Menu.tenant_id, Menu.side_dish_id, func.count(Menu.id))
+            .group_by(Menu.tenant_id, Menu.side_dish_id), Menu.side_dish_id)
+    collect('suggestions', select(Suggestion.tenant_id, Suggestion.dish_id, func.count(Suggestion.id))
+            .group_by(Suggestion.tenant_id, Suggestion.dish_id), Suggestion.dish_id)
+    collect('votes', select(SuggestionVote.tenant_id, Suggestion.dish_id, func.count(SuggestionVote.id))
+            .join(Suggestion, Suggestion.id == SuggestionVote.suggestion_id)
+            .group_by(SuggestionVote.tenant_id, Suggestion.dish_id), Suggestion.dish_id)
+
+    # A menu with the same dish as main and side counts once, and so does
+    # its feedback.
+    menu_dishes = union(
+        select(Menu.id.label('menu_id'), Menu.tenant_id.label('tenant_id'), Menu.dish_id.label('dish_id'))
+        .where(Menu.dish_id.isnot(None)),
+        select(Menu.id.label('menu_id'), Menu.tenant_id.label('tenant_id'), Menu.side_dish_id.label('dish_id'))
+        .where(Menu.side_dish_id.isnot(None)),
+    ).subquery()
+    collect('menus', select(menu_dishes.c.tenant_id, menu_dishes.c.dish_id, func.count(menu_dishes.c.menu_id))
+            .group_by(menu_dishes.c.tenant_id, menu_dishes.c.dish_id), menu_dishes.c.dish_id)
+    collect('feedback_count', select(Feedback.tenant_id, menu_dishes.c.dish_id, func.count(Feedback.id))
+            .join(menu_dishes, menu_dishes.c.menu_id == Feedback.menu_id)
+            .group_by(Feedback.tenant_id, menu_dishes.c.dish_id), menu_dishes.c.dish_id)
+    return expected
+
+
+def reconcile_dish_usage(dish_ids=None):
+    """
+    Rewrite ``dish_usage_stats`` from the source tables, for ``dish_ids`` or
+    for every dish. Returns the number of rows that were wrong or missing.
+    Does not commit.
+    """
+    from app import db
+    from models import DISH_USAGE_COLUMNS, DishUsageStats
+
+    if dish_ids is not None:
+        dish_ids = sorted(set(dish_ids))
+        if not dish_ids:
+            return 0
+    expected = _expected_usage(dish_ids)
+
+    query = DishUsageStats.query
+    if dish_ids is not None:
+        query = query.filter(DishUsageStats.dish_id.in_(dish_ids))
+    corrected = 0
+    stale_ids = []
+    for stats in query.all():
+        counts = expected.pop((stats.tenant_id, stats.dish_id), None)
+        if counts is None:
+            stale_ids.append(stats.id)
+            if any(getattr(stats, column) for column in DISH_USAGE_COLUMNS):
+                corrected += 1
+            continue
+        changed = False
+        for column in DISH_USAGE_COLUMNS:
+            if getattr(stats, column) != counts.get(column, 0):
+                setattr(stats, column, counts.get(column, 0))
+                changed = True
+        corrected += changed
+    if stale_ids:
+        db.session.execute(delete(DishUsageStats).where(DishUsageStats.id.in_(stale_ids)))
+    for (tenant_id, dish_id), counts in expected.items():
+        db.session.add(DishUsageStats(
+            tenant_id=tenant_id,
+            dish_id=dish_id,
+            **{column: counts.get(column, 0) for column in DISH_USAGE_COLUMNS},
+        ))
+        corrected += 1
+    db.session.flush()
+    return corrected
+
+
+def dish_usage_counts(dish_ids, tenant_id=None):
+    """
+    ``{dish_id: {main_menus, side_menus, menus, suggestions, votes, feedback_count}}``
+    for ``tenant_id``, or summed over all tenants when it is None. Every
+    requested dish is present, with zeros if unused.
+    """
+    from app import db
+    from models import DISH_USAGE_COLUMNS, DishUsageStats
+
+    counts = {dish_id: dict.fromkeys(DISH_USAGE_COLUMNS, 0) for dish_id in dish_ids}
+    if not counts:
+        return counts
+    query = db.session.query(
+        DishUsageStats.dish_id,
+        *[func.sum(getattr(DishUsageStats, column)) for column in DISH_USAGE_COLUMNS],
+    ).filter(DishUsageStats.dish_id.in_(list(counts)))
+    if tenant_id is not None:
+        query = query.filter(DishUsageStats.tenant_id == tenant_id)
+    for dish_id, *totals in query.group_by(DishUsageStats.dish_id):
+        counts[dish_id] = {column: int(total or 0) for column, total in zip(DISH_USAGE_COLUMNS, totals)}
+    return counts
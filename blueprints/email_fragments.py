@@ -0,0 +1,37 @@
+"""Cached HTML fragments shared by notification emails."""
+from flask import current_app
+from markupsafe import Markup
+
+from app import cache
+
+DISH_GUIDE_TEMPLATE = "emails/_dish_preparation_guide.html"
+DISH_GUIDE_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def _dish_guide_cache_key(dish_id, updated_at):
+    stamp = updated_at.isoformat() if updated_at else "none"
+    return f"email-fragment:dish-guide:{dish_id}:{stamp}"
+
+
+def render_dish_preparation_guide(dish):
+    """Rendered preparation guide for ``dish``, reused until its estimate changes."""
+    estimate = getattr(dish, 'estimate', None) if dish else None
+    if not estimate:
+        return Markup("")
+
+    key = _dish_guide_cache_key(dish.id, estimate.updated_at)
+    html = cache.get(key)
+    if html is None:
+        from .pantry.routes import _estimate_payload_for
+
+        template = current_app.jinja_env.get_template(DISH_GUIDE_TEMPLATE)
+        html = template.render(estimate=_estimate_payload_for(dish))
+        cache.set(key, html, timeout=DISH_GUIDE_CACHE_TIMEOUT)
+    return Markup(html)
+
+
+def clear_dish_preparation_guide(estimate):
+    """Drop the cached guide for ``estimate``'s current version before it is edited."""
+    if estimate is None or estimate.dish_id is None:
+        return
+    cache.delete(_dish_guide_cache_key(estimate.dish_id, estimate.updated_at))
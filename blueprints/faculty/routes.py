@@ -1,5 +1,6 @@
 import os
 import re
+import uuid
 from datetime import date, datetime, timedelta
 from io import BytesIO
 
@@ -30,19 +31,23 @@ from models import (
     Budget,
     Dish,
     ExpensePrintReport,
-    ExpensePrintReportBill,
     FacultyBudgetCycle,
     FacultyMessage,
     FacultyMessageFloor,
     FacultyReportSubmission,
     Feedback,
     Menu,
-    Suggestion,
-    SuggestionVote,
     User,
 )
 from . import faculty_bp
-from ..budgeting import build_floor_budget_ledger
+from ..budgeting import (
+    build_floor_budget_ledger,
+    freeze_settled_budget_periods,
+    invalidate_budget_snapshots,
+    invalidate_budget_snapshots_for_bills,
+)
+from ..dish_usage import dish_usage_counts
+from .workers import broadcast_faculty_message, dispatch_faculty_message, faculty_message_recipients
 from ..rate_limit_keys import client_ip_key, faculty_login_identifier_key, current_user_or_ip_key
 from ..utils import (
     _ensure_username_from_full_name,
@@ -56,8 +61,6 @@ from ..utils import (
     log_tenant_audit,
     _require_faculty,
     _require_user,
-    send_email_notification,
-    send_push_notification,
     tenant_filter,
     visible_budget_condition,
 )
@@ -360,6 +363,7 @@ def _build_submission_verification_data(submission, linked_bills):
 
 
 def _delete_cycle_related_data(cycle):
+    invalidate_budget_snapshots(since=cycle.start_date)
     submissions = tenant_filter(FacultyReportSubmission.query).filter_by(cycle_id=cycle.id).all()
     for submission in submissions:
         for bill in list(submission.bills):
@@ -380,6 +384,9 @@ def _delete_cycle_related_data(cycle):
 
 
 def _sync_submission_links(submission, selected_bills, selected_expenses):
+    # Moving bills in or out of a submission changes what its cycle spent.
+    invalidate_budget_snapshots_for_bills(list(submission.bills) + list(selected_bills))
+    invalidate_budget_snapshots(submission.floor, since=submission.cycle.start_date)
     for bill in submission.bills:
         bill.report_submission_id = None
     for expense in submission.expenses:
@@ -1070,22 +1077,10 @@ def meal_insights():
         if menu.side_dish_id:
             dish_ids.add(menu.side_dish_id)
 
-    suggestion_map = {}
-    if dish_ids:
-        suggestion_map = {
-            dish_id: {'suggestion_count': int(suggestion_count), 'vote_count': int(vote_count)}
-            for dish_id, suggestion_count, vote_count in (
-                tenant_filter(db.session.query(
-                    Suggestion.dish_id,
-                    func.count(func.distinct(Suggestion.id)),
-                    func.count(SuggestionVote.id),
-                ))
-                .outerjoin(SuggestionVote, SuggestionVote.suggestion_id == Suggestion.id)
-                .filter(Suggestion.dish_id.in_(dish_ids))
-                .group_by(Suggestion.dish_id)
-                .all()
-            )
-        }
+    suggestion_map = {
+        dish_id: {'suggestion_count': counts['suggestions'], 'vote_count': counts['votes']}
+        for dish_id, counts in dish_usage_counts(dish_ids, tenant_id=user.tenant_id).items()
+    }
 
     def _suggestion_totals(menu):
         ids = {menu.dish_id, menu.side_dish_id}
@@ -1200,10 +1195,7 @@ def messages():
                     tenant_id=getattr(g, 'tenant_id', None),
                 ))
 
-        recipient_query = tenant_filter(User.query).filter(User.role == 'pantryHead')
-        if target_scope == 'selected_floors':
-            recipient_query = recipient_query.filter(User.floor.in_(selected_floors))
-        recipients = recipient_query.all()
+        recipients = faculty_message_recipients(message, getattr(g, 'tenant_id', None))
 
         db.session.commit()
 
@@ -1254,31 +1246,73 @@ def send_single_message(message_id):
     recipient = tenant_filter(User.query).filter_by(id=recipient_id, role='pantryHead').first()
     if not recipient:
         return jsonify({"status": "error", "message": "user not found"}), 404
-        
-    send_push_notification(
-        user_id=recipient.id,
-        title=f"Faculty Message: {message.title}",
-        body=message.content[:100] + ("..." if len(message.content) > 100 else ""),
-        icon="/static/icons/icon-192.png",
-        url="/dashboard",
-    )
-    
-    if recipient.email:
-        tenant_name = getattr(g, 'tenant_name', 'Maskan')
-        email_subject = f"[{tenant_name}] Faculty Message: {message.title}"
-        email_html = f"""
-        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-            <h2 style="color: #2c3e50;">{message.title}</h2>
-            <p style="white-space: pre-wrap; font-size: 16px; color: #333;">{message.content}</p>
-            <hr style="border: none; border-top: 1px solid #eee; margin: 20px 0;">
-            <p style="font-size: 12px; color: #888;">Log in to your pantry dashboard to manage and reply if necessary.</p>
-        </div>
-        """
-        send_email_notification(recipient.email, email_subject, email_html)
-        
+
+    dispatch_faculty_message(message, recipient, getattr(g, 'tenant_name', 'Maskan'))
     return jsonify({"status": "success"})
 
 
+@faculty_bp.route('/faculty/messages/<int:message_id>/broadcast', methods=['POST'])
+@limiter.limit("10 per minute; 60 per hour", key_func=current_user_or_ip_key)
+def broadcast_message(message_id):
+    """Fan a message out to all targeted pantry heads in one background job."""
+    _require_faculty()
+    message = tenant_filter(FacultyMessage.query).filter_by(id=message_id).first_or_404()
+    tenant_id = getattr(g, 'tenant_id', None)
+    tenant_name = getattr(g, 'tenant_name', 'Maskan')
+
+    queue = getattr(current_app, 'notification_queue', None)
+    if queue:
+        broadcast_id = str(uuid.uuid4())
+        queue.enqueue(
+            'blueprints.faculty.workers._broadcast_faculty_message_worker',
+            message.id,
+            tenant_id,
+            tenant_name,
+            job_id=broadcast_id,
+            # Pushes and emails are delivered inside the job, paced by the SMTP limit.
+            job_timeout=900,
+            result_ttl=3600,
+            failure_ttl=86400,
+        )
+        return jsonify({"status": "queued", "broadcast_id": broadcast_id}), 202
+
+    # Sync Fallback
+    counts = broadcast_faculty_message(message, tenant_id, tenant_name)
+    return jsonify({"status": "completed", "broadcast_id": None, **counts})
+
+
+@faculty_bp.route('/faculty/messages/broadcasts/<broadcast_id>', methods=['GET'])
+def broadcast_progress(broadcast_id):
+    """Delivery counts for a queued Faculty message broadcast."""
+    _require_faculty()
+    queue = getattr(current_app, 'notification_queue', None)
+    if not queue:
+        return jsonify({"status": "error", "message": "Background processing not configured"}), 400
+
+    job = queue.fetch_job(broadcast_id)
+    if not job or job.func_name != 'blueprints.faculty.workers._broadcast_faculty_message_worker':
+        return jsonify({"status": "not_found"}), 404
+
+    # args: (message_id, tenant_id, tenant_name)
+    job_tenant_id = job.args[1] if len(job.args) > 1 else None
+    if str(job_tenant_id) != str(getattr(g, 'tenant_id', None)):
+        return jsonify({"status": "not_found"}), 404
+
+    if job.is_finished:
+        result = job.result or {}
+        if result.get('error'):
+            return jsonify({"status": "failed", "error": result['error']})
+        return jsonify({"status": "completed", **result})
+
+    progress = dict(job.get_meta(refresh=True).get('progress') or {})
+    if job.is_failed:
+        return jsonify({"status": "failed", "error": "BROADCAST_JOB_FAILED", **progress})
+
+    status = job.get_status(refresh=False)
+    status = getattr(status, 'value', str(status))
+    return jsonify({"status": 'sending' if status == 'started' else 'queued', **progress})
+
+
 @faculty_bp.route('/faculty/cycles', methods=['GET', 'POST'])
 def cycles():
     user = _require_faculty()
@@ -1729,6 +1763,7 @@ def edit_cycle(cycle_id):
         flash(error_message, 'error')
         return redirect(url_for('faculty.cycle_detail', cycle_id=cycle.id))
 
+    invalidate_budget_snapshots(since=min(cycle.start_date, cycle_data['start_date']))
     cycle.title = cycle_data['title']
     cycle.start_date = cycle_data['start_date']
     cycle.end_date = cycle_data['end_date']
@@ -1752,6 +1787,7 @@ def activate_cycle(cycle_id):
 
     cycle.status = 'active'
     cycle.activated_at = datetime.utcnow()
+    invalidate_budget_snapshots(since=cycle.start_date)
     db.session.commit()
     flash('Cycle activated successfully.', 'success')
     return redirect(url_for('faculty.cycle_detail', cycle_id=cycle.id))
@@ -1773,6 +1809,12 @@ def close_cycle(cycle_id):
         
     cycle.status = 'closed'
     cycle.closed_at = datetime.utcnow()
+    db.session.flush()
+    # A closed, verified cycle is settled; freeze its ledger rows now rather
+    # than waiting for the maintenance run.
+    budget_floors = tenant_filter(Budget.query).with_entities(Budget.floor).distinct().all()
+    for floor, in budget_floors:
+        freeze_settled_budget_periods(floor, faculty_workflow_enabled=True)
     db.session.commit()
     flash('Cycle closed successfully.', 'success')
     return redirect(url_for('faculty.cycle_detail', cycle_id=cycle.id))
@@ -1816,24 +1858,12 @@ def reports_page():
         )
         current_available_budget = floor_budget_ledger['current_available_budget']
 
-        # Fetch and deduplicate print reports for the active cycle
-        cycle_print_reports = tenant_filter(ExpensePrintReport.query).filter_by(
+        # Older duplicates are removed by `flask maintenance`; only the
+        # newest report for the cycle is ever shown.
+        latest_print_report = tenant_filter(ExpensePrintReport.query).filter_by(
             cycle_id=active_cycle.id,
             floor=floor
-        ).order_by(ExpensePrintReport.created_at.desc()).all()
-
-        if cycle_print_reports:
-            latest_print_report = cycle_print_reports[0]
-            # Clean up leftover duplicate print reports for this active cycle
-            if len(cycle_print_reports) > 1:
-                for dup in cycle_print_reports[1:]:
-                    if submission and submission.print_report_id == dup.id:
-                        submission.print_report_id = latest_print_report.id
-                    tenant_filter(ExpensePrintReportBill.query).filter_by(print_report_id=dup.id).delete()
-                    if dup.storage_path and dup.storage_path != latest_print_report.storage_path:
-                        _safe_remove_file(dup.storage_path)
-                    db.session.delete(dup)
-                db.session.commit()
+        ).order_by(ExpensePrintReport.created_at.desc()).first()
 
         if request.method == 'POST':
             if not allocation:
@@ -2049,6 +2079,7 @@ def verify_report(submission_id):
     submission.review_notes = (request.form.get('review_notes') or '').strip()
     submission.verified_at = datetime.utcnow()
     submission.verified_by_id = user.id
+    invalidate_budget_snapshots(submission.floor, since=submission.cycle.start_date)
     db.session.commit()
     flash('Report verified successfully.', 'success')
     return redirect(url_for('faculty.report_detail', submission_id=submission.id))
@@ -2067,6 +2098,7 @@ def reject_report(submission_id):
     submission.review_notes = review_notes
     submission.verified_at = None
     submission.verified_by_id = None
+    invalidate_budget_snapshots(submission.floor, since=submission.cycle.start_date)
     db.session.commit()
     flash('Report rejected. The floor can now revise and re-submit.', 'success')
     return redirect(url_for('faculty.report_detail', submission_id=submission.id))
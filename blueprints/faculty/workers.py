@@ -0,0 +1,169 @@
+"""Background job workers for Faculty message fan-out."""
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def faculty_message_recipients(message, tenant_id):
+    """Pantry heads targeted by ``message`` (all floors or its selected floors)."""
+    from models import User
+
+    query = User.query.filter(
+        User.tenant_id == tenant_id,
+        User.role == 'pantryHead',
+        User.is_active.is_(True),
+    )
+    if message.target_scope == 'selected_floors':
+        floors = sorted({target.floor for target in message.target_floors})
+        query = query.filter(User.floor.in_(floors or [-1]))
+    return query.order_by(User.floor.asc(), User.id.asc()).all()
+
+
+def _faculty_push_content(message):
+    return {
+        'title': f"Faculty Message: {message.title}",
+        'body': message.content[:100] + ("..." if len(message.content) > 100 else ""),
+        'icon': "/static/icons/icon-192.png",
+        'url': "/dashboard",
+    }
+
+
+def _faculty_email_content(message, tenant_name):
+    subject = f"[{tenant_name}] Faculty Message: {message.title}"
+    html = f"""
+        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+            <h2 style="color: #2c3e50;">{message.title}</h2>
+            <p style="white-space: pre-wrap; font-size: 16px; color: #333;">{message.content}</p>
+            <hr style="border: none; border-top: 1px solid #eee; margin: 20px 0;">
+            <p style="font-size: 12px; color: #888;">Log in to your pantry dashboard to manage and reply if necessary.</p>
+        </div>
+        """
+    return subject, html
+
+
+def dispatch_faculty_message(message, recipient, tenant_name):
+    """Queue the push and email for one pantry head."""
+    from ..utils import send_email_notification, send_push_notification
+
+    send_push_notification(user_id=recipient.id, **_faculty_push_content(message))
+
+    if recipient.email:
+        subject, html = _faculty_email_content(message, tenant_name)
+        send_email_notification(recipient.email, subject, html)
+
+
+def deliver_faculty_message(message, recipient, tenant_name, email_sender):
+    """
+    Send the push and email for one pantry head now, bypassing the
+    coalescer and the outbox. Returns ``{'push': ..., 'email': ...}`` with
+    'sent', 'failed' or 'skipped' (no subscription / no address).
+    """
+    from models import PushSubscription
+    from ..utils import send_push_worker
+
+    result = {'push': 'skipped', 'email': 'skipped'}
+    if PushSubscription.query.filter_by(user_id=recipient.id).count():
+        try:
+            pushed = send_push_worker(recipient.id, **_faculty_push_content(message))
+        except Exception:
+            logger.exception("Faculty message push failed: message_id=%s recipient_id=%s", message.id, recipient.id)
+            pushed = False
+        result['push'] = 'sent' if pushed else 'failed'
+
+    if recipient.email:
+        subject, html = _faculty_email_content(message, tenant_name)
+        try:
+            if not email_sender.configured:
+                raise RuntimeError("SMTP sender is not configured")
+            email_sender.send(recipient.email, subject, html)
+            result['email'] = 'sent'
+        except Exception:
+            logger.exception("Faculty message email failed: message_id=%s recipient_id=%s", message.id, recipient.id)
+            email_sender.close()
+            result['email'] = 'failed'
+    return result
+
+
+def broadcast_faculty_message(message, tenant_id, tenant_name, progress=None):
+    """
+    Deliver ``message`` to every targeted pantry head over one SMTP session.
+    Returns per-channel counts and per-recipient results; a recipient is
+    delivered when at least one channel reached them.
+    """
+    from ..mailer import SMTPBatchSender
+
+    recipients = faculty_message_recipients(message, tenant_id)
+    counts = {
+        'total': len(recipients),
+        'delivered': 0,
+        'failed': 0,
+        'push_sent': 0,
+        'push_failed': 0,
+        'email_sent': 0,
+        'email_failed': 0,
+        'delivered_ids': [],
+        'failed_ids': [],
+        'results': {},
+    }
+    if progress:
+        progress(counts)
+
+    with SMTPBatchSender() as email_sender:
+        for recipient in recipients:
+            result = deliver_faculty_message(message, recipient, tenant_name, email_sender)
+            for channel in ('push', 'email'):
+                if result[channel] != 'skipped':
+                    counts[f"{channel}_{result[channel]}"] += 1
+            if 'sent' in result.values():
+                counts['delivered'] += 1
+                counts['delivered_ids'].append(recipient.id)
+            else:
+                counts['failed'] += 1
+                counts['failed_ids'].append(recipient.id)
+            counts['results'][str(recipient.id)] = result
+            if progress:
+                progress(counts)
+    return counts
+
+
+def _broadcast_faculty_message_worker(message_id, tenant_id, tenant_name):
+    """RQ Worker: fans one Faculty message out to its pantry heads."""
+    from app import app
+    from models import FacultyMessage
+
+    try:
+        from rq import get_current_job
+    except Exception:  # pragma: no cover - lets the worker run without RQ installed
+        get_current_job = None
+
+    with app.app_context():
+        started = time.monotonic()
+        message = FacultyMessage.query.filter_by(id=message_id, tenant_id=tenant_id).first()
+        if not message:
+            logger.warning("Faculty broadcast skipped, message missing: message_id=%s", message_id)
+            return {'error': 'MESSAGE_NOT_FOUND'}
+
+        job = get_current_job() if get_current_job else None
+
+        def _save_progress(counts):
+            if job is None:
+                return
+            job.meta['progress'] = counts
+            job.save_meta()
+
+        counts = broadcast_faculty_message(message, tenant_id, tenant_name, progress=_save_progress)
+        logger.info(
+            "Faculty broadcast completed: message_id=%s total=%s delivered=%s failed=%s "
+            "push_sent=%s push_failed=%s email_sent=%s email_failed=%s duration=%.2fs",
+            message_id,
+            counts['total'],
+            counts['delivered'],
+            counts['failed'],
+            counts['push_sent'],
+            counts['push_failed'],
+            counts['email_sent'],
+            counts['email_failed'],
+            time.monotonic() - started,
+        )
+        return counts
@@ -0,0 +1,102 @@
+"""Receipt import progress events over Redis pub/sub.
+
+The worker publishes each stage (queued, ocr_started, parsing, done, failed)
+to a per-task channel and keeps the latest event in a key, so a subscriber
+that connects late still starts from the current state.
+"""
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "ajs-pantry:receipt-import"
+STATE_TTL_SECONDS = 3600
+TERMINAL_STAGES = {"done", "failed"}
+
+
+def _channel(task_id):
+    return f"{CHANNEL_PREFIX}:{task_id}:events"
+
+
+def _state_key(task_id):
+    return f"{CHANNEL_PREFIX}:{task_id}:state"
+
+
+def publish_import_event(connection, task_id, stage, **fields):
+    """Record ``stage`` as the task's latest state and notify subscribers."""
+    event = dict(fields, stage=stage, task_id=task_id, at=time.time())
+    payload = json.dumps(event, default=str)
+    try:
+        pipe = connection.pipeline()
+        pipe.set(_state_key(task_id), payload, ex=STATE_TTL_SECONDS)
+        pipe.publish(_channel(task_id), payload)
+        pipe.execute()
+    except Exception as exc:
+        # Progress events are best effort; polling still works without them.
+        logger.warning("Unable to publish receipt import event %s for %s: %s", stage, task_id, exc)
+    return event
+
+
+def publish_current_job_event(stage, **fields):
+    """Publish ``stage`` for the RQ job currently executing, if any."""
+    try:
+        from rq import get_current_job
+    except Exception:  # pragma: no cover - lets the worker run without RQ installed
+        return None
+
+    job = get_current_job()
+    if job is None:
+        return None
+    return publish_import_event(job.connection, job.id, stage, **fields)
+
+
+def last_import_event(connection, task_id):
+    raw = connection.get(_state_key(task_id))
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+
+
+def _sse(event_name, data):
+    return f"event: {event_name}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def stream_import_events(connection, task_id, max_seconds=60, heartbeat_seconds=15):
+    """Yield Server-Sent Events for ``task_id`` until it finishes or ``max_seconds`` pass."""
+    pubsub = connection.pubsub(ignore_subscribe_messages=True)
+    # Subscribe before reading the stored state so no event falls in between.
+    pubsub.subscribe(_channel(task_id))
+    try:
+        deadline = time.monotonic() + max_seconds
+        last_event = last_import_event(connection, task_id) or {"stage": "queued", "task_id": task_id}
+        yield _sse("progress", last_event)
+        if last_event.get("stage") in TERMINAL_STAGES:
+            return
+
+        last_sent = time.monotonic()
+        while time.monotonic() < deadline:
+            message = pubsub.get_message(timeout=1.0)
+            if message and message.get("type") == "message":
+                try:
+                    event = json.loads(message["data"])
+                except (TypeError, ValueError):
+                    continue
+                yield _sse("progress", event)
+                last_sent = time.monotonic()
+                if event.get("stage") in TERMINAL_STAGES:
+                    return
+            elif time.monotonic() - last_sent >= heartbeat_seconds:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+
+        # Client falls back to polling import-status after this.
+        yield _sse("timeout", {"task_id": task_id})
+    finally:
+        try:
+            pubsub.close()
+        except Exception:
+            pass
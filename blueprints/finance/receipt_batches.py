@@ -0,0 +1,165 @@
+"""Batch receipt imports: many files (or a zip) enqueued as one job group.
+
+The batch itself is a Redis record listing its files and their RQ job ids;
+the aggregate status is assembled from the jobs on each poll, so workers do
+not need to know they are part of a batch.
+"""
+import json
+import mimetypes
+import os
+import time
+import zipfile
+
+KEY_PREFIX = "ajs-pantry:receipt-batch"
+BATCH_TTL_SECONDS = 86400
+MAX_BATCH_FILES = 30
+MAX_FILE_BYTES = 5 * 1024 * 1024
+MAX_BATCH_BYTES = 60 * 1024 * 1024
+# Request body cap for the batch upload: the batch limit plus multipart overhead.
+MAX_BATCH_REQUEST_BYTES = MAX_BATCH_BYTES + 1024 * 1024
+ALLOWED_MIME_TYPES = {'application/pdf', 'image/jpeg', 'image/png', 'image/jpg'}
+ZIP_MIME_TYPES = {'application/zip', 'application/x-zip-compressed'}
+
+
+class BatchUploadError(ValueError):
+    pass
+
+
+class _BatchAllowance:
+    """Running file count and byte total, checked before any zip member is inflated."""
+
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+
+    def claim(self, size):
+        self.files += 1
+        self.bytes += size
+        if self.files > MAX_BATCH_FILES:
+            raise BatchUploadError(f"A batch can contain at most {MAX_BATCH_FILES} receipts.")
+        if self.bytes > MAX_BATCH_BYTES:
+            raise BatchUploadError('Batch exceeds the 60MB total upload limit.')
+
+
+def _batch_key(batch_id):
+    return f"{KEY_PREFIX}:{batch_id}"
+
+
+def batch_temp_dir(receipt_temp_dir, batch_id):
+    # Kept out of the top-level temp dir, whose short-TTL sweep would delete
+    # files still waiting behind the rest of the batch.
+    return os.path.join(receipt_temp_dir, 'batches', batch_id)
+
+
+def _is_zip(upload):
+    return upload.content_type in ZIP_MIME_TYPES or (upload.filename or '').lower().endswith('.zip')
+
+
+def _entry(filename, mime_type, content):
+    if mime_type not in ALLOWED_MIME_TYPES:
+        return {'filename': filename, 'error': f"Unsupported file type: {mime_type or 'unknown'}"}
+    if len(content) > MAX_FILE_BYTES:
+        return {'filename': filename, 'error': 'File size exceeds 5MB limit.'}
+    if not content:
+        return {'filename': filename, 'error': 'File is empty.'}
+    return {'filename': filename, 'mime_type': mime_type, 'content': content}
+
+
+def _zip_entries(upload, allowance):
+    try:
+        archive = zipfile.ZipFile(upload.stream)
+    except zipfile.BadZipFile:
+        raise BatchUploadError(f"{upload.filename} is not a valid zip file.")
+
+    entries = []
+    with archive:
+        for info in archive.infolist():
+            name = os.path.basename(info.filename)
+            if info.is_dir() or not name or name.startswith('.') or info.filename.startswith('__MACOSX/'):
+                continue
+            mime_type = mimetypes.guess_type(name)[0]
+            # Checked against the declared sizes before inflating anything;
+            # zipfile stops reading a member at its declared size.
+            if info.file_size > MAX_FILE_BYTES:
+                allowance.claim(0)
+                entries.append({'filename': name, 'error': 'File size exceeds 5MB limit.'})
+                continue
+            if mime_type not in ALLOWED_MIME_TYPES:
+                allowance.claim(0)
+                entries.append({'filename': name, 'error': f"Unsupported file type: {mime_type or 'unknown'}"})
+                continue
+            allowance.claim(info.file_size)
+            try:
+                content = archive.read(info)
+            except (zipfile.BadZipFile, zipfile.LargeZipFile, NotImplementedError, RuntimeError):
+                entries.append({'filename': name, 'error': 'File could not be extracted from the zip.'})
+                continue
+            entries.append(_entry(name, mime_type, content))
+    return entries
+
+
+def collect_batch_files(uploads):
+    """
+    Flatten uploaded files and zips into entries of ``filename``, ``mime_type``
+    and ``content`` (or ``error`` for files that cannot be imported).
+    """
+    entries = []
+    allowance = _BatchAllowance()
+    for upload in uploads:
+        if not upload or not upload.filename:
+            continue
+        if _is_zip(upload):
+            entries.extend(_zip_entries(upload, allowance))
+        else:
+            content = upload.read()
+            allowance.claim(len(content))
+            entries.append(_entry(upload.filename, upload.content_type, content))
+
+    if not entries:
+        raise BatchUploadError('No files selected.')
+    return entries
+
+
+def _tenant_key(tenant_id):
+    # Tenant ids are UUIDs; the record is JSON, so they are kept as strings.
+    return str(tenant_id) if tenant_id is not None else None
+
+
+def save_batch(connection, batch_id, user_id, tenant_id, files):
+    record = {
+        'batch_id': batch_id,
+        'user_id': user_id,
+        'tenant_id': _tenant_key(tenant_id),
+        'created_at': time.time(),
+        'files': files,
+    }
+    connection.set(_batch_key(batch_id), json.dumps(record, default=str), ex=BATCH_TTL_SECONDS)
+    return record
+
+
+def load_batch(connection, batch_id):
+    raw = connection.get(_batch_key(batch_id))
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+
+
+def batch_owned_by(batch, user_id, tenant_id):
+    return batch.get('user_id') == user_id and batch.get('tenant_id') == _tenant_key(tenant_id)
+
+
+def summarize_batch(batch, file_statuses):
+    """Aggregate payload: overall status, counts and per-file results."""
+    counts = {'total': len(file_statuses), 'completed': 0, 'failed': 0, 'processing': 0}
+    for entry in file_statuses:
+        key = entry['status'] if entry['status'] in ('completed', 'failed') else 'processing'
+        counts[key] += 1
+    return {
+        'batch_id': batch['batch_id'],
+        'status': 'processing' if counts['processing'] else 'completed',
+        'counts': counts,
+        'files': file_statuses,
+    }
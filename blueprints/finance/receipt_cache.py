@@ -0,0 +1,133 @@
+"""Content-hash cache of parsed receipt imports.
+
+Staff often upload the same receipt again after a failed save or from a
+second device. Parsed results are cached in Redis under the SHA-256 of the
+uploaded bytes and ``PARSER_VERSION``, so a repeat upload returns at once
+without running pdfplumber/Tesseract or enqueuing a job. Entries expire after
+``RECEIPT_CACHE_TTL_SECONDS`` and the oldest are evicted beyond
+``RECEIPT_CACHE_MAX_ENTRIES``. Before evicting, index members whose entry has
+expired or belongs to an older parser version are dropped, so dead entries
+never push out live ones.
+"""
+import hashlib
+import json
+import logging
+import time
+
+from flask import current_app
+
+from .services.parser_factory import PARSER_VERSION
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ajs-pantry:receipt-cache"
+INDEX_KEY = f"{KEY_PREFIX}:index"
+STATS_KEY = f"{KEY_PREFIX}:stats"
+
+
+def content_hash(file_bytes):
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+def _entry_key(digest):
+    return f"{KEY_PREFIX}:{PARSER_VERSION}:{digest}"
+
+
+def _member_name(member):
+    return member.decode() if isinstance(member, bytes) else member
+
+
+def _config_int(name, default):
+    try:
+        return int(current_app.config.get(name) or default)
+    except (TypeError, ValueError):
+        return default
+
+
+def _connection():
+    queue = getattr(current_app, "task_queue", None)
+    return getattr(queue, "connection", None)
+
+
+def get_cached_receipt(digest):
+    """Parsed receipt dict for ``digest`` or None; counts the hit or miss."""
+    connection = _connection()
+    if connection is None or _config_int("RECEIPT_CACHE_MAX_ENTRIES", 500) <= 0:
+        return None
+    try:
+        raw = connection.get(_entry_key(digest))
+        connection.hincrby(STATS_KEY, "hits" if raw else "misses", 1)
+        return json.loads(raw) if raw else None
+    except Exception as exc:
+        logger.warning("Receipt cache lookup failed for %s: %s", digest, exc)
+        return None
+
+
+def store_cached_receipt(digest, data):
+    """Cache a successfully parsed receipt (without the per-upload filename)."""
+    connection = _connection()
+    max_entries = _config_int("RECEIPT_CACHE_MAX_ENTRIES", 500)
+    if connection is None or max_entries <= 0 or not digest:
+        return False
+
+    payload = {key: value for key, value in data.items() if key != "filename"}
+    key = _entry_key(digest)
+    ttl = _config_int("RECEIPT_CACHE_TTL_SECONDS", 604800)
+    try:
+        pipe = connection.pipeline()
+        pipe.set(key, json.dumps(payload, default=str), ex=ttl)
+        pipe.zadd(INDEX_KEY, {key: time.time()})
+        pipe.hincrby(STATS_KEY, "stores", 1)
+        pipe.execute()
+
+        overflow = connection.zcard(INDEX_KEY) - max_entries
+        if overflow > 0:
+            overflow -= _prune_index(connection, ttl)
+        if overflow > 0:
+            evicted = [member for member, _ in connection.zpopmin(INDEX_KEY, overflow)]
+            if evicted:
+                connection.delete(*evicted)
+                connection.hincrby(STATS_KEY, "evictions", len(evicted))
+        return True
+    except Exception as exc:
+        logger.warning("Receipt cache store failed for %s: %s", digest, exc)
+        return False
+
+
+def _prune_index(connection, ttl):
+    """Drop index members whose entry is gone or from another parser version; returns how many."""
+    # Scores are store times, so members older than the TTL have expired.
+    removed = connection.zremrangebyscore(INDEX_KEY, "-inf", time.time() - ttl)
+
+    current_prefix = _entry_key("")
+    members = connection.zrange(INDEX_KEY, 0, -1)
+    stale = [member for member in members if not _member_name(member).startswith(current_prefix)]
+    current = [member for member in members if _member_name(member).startswith(current_prefix)]
+    if current:
+        pipe = connection.pipeline()
+        for member in current:
+            pipe.exists(member)
+        stale.extend(member for member, exists in zip(current, pipe.execute()) if not exists)
+    if stale:
+        removed += connection.zrem(INDEX_KEY, *stale)
+    return removed
+
+
+def receipt_cache_stats(connection):
+    """Hit/miss counters and current size, for the queue health view."""
+    raw = connection.hgetall(STATS_KEY) or {}
+    stats = {
+        (key.decode() if isinstance(key, bytes) else key): int(value)
+        for key, value in raw.items()
+    }
+    hits = stats.get("hits", 0)
+    lookups = hits + stats.get("misses", 0)
+    return {
+        "hits": hits,
+        "misses": stats.get("misses", 0),
+        "stores": stats.get("stores", 0),
+        "evictions": stats.get("evictions", 0),
+        "entries": connection.zcard(INDEX_KEY),
+        "hit_rate": round(hits / lookups, 3) if lookups else None,
+        "parser_version": PARSER_VERSION,
+    }
@@ -1,16 +1,31 @@
-from flask import render_template, request, redirect, url_for, flash, jsonify, abort, g, current_app
+from flask import render_template, request, redirect, url_for, flash, jsonify, abort, g, current_app, Response
 from app import db, limiter
 from models import User, Expense, ProcurementItem, Budget, FloorLendBorrow, Bill, ExpensePrintReport, ExpensePrintReportBill
 from .services.parser_factory import ParserFactory
 from datetime import datetime, date
 from sqlalchemy import or_, func
 from sqlalchemy.orm import joinedload
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 import logging
 import uuid
-import time
 from . import finance_bp
-from ..budgeting import build_floor_budget_ledger
+from .import_events import publish_import_event, stream_import_events
+from .receipt_batches import (
+    BATCH_TTL_SECONDS,
+    MAX_BATCH_REQUEST_BYTES,
+    BatchUploadError,
+    batch_owned_by,
+    batch_temp_dir,
+    collect_batch_files,
+    load_batch,
+    save_batch,
+    summarize_batch,
+)
+from .receipt_cache import content_hash, get_cached_receipt, store_cached_receipt
+from ..budgeting import build_floor_budget_ledger, invalidate_budget_snapshots, invalidate_budget_snapshots_for_bills
+from ..bulk_writes import bulk_delete, bulk_insert, bulk_set, bulk_update
+from ..keyset import keyset_paginate
 from ..queue_health import active_worker_count, job_age_seconds, job_started_age_seconds
 from ..rate_limit_keys import current_user_or_ip_key
 from ..utils import (
@@ -61,6 +76,7 @@ def expenses():
                             # Recalculate total amount from all items in this bill
                             bill_total = tenant_filter(db.session.query(func.sum(ProcurementItem.actual_cost))).filter(ProcurementItem.bill_id == bill.id).scalar() or 0
                             bill.total_amount = bill_total
+                            invalidate_budget_snapshots_for_bills([bill])
 
                     db.session.commit()
                     _clear_dashboard_cache(getattr(g, 'tenant_id', None), floor)
@@ -97,19 +113,26 @@ def expenses():
                 db.session.add(bill)
                 db.session.flush() # Get bill.id
                 
-                total_amount = 0
-                for i in range(len(item_ids)):
-                    item_id = int(item_ids[i])
-                    cost = float(costs[i] or 0)
-                    
-                    item = tenant_filter(ProcurementItem.query).filter_by(id=item_id).first()
-                    if item and (user.role == 'admin' or item.floor == floor):
-                        item.actual_cost = cost
-                        item.bill_id = bill.id
-                        item.expense_recorded_at = datetime.utcnow()
-                        total_amount += cost
+                recorded_at = datetime.utcnow()
+                rows = [
+                    {
+                        'id': int(item_id),
+                        'actual_cost': float(cost or 0),
+                        'bill_id': bill.id,
+                        'expense_recorded_at': recorded_at,
+                    }
+                    for item_id, cost in zip(item_ids, costs)
+                ]
+                updated = bulk_update(
+                    ProcurementItem,
+                    rows,
+                    where=[] if user.role == 'admin' else [ProcurementItem.floor == floor],
+                    returning=[ProcurementItem.id, ProcurementItem.actual_cost],
+                )
+                total_amount = sum(float(cost or 0) for _, cost in updated)
                 
                 bill.total_amount = total_amount
+                invalidate_budget_snapshots(floor, since=bill_date)
                 db.session.commit()
                 _clear_dashboard_cache(getattr(g, 'tenant_id', None), floor)
                 flash(f'Bill {bill_no} recorded successfully with {len(item_ids)} items.', 'success')
@@ -159,22 +182,21 @@ def expenses():
     ).order_by(ProcurementItem.created_at.desc()).all()
     
     # Get all bills for this floor (PAGINATED - ACTIVE ONLY)
-    bills_page = request.args.get('bills_page', 1, type=int)
-    bills_pagination = tenant_filter(Bill.query).options(joinedload(Bill.items)).filter_by(
-        floor=floor, is_archived=False
-    ).order_by(Bill.bill_date.desc()).paginate(page=bills_page, per_page=15, error_out=False)
+    bills_pagination = keyset_paginate(
+        tenant_filter(Bill.query).options(joinedload(Bill.items)).filter_by(floor=floor, is_archived=False),
+        [Bill.bill_date.desc(), Bill.id.desc()],
+        cursor=request.args.get('bills_cursor'),
+        per_page=15,
+    )
     bills = bills_pagination.items
     
-    # Get ALL active bills for this floor (UNPAGINATED) - for Print Module
-    all_active_bills = tenant_filter(Bill.query).filter_by(
-        floor=floor, is_archived=False
-    ).order_by(Bill.bill_date.desc()).all()
-    
     # Get all archived bills for this floor (PAGINATED)
-    archived_page = request.args.get('archived_page', 1, type=int)
-    archived_pagination = tenant_filter(Bill.query).options(joinedload(Bill.items)).filter_by(
-        floor=floor, is_archived=True
-    ).order_by(Bill.bill_date.desc()).paginate(page=archived_page, per_page=15, error_out=False)
+    archived_pagination = keyset_paginate(
+        tenant_filter(Bill.query).options(joinedload(Bill.items)).filter_by(floor=floor, is_archived=True),
+        [Bill.bill_date.desc(), Bill.id.desc()],
+        cursor=request.args.get('archived_cursor'),
+        per_page=15,
+    )
     archived_bills = archived_pagination.items
     
     # Get budget history
@@ -201,8 +223,12 @@ def expenses():
             editable_budget_ids.append(current_manual_budget.id)
     
     # Legacy expenses for reference (PAGINATED)
-    legacy_page = request.args.get('legacy_page', 1, type=int)
-    legacy_pagination = tenant_filter(Expense.query).filter_by(floor=floor).order_by(Expense.date.desc()).paginate(page=legacy_page, per_page=15, error_out=False)
+    legacy_pagination = keyset_paginate(
+        tenant_filter(Expense.query).filter_by(floor=floor),
+        [Expense.date.desc(), Expense.id.desc()],
+        cursor=request.args.get('legacy_cursor'),
+        per_page=15,
+    )
     legacy_expenses = legacy_pagination.items
 
     # Get unique shop names for suggestions
@@ -238,7 +264,6 @@ def expenses():
         remaining_balance=remaining_balance,
         pending_procurements=pending_procurements,
         bills=bills,
-        all_active_bills=all_active_bills,
         bills_pagination=bills_pagination,
         archived_bills=archived_bills,
         archived_pagination=archived_pagination,
@@ -278,6 +303,68 @@ def _finance_report_storage_dir():
     return path
 
 
+PRINT_BILLS_PAGE_SIZE = 50
+PRINT_BILLS_MAX_PAGE_SIZE = 200
+PRINT_BILLS_MAX_IDS = 500
+
+
+def _print_bill_payload(bill):
+    return {
+        'id': bill.id,
+        'bill_no': bill.bill_no,
+        'bill_date': bill.bill_date.strftime('%Y-%m-%d'),
+        'bill_date_label': bill.bill_date.strftime('%d %b %Y'),
+        'shop_name': bill.shop_name,
+        'total_amount': float(bill.total_amount or 0),
+    }
+
+
+@finance_bp.route('/expenses/print-bills', methods=['GET'])
+def print_bills():
+    """
+    Active bills of the floor for the print module, newest first, one page at
+    a time. ``cursor`` continues after the previous page (keyset on
+    bill_date, id); ``start_date``/``end_date`` narrow the range; ``ids``
+    looks up specific bills instead of paging.
+    """
+    user = _require_user()
+    if not user or user.role not in ['admin', 'pantryHead']:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    floor = _get_active_floor(user)
+    query = tenant_filter(Bill.query).filter(Bill.floor == floor, Bill.is_archived.is_(False))
+
+    raw_ids = request.args.get('ids')
+    if raw_ids is not None:
+        try:
+            bill_ids = sorted({int(x) for x in raw_ids.split(',') if x.strip()})
+        except ValueError:
+            return jsonify({'error': 'Invalid bill selection'}), 400
+        if len(bill_ids) > PRINT_BILLS_MAX_IDS:
+            return jsonify({'error': f'At most {PRINT_BILLS_MAX_IDS} bills can be looked up at once.'}), 400
+        bills = query.filter(Bill.id.in_(bill_ids)).order_by(Bill.bill_date.desc(), Bill.id.desc()).all() if bill_ids else []
+        return jsonify({'bills': [_print_bill_payload(b) for b in bills], 'next_cursor': None})
+
+    try:
+        start_date = datetime.strptime(request.args['start_date'], '%Y-%m-%d').date() if request.args.get('start_date') else None
+        end_date = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date() if request.args.get('end_date') else None
+    except ValueError:
+        return jsonify({'error': 'Invalid date range'}), 400
+    if start_date:
+        query = query.filter(Bill.bill_date >= start_date)
+    if end_date:
+        query = query.filter(Bill.bill_date <= end_date)
+
+    limit = request.args.get('limit', PRINT_BILLS_PAGE_SIZE, type=int) or PRINT_BILLS_PAGE_SIZE
+    page = keyset_paginate(
+        query,
+        [Bill.bill_date.desc(), Bill.id.desc()],
+        cursor=request.args.get('cursor'),
+        per_page=max(1, min(limit, PRINT_BILLS_MAX_PAGE_SIZE)),
+    )
+    return jsonify({'bills': [_print_bill_payload(b) for b in page.items], 'next_cursor': page.next_cursor})
+
+
 @finance_bp.route('/expenses/print-reports/save', methods=['POST'])
 def save_print_report():
     user = _require_user()
@@ -492,13 +579,11 @@ def bulk_archive_bills():
         return jsonify({'error': 'No bill IDs provided'}), 400
 
     try:
-        bills = tenant_filter(Bill.query).filter(Bill.id.in_(bill_ids)).all()
-        archived_count = 0
-        for bill in bills:
-            # Floor check for PH
-            if user.role == 'admin' or bill.floor == user.floor:
-                bill.is_archived = True
-                archived_count += 1
+        criteria = [Bill.id.in_(bill_ids)]
+        # Floor check for PH
+        if user.role != 'admin':
+            criteria.append(Bill.floor == user.floor)
+        archived_count = bulk_set(Bill, {'is_archived': True}, *criteria)
         
         db.session.commit()
         if archived_count > 0:
@@ -522,16 +607,17 @@ def bulk_delete_permanent_bills():
         return jsonify({'error': 'No bill IDs provided'}), 400
 
     try:
-        bills = tenant_filter(Bill.query).filter(Bill.id.in_(bill_ids)).all()
-        deleted_count = 0
-        deleted_bill_nos = []
-        for bill in bills:
-            if user.role == 'admin' or bill.floor == user.floor:
-                deleted_bill_nos.append(bill.bill_no)
-                for item in bill.items:
-                    db.session.delete(item)
-                db.session.delete(bill)
-                deleted_count += 1
+        criteria = [Bill.id.in_(bill_ids)]
+        if user.role != 'admin':
+            criteria.append(Bill.floor == user.floor)
+        target_bill_ids = tenant_filter(db.session.query(Bill.id)).filter(*criteria)
+        invalidate_budget_snapshots_for_bills(
+            tenant_filter(db.session.query(Bill.floor, Bill.bill_date, Bill.report_submission_id)).filter(*criteria).all()
+        )
+        bulk_delete(ProcurementItem, ProcurementItem.bill_id.in_(target_bill_ids.scalar_subquery()))
+        deleted = bulk_delete(Bill, *criteria, returning=[Bill.bill_no])
+        deleted_count = len(deleted)
+        deleted_bill_nos = [bill_no for bill_no, in deleted]
 
         if deleted_count > 0:
             log_tenant_audit(
@@ -574,6 +660,7 @@ def delete_bill(bill_id):
         details={'floor': bill.floor, 'total_amount': float(bill.total_amount or 0)},
         actor_user=user,
     )
+    invalidate_budget_snapshots_for_bills([bill])
     db.session.delete(bill)
     db.session.commit()
     _clear_dashboard_cache(getattr(g, 'tenant_id', None), bill.floor)
@@ -602,6 +689,7 @@ def delete_bill_permanent(bill_id):
         details={'floor': bill.floor, 'total_amount': float(bill.total_amount or 0)},
         actor_user=user,
     )
+    invalidate_budget_snapshots_for_bills([bill])
     db.session.delete(bill)
     db.session.commit()
     flash('Bill and all its associated items have been permanently deleted.', 'success')
@@ -645,6 +733,7 @@ def atomic_reconcile():
         # Or if we want the bill to reflect the sum of its items
         current_total = tenant_filter(db.session.query(func.sum(ProcurementItem.actual_cost))).filter(ProcurementItem.bill_id == bill.id).scalar() or 0
         bill.total_amount = current_total
+        invalidate_budget_snapshots_for_bills([bill])
         
         db.session.commit()
         _clear_dashboard_cache(getattr(g, 'tenant_id', None), bill.floor)
@@ -689,6 +778,14 @@ def atomic_reconcile_full():
     if not data:
         return jsonify({'error': 'No data provided'}), 400
 
+    try:
+        reconciliations = [
+            (int(rec.get('procurement_id')), float(rec.get('cost') or 0))
+            for rec in data.get('reconciliations', [])
+        ]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid procurement item in reconciliation.'}), 400
+
     floor = _get_active_floor(user)
     try:
         bill_date_str = data.get('bill_date')
@@ -709,33 +806,38 @@ def atomic_reconcile_full():
         db.session.flush()
 
         # 2. Create NEW ProcurementItems
-        for item_data in data.get('new_items', []):
-            item = ProcurementItem(
-                item_name=item_data.get('name'),
-                quantity=item_data.get('quantity'),
-                category='other',
-                priority='medium',
-                status='completed',
-                floor=floor,
-                created_by_id=user.id,
-                actual_cost=item_data.get('cost'),
-                expense_recorded_at=datetime.utcnow(),
-                bill_id=bill.id,
-                tenant_id=getattr(g, 'tenant_id', None)
-            )
-            db.session.add(item)
+        recorded_at = datetime.utcnow()
+        bulk_insert(ProcurementItem, [
+            {
+                'item_name': item_data.get('name'),
+                'quantity': item_data.get('quantity'),
+                'category': 'other',
+                'priority': 'medium',
+                'status': 'completed',
+                'floor': floor,
+                'created_by_id': user.id,
+                'actual_cost': item_data.get('cost'),
+                'expense_recorded_at': recorded_at,
+                'bill_id': bill.id,
+            }
+            for item_data in data.get('new_items', [])
+        ])
 
         # 3. Reconcile EXISTING ProcurementItems
-        for rec in data.get('reconciliations', []):
-            proc_id = rec.get('procurement_id')
-            cost = float(rec.get('cost') or 0)
-            
-            item = tenant_filter(ProcurementItem.query).filter_by(id=proc_id).first()
-            if item and (user.role == 'admin' or item.floor == floor):
-                item.actual_cost = cost
-                item.bill_id = bill.id
-                item.status = 'completed'
-                item.expense_recorded_at = datetime.utcnow()
+        bulk_update(
+            ProcurementItem,
+            [
+                {
+                    'id': procurement_id,
+                    'actual_cost': cost,
+                    'bill_id': bill.id,
+                    'status': 'completed',
+                    'expense_recorded_at': recorded_at,
+                }
+                for procurement_id, cost in reconciliations
+            ],
+            where=[] if user.role == 'admin' else [ProcurementItem.floor == floor],
+        )
 
         # 4. Final Total Sync
         db.session.flush() # Ensure all items have costs applied
@@ -747,6 +849,7 @@ def atomic_reconcile_full():
         else:
             final_total = tenant_filter(db.session.query(func.sum(ProcurementItem.actual_cost))).filter(ProcurementItem.bill_id == bill.id).scalar() or 0
             bill.total_amount = final_total
+        invalidate_budget_snapshots(floor, since=bill_date)
 
         db.session.commit()
         _clear_dashboard_cache(getattr(g, 'tenant_id', None), floor)
@@ -796,6 +899,7 @@ def add_budget():
         details={'floor': floor, 'amount': amount, 'start_date': str(start_date), 'end_date': str(end_date) if end_date else None},
         actor_user=user,
     )
+    invalidate_budget_snapshots(floor, since=start_date)
     db.session.commit()
     _clear_dashboard_cache(getattr(g, 'tenant_id', None), floor)
     flash('Manual budget allocation added.', 'success')
@@ -825,6 +929,7 @@ def delete_budget(budget_id):
         details={'floor': budget.floor, 'amount': float(budget.amount_allocated or 0)},
         actor_user=user,
     )
+    invalidate_budget_snapshots(budget.floor, since=budget.start_date)
     db.session.delete(budget)
     db.session.commit()
     _clear_dashboard_cache(getattr(g, 'tenant_id', None), budget.floor)
@@ -880,6 +985,7 @@ def update_budget(budget_id):
         flash('End date must be after the start date.', 'error')
         return redirect(url_for('finance.expenses'))
 
+    invalidate_budget_snapshots(budget.floor, since=min(budget.start_date, start_date))
     budget.start_date = start_date
     budget.end_date = end_date
     budget.notes = (request.form.get('notes') or '').strip() or None
@@ -920,6 +1026,7 @@ def delete_expense(expense_id):
         details={'floor': expense.floor, 'amount': float(expense.amount or 0)},
         actor_user=user,
     )
+    invalidate_budget_snapshots(expense.floor, since=expense.date)
     db.session.delete(expense)
     db.session.commit()
     _clear_dashboard_cache(getattr(g, 'tenant_id', None), expense.floor)
@@ -1051,11 +1158,11 @@ def _receipt_import_stall_seconds():
         return 90
 
 
-def _receipt_temp_file_ttl_seconds():
+def _receipt_import_sse_seconds():
     try:
-        return int(current_app.config.get("RECEIPT_TEMP_FILE_TTL_SECONDS") or 300)
+        return int(current_app.config.get("RECEIPT_IMPORT_SSE_SECONDS") or 60)
     except Exception:
-        return 300
+        return 60
 
 
 def _receipt_import_async_enabled():
@@ -1067,23 +1174,6 @@ def _receipt_temp_dir():
     return os.path.join(current_app.root_path, 'tmp', 'receipts')
 
 
-def _cleanup_old_receipt_files(temp_dir=None):
-    temp_dir = temp_dir or _receipt_temp_dir()
-    ttl_seconds = _receipt_temp_file_ttl_seconds()
-    now = time.time()
-
-    if ttl_seconds <= 0 or not os.path.isdir(temp_dir):
-        return
-
-    for entry in os.scandir(temp_dir):
-        try:
-            if entry.is_file() and now - entry.stat().st_mtime > ttl_seconds:
-                os.remove(entry.path)
-                logging.info("Deleted stale receipt temp file: %s", entry.path)
-        except Exception as exc:
-            logging.warning("Unable to delete stale receipt temp file %s: %s", getattr(entry, "path", "unknown"), exc)
-
-
 def _job_failure_message(job):
     result = getattr(job, "result", None)
     if isinstance(result, dict) and result.get("error"):
@@ -1113,7 +1203,7 @@ def _job_payload(job, status):
     }
 
 
-def _process_receipt_inline(file, mime_type):
+def _process_receipt_inline(file, mime_type, digest=None):
     text = ParserFactory.get_text(file.stream, mime_type)
     if text == "ERROR_TESSERACT_NOT_FOUND":
         return jsonify({'error': 'OCR Engine (Tesseract) is not installed on the server.'}), 500
@@ -1128,14 +1218,16 @@ def _process_receipt_inline(file, mime_type):
         return jsonify({'error': 'Failed to parse extracted text.'}), 500
 
     data = receipt_data.to_dict()
+    store_cached_receipt(digest, data)
     data['filename'] = file.filename
     return jsonify(data)
 
 
+# Single and batch imports draw from one budget; a whole batch counts once.
 @finance_bp.route('/expenses/import-receipt', methods=['POST'])
-@limiter.limit("3 per minute", key_func=current_user_or_ip_key, methods=["POST"])
-@limiter.limit("15 per hour", key_func=current_user_or_ip_key, methods=["POST"])
-@limiter.limit("40 per day", key_func=current_user_or_ip_key, methods=["POST"])
+@limiter.shared_limit("3 per minute", scope="receipt-import", key_func=current_user_or_ip_key, methods=["POST"])
+@limiter.shared_limit("15 per hour", scope="receipt-import", key_func=current_user_or_ip_key, methods=["POST"])
+@limiter.shared_limit("40 per day", scope="receipt-import", key_func=current_user_or_ip_key, methods=["POST"])
 def import_receipt():
     user = _require_user()
     if not user or user.role not in ['admin', 'pantryHead']:
@@ -1162,8 +1254,16 @@ def import_receipt():
         return jsonify({'error': f"Unsupported file type: {mime_type}"}), 400
 
     try:
+        # Re-uploads of the same bytes skip OCR and the queue entirely.
+        digest = content_hash(file.read())
+        file.seek(0)
+        cached = get_cached_receipt(digest)
+        if cached is not None:
+            cached['filename'] = file.filename
+            logging.info("Receipt import served from cache: hash=%s filename=%s", digest[:12], file.filename)
+            return jsonify(cached)
+
         temp_dir = _receipt_temp_dir()
-        _cleanup_old_receipt_files(temp_dir)
 
         # Check if RQ is available
         if _receipt_import_async_enabled() and hasattr(current_app, 'task_queue') and current_app.task_queue:
@@ -1183,6 +1283,7 @@ def import_receipt():
                     temp_path,
                     mime_type,
                     file.filename,
+                    digest,
                     job_id=task_id,
                     job_timeout=180,
                     result_ttl=3600,
@@ -1193,16 +1294,159 @@ def import_receipt():
                     os.remove(temp_path)
                 raise
 
+            publish_import_event(current_app.task_queue.connection, task_id, 'queued')
             logging.info("Receipt import enqueued: task_id=%s filename=%s", task_id, file.filename)
             
             return jsonify({'status': 'processing', 'task_id': task_id})
         
         # Sync Fallback
-        return _process_receipt_inline(file, mime_type)
+        return _process_receipt_inline(file, mime_type, digest)
     except Exception:
         logging.exception("Receipt Import Error")
         return jsonify({'error': "Failed to parse receipt."}), 500
 
+@finance_bp.route('/expenses/import-receipts/batch', methods=['POST'])
+@limiter.shared_limit("3 per minute", scope="receipt-import", key_func=current_user_or_ip_key, methods=["POST"])
+@limiter.shared_limit("15 per hour", scope="receipt-import", key_func=current_user_or_ip_key, methods=["POST"])
+@limiter.shared_limit("40 per day", scope="receipt-import", key_func=current_user_or_ip_key, methods=["POST"])
+def import_receipt_batch():
+    """Imports several receipts (files and/or zips) as one group of background jobs."""
+    user = _require_user()
+    if not user or user.role not in ['admin', 'pantryHead']:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    queue = getattr(current_app, 'task_queue', None)
+    if not queue or not _receipt_import_async_enabled():
+        return jsonify({'error': 'Background processing not configured'}), 400
+
+    # Set before the body is parsed; larger uploads are refused unread.
+    request.max_content_length = MAX_BATCH_REQUEST_BYTES
+    try:
+        entries = collect_batch_files(request.files.getlist('files'))
+    except RequestEntityTooLarge:
+        return jsonify({'error': 'Batch exceeds the 60MB total upload limit.'}), 413
+    except BatchUploadError as exc:
+        return jsonify({'error': str(exc)}), 400
+
+    try:
+        from rq import Queue
+
+        batch_id = str(uuid.uuid4())
+        temp_dir = batch_temp_dir(_receipt_temp_dir(), batch_id)
+        files, job_datas = [], []
+        for entry in entries:
+            if entry.get('error'):
+                files.append({'filename': entry['filename'], 'status': 'failed', 'error': entry['error']})
+                continue
+
+            digest = content_hash(entry['content'])
+            cached = get_cached_receipt(digest)
+            if cached is not None:
+                cached['filename'] = entry['filename']
+                files.append({'filename': entry['filename'], 'status': 'completed', 'data': cached})
+                continue
+
+            task_id = str(uuid.uuid4())
+            os.makedirs(temp_dir, exist_ok=True)
+            temp_path = os.path.join(temp_dir, f"{task_id}_{secure_filename(entry['filename']) or 'receipt'}")
+            with open(temp_path, 'wb') as handle:
+                handle.write(entry['content'])
+
+            files.append({'filename': entry['filename'], 'status': 'queued', 'task_id': task_id})
+            job_datas.append(Queue.prepare_data(
+                'blueprints.finance.workers._process_receipt_worker',
+                args=(temp_path, entry['mime_type'], entry['filename'], digest),
+                job_id=task_id,
+                timeout=180,
+                result_ttl=BATCH_TTL_SECONDS,
+                failure_ttl=BATCH_TTL_SECONDS,
+                meta={'batch_id': batch_id},
+            ))
+
+        if job_datas:
+            # One round trip for the whole group; idle workers pick the jobs up concurrently.
+            queue.enqueue_many(job_datas, group_id=batch_id)
+        batch = save_batch(queue.connection, batch_id, user.id, user.tenant_id, files)
+    except Exception:
+        logging.exception("Receipt batch import error")
+        return jsonify({'error': 'Failed to queue receipt batch.'}), 500
+
+    logging.info(
+        "Receipt batch enqueued: batch_id=%s files=%s jobs=%s",
+        batch_id,
+        len(files),
+        len(job_datas),
+    )
+    return jsonify(summarize_batch(batch, files)), 202
+
+
+def _batch_file_status(entry, job):
+    if not entry.get('task_id') or entry.get('status') in ('completed', 'failed'):
+        return entry
+
+    status = dict(entry)
+    if job is None:
+        status.update({'status': 'failed', 'error': 'JOB_EXPIRED'})
+    elif job.is_finished:
+        result = job.result
+        if isinstance(result, dict) and 'error' in result:
+            status.update({'status': 'failed', 'error': result['error']})
+        else:
+            status.update({'status': 'completed', 'data': result})
+    elif job.is_failed:
+        status.update({'status': 'failed', 'error': _job_failure_message(job)})
+    else:
+        status['status'] = 'processing' if _job_status_value(job) == 'started' else 'queued'
+    return status
+
+
+@finance_bp.route('/expenses/import-receipts/batch/<batch_id>', methods=['GET'])
+def receipt_batch_status(batch_id):
+    """Aggregate status of a receipt batch with per-file results."""
+    user = _require_user()
+    if not user or user.role not in ['admin', 'pantryHead']:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    queue = getattr(current_app, 'task_queue', None)
+    if not queue:
+        return jsonify({'error': 'Background processing not configured'}), 400
+
+    batch = load_batch(queue.connection, batch_id)
+    if not batch or not batch_owned_by(batch, user.id, user.tenant_id):
+        return jsonify({'status': 'not_found'}), 404
+
+    from rq.job import Job
+
+    task_ids = [entry['task_id'] for entry in batch['files'] if entry.get('task_id')]
+    jobs = dict(zip(task_ids, Job.fetch_many(task_ids, connection=queue.connection))) if task_ids else {}
+    files = [_batch_file_status(entry, jobs.get(entry.get('task_id'))) for entry in batch['files']]
+    return jsonify(summarize_batch(batch, files))
+
+
+@finance_bp.route('/expenses/import-events/<task_id>', methods=['GET'])
+def import_events(task_id):
+    """Streams receipt import stages as Server-Sent Events; import-status remains the fallback."""
+    user = _require_user()
+    if not user or user.role not in ['admin', 'pantryHead']:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    if not hasattr(current_app, 'task_queue') or not current_app.task_queue:
+        return jsonify({'error': 'Background processing not configured'}), 400
+
+    if not current_app.task_queue.fetch_job(task_id):
+        return jsonify({'status': 'not_found'}), 404
+
+    stream = stream_import_events(
+        current_app.task_queue.connection,
+        task_id,
+        max_seconds=_receipt_import_sse_seconds(),
+    )
+    return Response(
+        stream,
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
 @finance_bp.route('/expenses/import-status/<task_id>', methods=['GET'])
 def check_import_status(task_id):
     """Checks the status of an async receipt processing task."""
@@ -1287,21 +1531,23 @@ def save_imported_bill():
         db.session.add(bill)
         db.session.flush()
 
-        for item_data in data.get('items', []):
-            item = ProcurementItem(
-                item_name=item_data.get('name'),
-                quantity=item_data.get('quantity'),
-                category='other',
-                priority='medium',
-                status='completed',
-                floor=floor,
-                created_by_id=user.id,
-                actual_cost=item_data.get('cost'),
-                expense_recorded_at=datetime.utcnow(),
-                bill_id=bill.id,
-                tenant_id=getattr(g, 'tenant_id', None)
-            )
-            db.session.add(item)
+        recorded_at = datetime.utcnow()
+        bulk_insert(ProcurementItem, [
+            {
+                'item_name': item_data.get('name'),
+                'quantity': item_data.get('quantity'),
+                'category': 'other',
+                'priority': 'medium',
+                'status': 'completed',
+                'floor': floor,
+                'created_by_id': user.id,
+                'actual_cost': item_data.get('cost'),
+                'expense_recorded_at': recorded_at,
+                'bill_id': bill.id,
+            }
+            for item_data in data.get('items', [])
+        ])
+        invalidate_budget_snapshots(floor, since=bill_date)
 
         db.session.commit()
         _clear_dashboard_cache(getattr(g, 'tenant_id', None), floor)
@@ -9,34 +9,36 @@ tesseract_cmd = os.getenv('TESSERACT_CMD')
 if tesseract_cmd:
     pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
 
+# Resolution Tesseract is fed at, in both directions (phone photos are
+# downscaled, small screenshots upscaled).
+OCR_TARGET_DPI = int(os.getenv('OCR_TARGET_DPI', '300'))
+
+# Without a usable DPI the scale comes from the height of the text lines:
+# receipt and invoice print (8-10pt) is about this many pixels tall at
+# OCR_TARGET_DPI. Too few lines to measure only ever downscales, to an
+# A4 page's long edge.
+TARGET_TEXT_HEIGHT_PX = 32
+MIN_TEXT_LINES = 3
+MAX_LONG_EDGE_PX = int(11.69 * OCR_TARGET_DPI)
+TALL_RECEIPT_ASPECT = 1.8
+
+PROBE_WIDTH = 600
+DESKEW_MAX_ANGLE = 5
+DESKEW_STEP = 1
+
+
 class OCRService:
     @staticmethod
     def extract_text(file_stream):
         """
-        Extracts text from an image file stream using Tesseract OCR with balanced preprocessing.
+        Extracts text from an image file stream using a single Tesseract pass
+        over an adaptively preprocessed image.
         """
         try:
             image = Image.open(file_stream)
-            
-            # 1. Convert to grayscale
-            image = ImageOps.grayscale(image)
-            
-            # 2. Balanced contrast enhancement
-            image = ImageEnhance.Contrast(image).enhance(1.8)
-            
-            # 3. Resize only if small
-            if image.width < 1500:
-                scale = 2000 / image.width
-                new_size = (int(image.width * scale), int(image.height * scale))
-                image = image.resize(new_size, Image.Resampling.LANCZOS)
-
-            # 4. Use psm 3 for standard layout, fallback to 6
-            text = pytesseract.image_to_string(image, config='--psm 3')
-            
-            if len(text.strip()) < 20:
-                text = pytesseract.image_to_string(image, config='--psm 6')
-                
-            return text
+            image = OCRService.preprocess(image)
+            psm = OCRService.choose_psm(image)
+            return pytesseract.image_to_string(image, config=f'--psm {psm}')
         except pytesseract.TesseractNotFoundError:
             logging.error("OCR Error: Tesseract binary not found. Please install Tesseract OCR on the system.")
             return "ERROR_TESSERACT_NOT_FOUND"
@@ -50,3 +52,164 @@ class OCRService:
         Extracts text from image bytes.
         """
         return OCRService.extract_text(io.BytesIO(file_bytes))
+
+    @staticmethod
+    def preprocess(image):
+        """
+        Orientation, grayscale, crop to the receipt, deskew, then normalize to
+        ``OCR_TARGET_DPI``. Crop and deskew are measured on a small probe so
+        full-size phone photos are only resampled once.
+        """
+        source_dpi = OCRService._usable_dpi(image)
+        image = ImageOps.exif_transpose(image)
+        image = ImageOps.grayscale(image)
+
+        image = OCRService._crop_to_receipt(image)
+        angle = OCRService._skew_angle(image)
+        if angle:
+            image = image.rotate(angle, resample=Image.Resampling.BICUBIC, expand=True, fillcolor=255)
+
+        scale = OCRService._dpi_scale(image, source_dpi)
+        if abs(scale - 1.0) > 0.05:
+            new_size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+            image = image.resize(new_size, Image.Resampling.LANCZOS)
+
+        return ImageEnhance.Contrast(image).enhance(1.8)
+
+    @staticmethod
+    def choose_psm(image):
+        """
+        Page-segmentation mode from a cheap layout probe: tall till rolls are
+        one column of variable-size lines (psm 4), wide pages get automatic
+        segmentation (psm 3). When the probe strip reads poorly under the
+        layout guess, uniform-block mode (psm 6) is tried on the strip too
+        and the more confident mode wins.
+        """
+        is_tall = image.height / max(1, image.width) >= TALL_RECEIPT_ASPECT
+        primary = 4 if is_tall else 3
+
+        strip = image.crop((0, 0, image.width, min(image.height, max(400, image.height // 3))))
+        primary_score = OCRService._probe_confidence(strip, primary)
+        if primary_score >= 70:
+            return primary
+        return 6 if OCRService._probe_confidence(strip, 6) > primary_score else primary
+
+    @staticmethod
+    def _probe_confidence(image, psm):
+        data = pytesseract.image_to_data(image, config=f'--psm {psm}', output_type=pytesseract.Output.DICT)
+        confidences = [
+            float(conf) for conf, word in zip(data.get('conf', []), data.get('text', []))
+            if str(word).strip() and float(conf) >= 0
+        ]
+        if not confidences:
+            return 0.0
+        # Few confident words is worse than many decent ones.
+        return sum(confidences) / len(confidences) * min(1.0, len(confidences) / 10)
+
+    @staticmethod
+    def _usable_dpi(image):
+        dpi = image.info.get('dpi')
+        try:
+            value = float(dpi[0]) if isinstance(dpi, (tuple, list)) else float(dpi)
+        except (TypeError, ValueError):
+            return None
+        # Phones and screenshots report 72/96, which says nothing about print size.
+        return value if 150 <= value <= 1200 else None
+
+    @staticmethod
+    def _dpi_scale(image, source_dpi):
+        if source_dpi:
+            scale = OCR_TARGET_DPI / source_dpi
+        else:
+            text_height = OCRService._text_line_height(image)
+            if text_height:
+                scale = TARGET_TEXT_HEIGHT_PX / text_height
+            else:
+                scale = 1.0
+            scale = min(scale, MAX_LONG_EDGE_PX / max(1, image.width, image.height))
+        return min(4.0, max(0.25, scale))
+
+    @staticmethod
+    def _text_line_height(image):
+        """
+        Median height in pixels of the text lines, from runs of inked rows in
+        the probe's row profile; None when too few lines stand out.
+        """
+        probe, scale = OCRService._probe(image)
+        binary = ImageOps.invert(ImageOps.autocontrast(probe)).point(lambda level: 255 if level > 128 else 0)
+        rows = list(binary.resize((1, binary.height), Image.Resampling.BOX).getdata())
+        # A row belongs to a line when a few percent of it is ink.
+        inked = [value > 255 * 0.03 for value in rows] + [False]
+
+        heights, run = [], 0
+        for is_inked in inked:
+            if is_inked:
+                run += 1
+                continue
+            # One- or two-row runs are rules and speckle, not text.
+            if run > 2:
+                heights.append(run)
+            run = 0
+        if len(heights) < MIN_TEXT_LINES:
+            return None
+        heights.sort()
+        return heights[len(heights) // 2] / scale
+
+    @staticmethod
+    def _probe(image):
+        scale = PROBE_WIDTH / max(1, image.width)
+        if scale >= 1:
+            return image.copy(), 1.0
+        size = (PROBE_WIDTH, max(1, int(image.height * scale)))
+        return image.resize(size, Image.Resampling.BILINEAR), scale
+
+    @staticmethod
+    def _crop_to_receipt(image):
+        """Crop to the bright paper region when a photo includes the table or hand around it."""
+        probe, scale = OCRService._probe(image)
+        histogram = probe.histogram()
+        total = sum(histogram) or 1
+        mean = sum(level * count for level, count in enumerate(histogram)) / total
+        mask = probe.point(lambda level: 255 if level > mean else 0)
+        bbox = mask.getbbox()
+        if not bbox:
+            return image
+
+        left, top, right, bottom = bbox
+        area_ratio = ((right - left) * (bottom - top)) / float(probe.width * probe.height)
+        if area_ratio > 0.92 or area_ratio < 0.2:
+            # Already tight, or the mask caught noise rather than the receipt.
+            return image
+
+        margin = 8
+        box = (
+            max(0, int((left - margin) / scale)),
+            max(0, int((top - margin) / scale)),
+            min(image.width, int((right + margin) / scale)),
+            min(image.height, int((bottom + margin) / scale)),
+        )
+        return image.crop(box)
+
+    @staticmethod
+    def _skew_angle(image):
+        """
+        Small-angle skew by projection profile: text rows are sharpest (highest
+        row-sum variance) when the lines are horizontal.
+        """
+        probe, _ = OCRService._probe(image)
+        binary = ImageOps.invert(ImageOps.autocontrast(probe)).point(lambda level: 255 if level > 128 else 0)
+
+        def row_variance(angle):
+            rotated = binary.rotate(angle, resample=Image.Resampling.NEAREST, expand=False, fillcolor=0)
+            rows = list(rotated.resize((1, rotated.height), Image.Resampling.BOX).getdata())
+            mean = sum(rows) / max(1, len(rows))
+            return sum((value - mean) ** 2 for value in rows)
+
+        best_angle, best_score = 0, row_variance(0)
+        for angle in range(-DESKEW_MAX_ANGLE, DESKEW_MAX_ANGLE + 1, DESKEW_STEP):
+            if angle == 0:
+                continue
+            score = row_variance(angle)
+            if score > best_score * 1.02:
+                best_angle, best_score = angle, score
+        return best_angle
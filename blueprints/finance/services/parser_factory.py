@@ -1,8 +1,17 @@
 import logging
 import io
+import os
 from .pdf_service import PDFService
 from .ocr_service import OCRService
-from .receipt_parser import DMartParser, GenericParser, BlinkitParser
+from .parser_registry import load_parser_plugins, registry
+from . import receipt_parser  # noqa: F401 - registers the built-in vendor parsers
+
+# Extra vendor parsers: comma-separated module paths that use @register_parser.
+load_parser_plugins(os.getenv('RECEIPT_PARSER_PLUGINS', ''))
+
+# Bump whenever text extraction or parsing output changes, so cached import
+# results from older parsers are no longer served.
+PARSER_VERSION = "3"
 
 class ParserFactory:
     @staticmethod
@@ -11,7 +20,7 @@ class ParserFactory:
         Detects file type and extracts text using PDF or OCR service.
         """
         if mime_type == 'application/pdf':
-            return PDFService.extract_text(file_stream)
+            return PDFService.extract_text(file_stream, is_complete=ParserFactory.has_required_fields)
         elif mime_type.startswith('image/'):
             text = OCRService.extract_text(file_stream)
             return text
@@ -22,23 +31,25 @@ class ParserFactory:
     @staticmethod
     def get_parser(text):
         """
-        Detects the store template based on text content and returns the appropriate parser.
+        Returns the vendor parser whose signatures score highest in ``text``
+        (see ParserRegistry), or the generic parser when none match.
         """
-        text_upper = text.upper()
-        
-        # D-Mart detection
-        if "AVENUE E-COMMERCE" in text_upper or "DMART" in text_upper or "ORDER NUMBER" in text_upper:
-            return DMartParser()
-        
-        # Blinkit / Grofers detection
-        if "BLINKIT" in text_upper or "GROFERS" in text_upper or "BIGWAY MARKETING" in text_upper or "BLINK COMMERCE" in text_upper:
-            return BlinkitParser()
-        
-        # Add more store detections here
-        # elif "RELIANCE" in text_upper:
-        #     return RelianceParser()
-            
-        return GenericParser()
+        return registry.parser_for(text)
+
+    @staticmethod
+    def has_required_fields(text):
+        """
+        True once the parser for ``text`` finds bill number, date and total and
+        the items read so far add up to that total, so later pages can be skipped.
+        """
+        try:
+            data = ParserFactory.get_parser(text).parse(text)
+        except Exception:
+            return False
+        if not (data and data.bill_no and data.bill_date and data.total_amount):
+            return False
+        items_total = sum(item.get('cost') or 0 for item in data.items)
+        return abs(items_total - data.total_amount) <= max(1.0, data.total_amount * 0.01)
 
     @staticmethod
     def process_receipt(file_stream, mime_type):
@@ -0,0 +1,104 @@
+import importlib
+import logging
+import re
+
+
+class ParserRegistry:
+    """
+    Vendor parsers keyed by text signatures.
+
+    All signatures are compiled into one alternation, so choosing a parser is a
+    single scan of the receipt text. Each distinct signature found adds its
+    weight to its parser's score; the highest score wins, ties go to the
+    parser registered first, and the fallback parser is used when nothing
+    matches.
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._signature_owner = []
+        self._pattern = None
+        self.fallback = None
+
+    def register(self, parser_cls, signatures):
+        """
+        Register ``parser_cls`` for ``signatures``: a mapping of literal text
+        (matched case-insensitively) to weight, or an iterable of literals with
+        weight 1.
+        """
+        if not isinstance(signatures, dict):
+            signatures = {signature: 1 for signature in signatures}
+        self._entries = [entry for entry in self._entries if entry[0] is not parser_cls]
+        self._entries.append((parser_cls, dict(signatures)))
+        self._compile()
+        return parser_cls
+
+    def parser(self, signatures):
+        """Class decorator form of :meth:`register`."""
+        def decorator(parser_cls):
+            return self.register(parser_cls, signatures)
+        return decorator
+
+    def set_fallback(self, parser_cls):
+        self.fallback = parser_cls
+        return parser_cls
+
+    def _compile(self):
+        alternatives = []
+        self._signature_owner = []
+        for index, (_, signatures) in enumerate(self._entries):
+            for signature, weight in signatures.items():
+                group = f"s{len(self._signature_owner)}"
+                alternatives.append(f"(?P<{group}>{re.escape(signature)})")
+                self._signature_owner.append((index, signature.upper(), weight))
+        self._pattern = re.compile("|".join(alternatives), re.IGNORECASE) if alternatives else None
+
+    def scores(self, text):
+        """Score per registered parser class for ``text``."""
+        scores = {parser_cls: 0 for parser_cls, _ in self._entries}
+        if not self._pattern or not text:
+            return scores
+
+        seen = set()
+        for match in self._pattern.finditer(text):
+            owner = self._signature_owner[int(match.lastgroup[1:])]
+            if owner in seen:
+                continue
+            seen.add(owner)
+            index, _, weight = owner
+            scores[self._entries[index][0]] += weight
+        return scores
+
+    def parser_for(self, text):
+        best_cls, best_score = None, 0
+        for parser_cls, score in self.scores(text).items():
+            if score > best_score:
+                best_cls, best_score = parser_cls, score
+        parser_cls = best_cls or self.fallback
+        return parser_cls() if parser_cls else None
+
+    def parser_classes(self):
+        return [parser_cls for parser_cls, _ in self._entries]
+
+
+registry = ParserRegistry()
+register_parser = registry.parser
+
+
+def load_parser_plugins(module_names):
+    """
+    Import vendor parser plugin modules (comma-separated string or list); each
+    registers itself with ``@register_parser(...)`` on import.
+    """
+    if isinstance(module_names, str):
+        module_names = module_names.split(",")
+    loaded = []
+    for name in (name.strip() for name in module_names or []):
+        if not name:
+            continue
+        try:
+            importlib.import_module(name)
+            loaded.append(name)
+        except Exception:
+            logging.exception("Unable to load receipt parser plugin: %s", name)
+    return loaded
@@ -1,21 +1,79 @@
 import pdfplumber
 import io
 import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Processes used for long multi-page invoices (1 disables the pool).
+PDF_EXTRACT_WORKERS = int(os.getenv('PDF_EXTRACT_WORKERS', str(min(4, os.cpu_count() or 1))))
+# Shorter PDFs are read in-process: pool start-up and pickling the document
+# cost more than the pages save.
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '6'))
+# Pages each worker task reads from one open of the document.
+PDF_PAGES_PER_TASK = max(1, int(os.getenv('PDF_PAGES_PER_TASK', '2')))
+
+_pool = None
+
+
+def _get_pool():
+    # Created once per process and reused across documents.
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PDF_EXTRACT_WORKERS)
+    return _pool
+
+
+def _discard_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _page_text(page):
+    """Text of one page: the text layer when there is one, otherwise OCR of the rasterized page."""
+    from .ocr_service import OCR_TARGET_DPI, OCRService
+
+    if page.chars:
+        return page.extract_text(layout=True) or ""
+
+    # Scanned page: no text layer to read.
+    image = page.to_image(resolution=OCR_TARGET_DPI).original
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', dpi=(OCR_TARGET_DPI, OCR_TARGET_DPI))
+    buffer.seek(0)
+    return OCRService.extract_text(buffer)
+
+
+def _page_range_text(pdf_bytes, start, stop):
+    """Texts of pages ``start``..``stop - 1``. Module-level so it can run in a worker process."""
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        return [_page_text(pdf.pages[page_index]) for page_index in range(start, stop)]
+
 
 class PDFService:
     @staticmethod
-    def extract_text(file_stream):
+    def extract_text(file_stream, is_complete=None):
         """
-        Extracts text from a PDF file stream using pdfplumber.
+        Extracts text from a PDF file stream using pdfplumber, OCRing pages that
+        have no text layer. Pages are processed in order and ``is_complete(text)``
+        may end extraction early. PDFs of ``PDF_PARALLEL_MIN_PAGES`` or more are
+        split into page ranges read by a shared process pool.
         """
         try:
-            full_text = ""
-            with pdfplumber.open(file_stream) as pdf:
-                for page in pdf.pages:
-                    text = page.extract_text(layout=True)
-                    if text:
-                        full_text += text + "\n"
-            return full_text
+            pdf_bytes = file_stream.read()
+            with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+                page_count = len(pdf.pages)
+                if PDF_EXTRACT_WORKERS <= 1 or page_count < PDF_PARALLEL_MIN_PAGES:
+                    return PDFService._extract_sequential(pdf, is_complete)
+            try:
+                return PDFService._extract_parallel(pdf_bytes, page_count, is_complete)
+            except BrokenProcessPool:
+                logging.warning("PDF extraction pool broke; reading pages in-process")
+                _discard_pool()
+                with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+                    return PDFService._extract_sequential(pdf, is_complete)
         except Exception as e:
             logging.error(f"PDF Extraction Error: {str(e)}")
             return ""
@@ -26,3 +84,48 @@ class PDFService:
         Extracts text from PDF bytes.
         """
         return PDFService.extract_text(io.BytesIO(file_bytes))
+
+    @staticmethod
+    def _join(page_texts):
+        tesseract_missing = False
+        parts = []
+        for text in page_texts:
+            if text == "ERROR_TESSERACT_NOT_FOUND":
+                tesseract_missing = True
+            elif text:
+                parts.append(text + "\n")
+        if not parts and tesseract_missing:
+            return "ERROR_TESSERACT_NOT_FOUND"
+        return "".join(parts)
+
+    @staticmethod
+    def _extract_sequential(pdf, is_complete):
+        page_count = len(pdf.pages)
+        page_texts = []
+        for page_index, page in enumerate(pdf.pages):
+            page_texts.append(_page_text(page))
+            text = PDFService._join(page_texts)
+            if is_complete and page_index < page_count - 1 and is_complete(text):
+                logging.info("PDF extraction stopped early after %s of %s pages", page_index + 1, page_count)
+                return text
+        return PDFService._join(page_texts)
+
+    @staticmethod
+    def _extract_parallel(pdf_bytes, page_count, is_complete):
+        pool = _get_pool()
+        window_size = PDF_EXTRACT_WORKERS * PDF_PAGES_PER_TASK
+        page_texts = []
+        for start in range(0, page_count, window_size):
+            stop = min(start + window_size, page_count)
+            futures = [
+                pool.submit(_page_range_text, pdf_bytes, task_start, min(task_start + PDF_PAGES_PER_TASK, stop))
+                for task_start in range(start, stop, PDF_PAGES_PER_TASK)
+            ]
+            for future in futures:
+                page_texts.extend(future.result())
+
+            text = PDFService._join(page_texts)
+            if is_complete and stop < page_count and is_complete(text):
+                logging.info("PDF extraction stopped early after %s of %s pages", stop, page_count)
+                return text
+        return PDFService._join(page_texts)
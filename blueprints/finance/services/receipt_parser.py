@@ -1,6 +1,45 @@
 import re
 from datetime import datetime
 import logging
+from .parser_registry import register_parser, registry
+
+# Patterns are compiled once at import; parse() only runs them.
+DMART_BILL_NO = re.compile(r'(?:ORDER\s+NUMBER|Invoice\s+No)[\s:]*([A-Z0-9]+)', re.IGNORECASE)
+DMART_DATE = re.compile(r'(?:INVOICE|ORDER)\s+DATE[\s:]*(\d{2}/\d{2}/\d{2,4})', re.IGNORECASE)
+# Format A: 5 numeric columns (Qty Rate Value Discount NetValue)
+DMART_ITEM_5COL = re.compile(
+    r'(?m)^\s*(\d{6,14})\s*(.*?)\s+(\d+(?:\.\d+)?)\s+([\d,]+\.\d{2})\s+([\d,]+\.\d{2})\s+([\d,]+\.\d{2})\s+([\d,]+\.\d{2})'
+)
+# Format B: 3 numeric columns (Qty Rate Value)
+DMART_ITEM_3COL = re.compile(
+    r'(?m)^\s*(\d{6,14})\s*(.*?)\s+(\d+(?:\.\d+)?)\s+([\d,]+\.\d{2})\s+([\d,]+\.\d{2})'
+)
+# Allow optional leading whitespace before the item number
+DMART_ITEM_LEGACY = re.compile(r'^\s*(\d+)\.\s+(\d{4,10})\s+(\d+)\s+(.*?)\s+(\d+(?:\.\d+)?)\s+([\d,]+\.\d+)\s+([\d,]+\.\d+)', re.MULTILINE)
+# Look for "Amount [total]" or "₹[total] to be collected"
+DMART_TOTALS = [
+    re.compile(r'Amount\s+([\d,]+\.\d+)', re.IGNORECASE),
+    re.compile(r'₹\s*([\d,]+\.\d+)\s+to\s+be\s+collected', re.IGNORECASE),
+    re.compile(r'Amt:\s*[\d\.]+\s+[\d\.]+\s+([\d\.]+)', re.IGNORECASE),  # Summary line: Items:11 Qty:13 Amt: ... [Total]
+]
+
+BLINKIT_BILL_NO = re.compile(r'(?:Order\s+Id|Invoice\s+Number)[\s:]+([A-Z0-9]+)', re.IGNORECASE)
+BLINKIT_DATE = re.compile(r'Invoice(?:\s+Date)?\s*:\s*(\d{2}-[a-zA-Z]{3}-\d{4})', re.IGNORECASE)
+BLINKIT_ITEM = re.compile(
+    r'^\s*(\d+)\s+([\d\-]*)\s+(.*?)\s+(\d+\.\d{2})\s+(\d+\.\d{2})\s+(\d+)\s+(\d+\.\d{2}).*?(\d+\.\d{2})\s*$',
+    re.MULTILINE
+)
+BLINKIT_DELIVERY = re.compile(r'-\s+(?:Delivery|Handling).*?(\d+\.\d{2})\s*$', re.IGNORECASE | re.MULTILINE)
+BLINKIT_TOTAL = re.compile(r'Total\s+[\d\.]+\s+[\d\.]+\s+([\d,]+\.\d{2})', re.IGNORECASE)
+
+GENERIC_DATE = re.compile(r'(\d{1,2}[-/\.]\d{1,2}[-/\.]\d{2,4})')
+# Patterns: 123.45, 123. 45, 123 ,45, 123-45
+GENERIC_PRICE = re.compile(r'(\d{1,6}[\s\.,-]+\d{2})(?!\d)')
+GENERIC_TRAILING_INT = re.compile(r'(\d{2,6})$')
+GENERIC_PRICE_JUNK = re.compile(r'[\s-]')
+GENERIC_LEADING_JUNK = re.compile(r'^[0-9\.\s\-]+')
+GENERIC_MULTI_SPACE = re.compile(r'\s{2,}')
+GENERIC_EXCLUDED_NAMES = ['TOTAL', 'TAX', 'GST', 'CGST', 'SGST', 'VAT', 'CESS', 'AMOUNT', 'DATE', 'INVOICE', 'PAGE', 'TEL', 'FSSAI']
 
 class ReceiptData:
     def __init__(self, bill_no=None, bill_date=None, shop_name=None, total_amount=0.0, items=None):
@@ -23,17 +62,18 @@ class BaseParser:
     def parse(self, text):
         raise NotImplementedError("Subclasses must implement parse()")
 
+@register_parser({'AVENUE E-COMMERCE': 3, 'DMART': 3, 'ORDER NUMBER': 1})
 class DMartParser(BaseParser):
     def parse(self, text):
         data = ReceiptData(shop_name='D-Mart (Avenue E-Commerce)')
         
         # 1. Extract Bill Number (Handles "ORDER NUMBER:" or "Invoice No:")
-        bill_no_match = re.search(r'(?:ORDER\s+NUMBER|Invoice\s+No)[\s:]*([A-Z0-9]+)', text, re.IGNORECASE)
+        bill_no_match = DMART_BILL_NO.search(text)
         if bill_no_match:
             data.bill_no = bill_no_match.group(1)
         
         # 2. Extract Date (Handles "INVOICE DATE:" or "ORDER DATE:")
-        date_match = re.search(r'(?:INVOICE|ORDER)\s+DATE[\s:]*(\d{2}/\d{2}/\d{2,4})', text, re.IGNORECASE)
+        date_match = DMART_DATE.search(text)
         if date_match:
             try:
                 raw_date = date_match.group(1)
@@ -45,19 +85,10 @@ class DMartParser(BaseParser):
 
         # 3. Extract Items
         # Self-Pickup / New Tax Invoice Format checks
-        # Format A: 5 numeric columns (Qty Rate Value Discount NetValue)
-        new_item_pattern_5col = re.compile(
-            r'(?m)^\s*(\d{6,14})\s*(.*?)\s+(\d+(?:\.\d+)?)\s+([\d,]+\.\d{2})\s+([\d,]+\.\d{2})\s+([\d,]+\.\d{2})\s+([\d,]+\.\d{2})'
-        )
-        # Format B: 3 numeric columns (Qty Rate Value)
-        new_item_pattern_3col = re.compile(
-            r'(?m)^\s*(\d{6,14})\s*(.*?)\s+(\d+(?:\.\d+)?)\s+([\d,]+\.\d{2})\s+([\d,]+\.\d{2})'
-        )
-        
-        matches = list(new_item_pattern_5col.finditer(text))
+        matches = list(DMART_ITEM_5COL.finditer(text))
         col_type = 5
         if not matches:
-            matches = list(new_item_pattern_3col.finditer(text))
+            matches = list(DMART_ITEM_3COL.finditer(text))
             col_type = 3
             
         if matches:
@@ -79,9 +110,7 @@ class DMartParser(BaseParser):
         
         # Fallback to Old Format if no items found with the new pattern
         if not data.items:
-            # Allow optional leading whitespace before the item number
-            old_item_pattern = re.compile(r'^\s*(\d+)\.\s+(\d{4,10})\s+(\d+)\s+(.*?)\s+(\d+(?:\.\d+)?)\s+([\d,]+\.\d+)\s+([\d,]+\.\d+)', re.MULTILINE)
-            matches = old_item_pattern.findall(text)
+            matches = DMART_ITEM_LEGACY.findall(text)
             for m in matches:
                 try:
                     data.items.append({
@@ -93,15 +122,8 @@ class DMartParser(BaseParser):
                     continue
 
         # 4. Extract Total
-        # Look for "Amount [total]" or "₹[total] to be collected"
-        total_patterns = [
-            r'Amount\s+([\d,]+\.\d+)',
-            r'₹\s*([\d,]+\.\d+)\s+to\s+be\s+collected',
-            r'Amt:\s*[\d\.]+\s+[\d\.]+\s+([\d\.]+)'  # Summary line: Items:11 Qty:13 Amt: ... [Total]
-        ]
-        
-        for pattern in total_patterns:
-            total_match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in DMART_TOTALS:
+            total_match = pattern.search(text)
             if total_match:
                 data.total_amount = float(total_match.group(1).replace(',', ''))
                 break
@@ -111,19 +133,20 @@ class DMartParser(BaseParser):
 
         return data
 
+@register_parser({'BLINKIT': 3, 'GROFERS': 3, 'BIGWAY MARKETING': 3, 'BLINK COMMERCE': 3})
 class BlinkitParser(BaseParser):
     def parse(self, text):
         data = ReceiptData(shop_name='Blinkit (Blink Commerce)')
         
         # 1. Extract Order ID / Bill No
         # Look for "Order Id : 402613975" or "Invoice Number : C20632T230216450"
-        bill_no_match = re.search(r'(?:Order\s+Id|Invoice\s+Number)[\s:]+([A-Z0-9]+)', text, re.IGNORECASE)
+        bill_no_match = BLINKIT_BILL_NO.search(text)
         if bill_no_match:
             data.bill_no = bill_no_match.group(1)
         
         # 2. Extract Date
         # Look for "Invoice Date : 29-Nov-2023" or "Invoice : 27-Mar-2026"
-        date_match = re.search(r'Invoice(?:\s+Date)?\s*:\s*(\d{2}-[a-zA-Z]{3}-\d{4})', text, re.IGNORECASE)
+        date_match = BLINKIT_DATE.search(text)
         if date_match:
             try:
                 dt_obj = datetime.strptime(date_match.group(1), '%d-%b-%Y')
@@ -135,12 +158,7 @@ class BlinkitParser(BaseParser):
         # Table format: Sr. no | UPC | Item Description | MRP | Discount | Qty | Taxable Value | ... | Total
         # Example: 1 | 890... | Prega News ... | 60.00 | 0.50 | 2 | 106.25 | ... | 119.00
         # We look for lines starting with a serial number, optional trailing UPC, name, and column values
-        item_pattern = re.compile(
-            r'^\s*(\d+)\s+([\d\-]*)\s+(.*?)\s+(\d+\.\d{2})\s+(\d+\.\d{2})\s+(\d+)\s+(\d+\.\d{2}).*?(\d+\.\d{2})\s*$',
-            re.MULTILINE
-        )
-        
-        matches = item_pattern.findall(text)
+        matches = BLINKIT_ITEM.findall(text)
         for m in matches:
             try:
                 data.items.append({
@@ -152,7 +170,7 @@ class BlinkitParser(BaseParser):
                 continue
 
         # 4. Extract Delivery/Handling Fees (Explicitly)
-        delivery_match = re.search(r'-\s+(?:Delivery|Handling).*?(\d+\.\d{2})\s*$', text, re.IGNORECASE | re.MULTILINE)
+        delivery_match = BLINKIT_DELIVERY.search(text)
         if delivery_match:
             try:
                 data.items.append({
@@ -165,7 +183,7 @@ class BlinkitParser(BaseParser):
 
         # 5. Extract Total
         # Look for the final total at the bottom of the table or "Amount in Words"
-        total_match = re.search(r'Total\s+[\d\.]+\s+[\d\.]+\s+([\d,]+\.\d{2})', text, re.IGNORECASE)
+        total_match = BLINKIT_TOTAL.search(text)
         if total_match:
             data.total_amount = float(total_match.group(1).replace(',', ''))
             # Safety check if total match failed to grab the bottom total line and grabbed an intermediate 'Total'
@@ -178,20 +196,17 @@ class BlinkitParser(BaseParser):
 
         return data
 
+@registry.set_fallback
 class GenericParser(BaseParser):
     def parse(self, text):
         data = ReceiptData(shop_name='Smart Scan')
         lines = text.split('\n')
         
         # 1. Date Detection
-        date_pattern = re.compile(r'(\d{1,2}[-/\.]\d{1,2}[-/\.]\d{2,4})')
-        dates = date_pattern.findall(text)
+        dates = GENERIC_DATE.findall(text)
         if dates: data.bill_date = dates[0]
 
         # 2. Number extraction - flexible patterns
-        # Patterns: 123.45, 123. 45, 123 ,45, 123-45
-        price_pattern = re.compile(r'(\d{1,6}[\s\.,-]+\d{2})(?!\d)')
-        
         all_prices = []
         potential_items = []
 
@@ -200,10 +215,10 @@ class GenericParser(BaseParser):
             if not line or len(line) < 5: continue
             
             # Look for numbers
-            line_prices_raw = price_pattern.findall(line)
+            line_prices_raw = GENERIC_PRICE.findall(line)
             if not line_prices_raw:
                 # Try finding any integer > 10 at the end of the line
-                int_match = re.search(r'(\d{2,6})$', line)
+                int_match = GENERIC_TRAILING_INT.search(line)
                 if int_match:
                     line_prices_raw = [int_match.group(1)]
                 else:
@@ -214,7 +229,7 @@ class GenericParser(BaseParser):
             for p in line_prices_raw:
                 try:
                     # Remove spaces, replace , with .
-                    clean_p = re.sub(r'[\s-]', '', p).replace(',', '.')
+                    clean_p = GENERIC_PRICE_JUNK.sub('', p).replace(',', '.')
                     if '.' not in clean_p: # It was an integer from the fallback
                         val = float(clean_p)
                     else:
@@ -231,11 +246,11 @@ class GenericParser(BaseParser):
             for p_str in line_prices_raw:
                 name_part = name_part.replace(p_str, '')
             
-            clean_name = re.sub(r'^[0-9\.\s\-]+', '', name_part).strip()
+            clean_name = GENERIC_LEADING_JUNK.sub('', name_part).strip()
             # Clean up middle junk
-            clean_name = re.sub(r'\s{2,}', ' ', clean_name)
+            clean_name = GENERIC_MULTI_SPACE.sub(' ', clean_name)
             
-            if len(clean_name) > 3 and not any(kw in clean_name.upper() for kw in ['TOTAL', 'TAX', 'GST', 'CGST', 'SGST', 'VAT', 'CESS', 'AMOUNT', 'DATE', 'INVOICE', 'PAGE', 'TEL', 'FSSAI']):
+            if len(clean_name) > 3 and not any(kw in clean_name.upper() for kw in GENERIC_EXCLUDED_NAMES):
                 potential_items.append({
                     'name': clean_name,
                     'quantity': '1',
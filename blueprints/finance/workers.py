@@ -2,14 +2,25 @@
 import os
 import logging
 import time
+from .import_events import publish_current_job_event
 from .services.parser_factory import ParserFactory
 
 logger = logging.getLogger(__name__)
 
 
-def _process_receipt_worker(file_path, mime_type, original_filename):
+def _process_receipt_worker(file_path, mime_type, original_filename, content_hash=None):
     """RQ Worker: Processes the receipt from a temporary file."""
+    result = _run_receipt_import(file_path, mime_type, original_filename, content_hash)
+    if isinstance(result, dict) and result.get('error'):
+        publish_current_job_event('failed', error=result['error'])
+    else:
+        publish_current_job_event('done', data=result)
+    return result
+
+
+def _run_receipt_import(file_path, mime_type, original_filename, content_hash=None):
     from app import app
+    from .receipt_cache import store_cached_receipt
     with app.app_context():
         started = time.monotonic()
         logger.info(
@@ -28,6 +39,7 @@ def _process_receipt_worker(file_path, mime_type, original_filename):
                 )
                 return {'error': 'TEMP_FILE_MISSING'}
 
+            publish_current_job_event('ocr_started')
             with open(file_path, 'rb') as f:
                 text = ParserFactory.get_text(f, mime_type)
                 
@@ -40,6 +52,7 @@ def _process_receipt_worker(file_path, mime_type, original_filename):
                 )
                 return {'error': 'OCR_FAILED'}
             
+            publish_current_job_event('parsing')
             parser = ParserFactory.get_parser(text)
             receipt_data = parser.parse(text)
             
@@ -53,6 +66,7 @@ def _process_receipt_worker(file_path, mime_type, original_filename):
                 return {'error': 'PARSE_FAILED'}
             
             data = receipt_data.to_dict()
+            store_cached_receipt(content_hash, data)
             data['filename'] = original_filename
             logger.info(
                 "Receipt import job completed: filename=%s parser=%s items=%s duration=%.2fs",
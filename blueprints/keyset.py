@@ -0,0 +1,200 @@
+"""Keyset (seek) pagination for lists that only grow.
+
+``.paginate()`` runs ``COUNT(*)`` plus ``OFFSET n`` on every page, so page
+500 reads and discards 500 pages of rows. Here a page continues from the
+sort key of the last row shown (``WHERE (date, id) < (:date, :id)``), which
+an index on the same columns answers at the same cost on any page.
+
+Cursors are opaque URL-safe strings that carry the direction and the sort
+key of the boundary row. A cursor that fails to decode, or whose values
+don't fit the key columns' types, just gives the first page. There is no
+exact total; ``estimated_row_count`` reads the planner's estimate for
+whole-table counts.
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import and_, or_, text, tuple_
+from sqlalchemy.sql import operators
+
+
+@dataclass
+class KeysetPage:
+    items: list
+    per_page: int
+    has_next: bool = False
+    has_prev: bool = False
+    next_cursor: str = None
+    prev_cursor: str = None
+    total: int = None
+
+
+def _order_keys(order_by):
+    keys = []
+    for clause in order_by:
+        modifier = getattr(clause, 'modifier', None)
+        if modifier is operators.desc_op:
+            keys.append((clause.element, True))
+        elif modifier is operators.asc_op:
+            keys.append((clause.element, False))
+        else:
+            keys.append((clause, False))
+    return keys
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'t': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'n': str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 't' in value:
+            return datetime.fromisoformat(value['t'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        if 'n' in value:
+            return Decimal(value['n'])
+        raise ValueError("Unknown cursor value")
+    return value
+
+
+def encode_cursor(direction, values):
+    payload = json.dumps([direction, [_encode_value(v) for v in values]], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, key_count):
+    """Return ``(direction, values)``, or ``(None, None)`` for a missing or bad cursor."""
+    if not cursor:
+        return None, None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = [_decode_value(v) for v in values]
+    except (binascii.Error, TypeError, ValueError, UnicodeDecodeError):
+        return None, None
+    if direction not in ('after', 'before') or len(values) != key_count or None in values:
+        return None, None
+    return direction, values
+
+
+def _coerce_value(expr, value):
+    """``value`` as the Python type of ``expr``'s column; ValueError if it doesn't fit."""
+    try:
+        python_type = expr.type.python_type
+    except (AttributeError, NotImplementedError):
+        return value
+    if isinstance(value, bool) and python_type is not bool:
+        raise ValueError("Cursor value has the wrong type")
+    if python_type is date and isinstance(value, datetime):
+        raise ValueError("Cursor value has the wrong type")
+    if isinstance(value, python_type):
+        return value
+    if python_type in (int, float, Decimal) and isinstance(value, (int, float, Decimal)):
+        if python_type is int and value != int(value):
+            raise ValueError("Cursor value has the wrong type")
+        return python_type(str(value)) if python_type is Decimal else python_type(value)
+    raise ValueError("Cursor value has the wrong type")
+
+
+def _coerce_values(keys, values):
+    """Decoded cursor values coerced to the key columns' types, or None on a mismatch."""
+    try:
+        return [_coerce_value(expr, value) for (expr, _), value in zip(keys, values)]
+    except (ArithmeticError, TypeError, ValueError):
+        return None
+
+
+def _seek_condition(keys, values, backwards):
+    descending = {desc != backwards for _, desc in keys}
+    if len(descending) == 1:
+        # Uniform direction: a row-value comparison the index can seek on.
+        row, bound = tuple_(*[expr for expr, _ in keys]), tuple_(*values)
+        return row < bound if descending.pop() else row > bound
+
+    clauses = []
+    for index, (expr, desc) in enumerate(keys):
+        later = expr < values[index] if desc != backwards else expr > values[index]
+        equal_prefix = [keys[j][0] == values[j] for j in range(index)]
+        clauses.append(and_(*equal_prefix, later))
+    return or_(*clauses)
+
+
+def keyset_paginate(query, order_by, cursor=None, per_page=20, total=None):
+    """
+    Return one ``KeysetPage`` of ``query`` sorted by ``order_by``.
+
+    ``order_by`` is a list of ``asc()``/``desc()`` clauses. The last one
+    must make the order unique (normally the primary key), and none of them
+    may be NULL. ``query`` must not be ordered already. ``total`` is passed
+    through for the template, e.g. from ``estimated_row_count``.
+    """
+    keys = _order_keys(order_by)
+    direction, values = decode_cursor(cursor, len(keys))
+    if values is not None:
+        values = _coerce_values(keys, values)
+        if values is None:
+            direction = None
+    backwards = direction == 'before'
+
+    if values is not None:
+        query = query.filter(_seek_condition(keys, values, backwards))
+    ordering = [expr.desc() if desc != backwards else expr.asc() for expr, desc in keys]
+    labels = [expr.label(f'_keyset_{index}') for index, (expr, _) in enumerate(keys)]
+    rows = query.add_columns(*labels).order_by(*ordering).limit(per_page + 1).all()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    page = KeysetPage(items=[row[0] for row in rows], per_page=per_page, total=total)
+    page.has_next = True if backwards else has_more
+    page.has_prev = has_more if backwards else direction is not None
+    if rows:
+        if page.has_next:
+            page.next_cursor = encode_cursor('after', rows[-1][1:])
+        if page.has_prev:
+            page.prev_cursor = encode_cursor('before', rows[0][1:])
+    elif values is not None:
+        # Ran off the end (rows deleted meanwhile): link back from the cursor.
+        if page.has_next:
+            page.next_cursor = encode_cursor('after', values)
+        if page.has_prev:
+            page.prev_cursor = encode_cursor('before', values)
+    return page
+
+
+def estimated_row_count(model):
+    """
+    Planner estimate of the table's row count (``pg_class.reltuples``),
+    summed over partitions for a partitioned table. None outside Postgres
+    or before the table has been analyzed.
+    """
+    from app import db
+
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return None
+    estimate = db.session.execute(
+        text(
+            "SELECT CASE WHEN c.relkind = 'p' THEN ("
+            "  SELECT SUM(GREATEST(child.reltuples, 0)) FROM pg_inherits i"
+            "  JOIN pg_class child ON child.oid = i.inhrelid WHERE i.inhparent = c.oid"
+            ") ELSE c.reltuples END "
+            "FROM pg_class c WHERE c.oid = to_regclass(:table_name)"
+        ),
+        {'table_name': model.__table__.name},
+    ).scalar()
+    if estimate is None or estimate < 0:
+        return None
+    return int(estimate)
@@ -0,0 +1,308 @@
+"""Batched SMTP delivery for the email queue.
+
+Producers push messages onto a Redis outbox list and make sure a single drain
+job is pending on ``ajs_pantry_emails``. The drain job sends everything in the
+outbox over one authenticated SMTP connection, reconnecting when the server
+drops it and pacing sends to stay under the provider's rate limits.
+
+Delivery is at least once. Each message is moved onto a processing list
+while it is sent, and a drain that dies mid-send leaves it there for the next
+drain to put back, so a crash can repeat a message but never lose one.
+
+Failures are sorted by ``classify_send_error``. Refused recipients, other
+permanent 5xx replies and malformed messages are dropped at once and the
+batch carries on. Throttling, connection and login failures end the batch;
+the message is retried by a drain scheduled ``SMTP_RETRY_DELAY_SECONDS``
+later, up to ``MAX_DELIVERY_ATTEMPTS`` times. Anything else is requeued for
+the next drain without pausing the others.
+
+Messages enqueued with a ``delivery_id`` have their outcome (``queued``,
+``sent`` or ``failed``) kept under that ID for status endpoints to poll.
+"""
+import json
+import logging
+import os
+import smtplib
+import ssl
+import time
+from datetime import timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_KEY = "ajs-pantry:email-outbox"
+PROCESSING_KEY = "ajs-pantry:email-outbox:processing"
+DRAIN_PENDING_KEY = "ajs-pantry:email-outbox:drain-pending"
+DRAIN_PENDING_TTL_SECONDS = 600
+MAX_DELIVERY_ATTEMPTS = 3
+DELIVERY_STATUS_PREFIX = "ajs-pantry:email-delivery"
+DELIVERY_STATUS_TTL_SECONDS = 86400
+
+# SMTP reply codes that mean "slow down / try later" rather than a bad message.
+THROTTLE_REPLY_CODES = {421, 450, 451, 452, 454}
+
+
+def classify_send_error(exc):
+    """'permanent' (drop now), 'pause' (server trouble: back off) or 'retry'."""
+    if isinstance(exc, smtplib.SMTPAuthenticationError):
+        return "pause"  # every message would fail until the login is fixed
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return "permanent"
+    if isinstance(exc, smtplib.SMTPResponseException):
+        if exc.smtp_code in THROTTLE_REPLY_CODES:
+            return "pause"
+        return "permanent" if exc.smtp_code >= 500 else "retry"
+    if isinstance(exc, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return "pause"
+    if isinstance(exc, smtplib.SMTPException):
+        return "retry"
+    if isinstance(exc, (ConnectionError, TimeoutError, OSError)):
+        return "pause"
+    if isinstance(exc, (KeyError, TypeError, ValueError)):
+        return "permanent"  # malformed message: missing fields or unencodable content
+    return "retry"
+
+
+def _env_flag(name, default):
+    return os.environ.get(name, default).lower() not in {"0", "false", "no", "off"}
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def smtp_settings():
+    """SMTP connection settings; override host/port to point tests at a local sink."""
+    port = _env_int("SMTP_PORT", 465)
+    username = os.environ.get("SMTP_USER") or os.environ.get("GMAIL_USER")
+    return {
+        "host": os.environ.get("SMTP_HOST", "smtp.gmail.com"),
+        "port": port,
+        "use_ssl": _env_flag("SMTP_USE_SSL", "1" if port == 465 else "0"),
+        "starttls": _env_flag("SMTP_STARTTLS", "0"),
+        "username": username,
+        "password": os.environ.get("SMTP_PASS") or os.environ.get("GMAIL_PASS"),
+        "sender": os.environ.get("SMTP_FROM") or username,
+        "timeout": _env_int("SMTP_TIMEOUT_SECONDS", 30),
+        "max_per_minute": _env_int("SMTP_MAX_PER_MINUTE", 60),
+        "batch_size": _env_int("SMTP_BATCH_SIZE", 50),
+        "throttle_backoff_seconds": _env_int("SMTP_THROTTLE_BACKOFF_SECONDS", 30),
+        "retry_delay_seconds": _env_int("SMTP_RETRY_DELAY_SECONDS", 60),
+    }
+
+
+def build_message(sender, to_email, subject, html_content):
+    msg = MIMEMultipart("alternative")
+    msg["From"] = sender
+    msg["To"] = to_email
+    msg["Subject"] = subject
+    msg.attach(MIMEText(html_content, "html"))
+    return msg.as_string()
+
+
+class SMTPBatchSender:
+    """One authenticated SMTP session reused across many messages."""
+
+    def __init__(self, settings=None):
+        self.settings = settings or smtp_settings()
+        self._server = None
+        self._last_sent_at = 0.0
+        max_per_minute = self.settings["max_per_minute"]
+        self._min_interval = 60.0 / max_per_minute if max_per_minute > 0 else 0.0
+
+    @property
+    def configured(self):
+        return bool(self.settings["sender"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def connect(self):
+        settings = self.settings
+        if settings["use_ssl"]:
+            server = smtplib.SMTP_SSL(settings["host"], settings["port"], timeout=settings["timeout"])
+        else:
+            server = smtplib.SMTP(settings["host"], settings["port"], timeout=settings["timeout"])
+            if settings["starttls"]:
+                server.starttls(context=ssl.create_default_context())
+        if settings["username"] and settings["password"]:
+            server.login(settings["username"], settings["password"])
+        self._server = server
+        return server
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            try:
+                self._server.close()
+            except Exception:
+                pass
+        self._server = None
+
+    def _throttle(self):
+        wait = self._min_interval - (time.monotonic() - self._last_sent_at)
+        if wait > 0:
+            time.sleep(wait)
+
+    def send(self, to_email, subject, html_content):
+        """Send one message, reconnecting once if the session was dropped."""
+        sender = self.settings["sender"]
+        raw = build_message(sender, to_email, subject, html_content)
+        self._throttle()
+        for attempt in range(2):
+            if self._server is None:
+                self.connect()
+            try:
+                self._server.sendmail(sender, to_email, raw)
+                self._last_sent_at = time.monotonic()
+                return True
+            except smtplib.SMTPResponseException as exc:
+                if exc.smtp_code not in THROTTLE_REPLY_CODES or attempt:
+                    raise
+                logger.warning("SMTP throttled (%s); backing off before retry.", exc.smtp_code)
+                self.close()
+                time.sleep(self.settings["throttle_backoff_seconds"])
+            except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError):
+                self.close()
+                if attempt:
+                    raise
+        return False
+
+
+def _outbox_connection(queue):
+    return getattr(queue, "connection", None) if queue else None
+
+
+def _schedule_drain(queue, delay_seconds=0):
+    connection = _outbox_connection(queue)
+    # While a delayed drain is pending, producers don't enqueue an earlier one.
+    if not connection.set(DRAIN_PENDING_KEY, "1", nx=True, ex=DRAIN_PENDING_TTL_SECONDS + delay_seconds):
+        return
+    if delay_seconds > 0:
+        queue.enqueue_in(timedelta(seconds=delay_seconds), "blueprints.mailer.drain_email_outbox")
+    else:
+        queue.enqueue("blueprints.mailer.drain_email_outbox")
+
+
+def _requeue_abandoned(connection):
+    # Messages left by a drain that died mid-send go back to the front.
+    while connection.lmove(PROCESSING_KEY, OUTBOX_KEY, "RIGHT", "LEFT") is not None:
+        pass
+
+
+def _delivery_status_key(delivery_id):
+    return f"{DELIVERY_STATUS_PREFIX}:{delivery_id}"
+
+
+def _set_delivery_status(connection, delivery_id, status):
+    if delivery_id:
+        connection.set(_delivery_status_key(delivery_id), status, ex=DELIVERY_STATUS_TTL_SECONDS)
+
+
+def get_delivery_status(connection, delivery_id):
+    """'queued', 'sent' or 'failed' for a tracked message, or None if unknown."""
+    value = connection.get(_delivery_status_key(delivery_id))
+    if isinstance(value, bytes):
+        value = value.decode()
+    return value
+
+
+def enqueue_email(queue, to_email, subject, html_content, delivery_id=None):
+    """Append a message to the outbox and make sure a drain job is pending."""
+    connection = _outbox_connection(queue)
+    message = {"to": to_email, "subject": subject, "html": html_content, "attempts": 0}
+    if delivery_id:
+        message["delivery_id"] = delivery_id
+    pipe = connection.pipeline()
+    _set_delivery_status(pipe, delivery_id, "queued")
+    pipe.rpush(OUTBOX_KEY, json.dumps(message))
+    pipe.execute()
+    _schedule_drain(queue)
+    return True
+
+
+def drain_email_outbox():
+    """RQ job: deliver queued emails over a single SMTP session."""
+    from app import app
+
+    queue = getattr(app, "email_queue", None)
+    connection = _outbox_connection(queue)
+    if connection is None:
+        logger.warning("Email outbox drain skipped: email queue is not configured.")
+        return {"sent": 0, "failed": 0}
+
+    sender = SMTPBatchSender()
+    if not sender.configured:
+        connection.delete(DRAIN_PENDING_KEY)
+        logger.warning("Email notification failed: SMTP sender/GMAIL credentials not found.")
+        return {"sent": 0, "failed": 0}
+
+    sent = failed = 0
+    retry_delay = 0
+    try:
+        _requeue_abandoned(connection)
+        # Cap each job so one large backlog can't monopolise the email worker;
+        # the finally block re-schedules a drain for whatever is left.
+        # Requeued messages go to the back, so stopping at the starting
+        # length tries each message at most once per drain.
+        for _ in range(min(max(1, sender.settings["batch_size"]), connection.llen(OUTBOX_KEY))):
+            raw = connection.lmove(OUTBOX_KEY, PROCESSING_KEY, "LEFT", "RIGHT")
+            if raw is None:
+                break
+            try:
+                message = json.loads(raw)
+            except ValueError:
+                connection.lrem(PROCESSING_KEY, 1, raw)
+                logger.error("Email Error: dropping unreadable outbox entry.")
+                continue
+            try:
+                sender.send(message["to"], message["subject"], message["html"])
+                sent += 1
+                pipe = connection.pipeline()
+                _set_delivery_status(pipe, message.get("delivery_id"), "sent")
+                pipe.lrem(PROCESSING_KEY, 1, raw)
+                pipe.execute()
+                continue
+            except Exception as exc:
+                kind = classify_send_error(exc)
+                message["attempts"] = int(message.get("attempts") or 0) + 1
+                pipe = connection.pipeline()
+                pipe.lrem(PROCESSING_KEY, 1, raw)
+                if kind != "permanent" and message["attempts"] < MAX_DELIVERY_ATTEMPTS:
+                    pipe.rpush(OUTBOX_KEY, json.dumps(message))
+                else:
+                    failed += 1
+                    _set_delivery_status(pipe, message.get("delivery_id"), "failed")
+                    logger.error(f"Email Error: giving up on {message.get('to')} after {message['attempts']} attempts: {exc}")
+                pipe.execute()
+            if kind == "permanent":
+                # The session is still usable after a refused recipient.
+                continue
+            sender.close()
+            # Retries wait for a later drain instead of spending every
+            # attempt in one run.
+            retry_delay = max(1, sender.settings["retry_delay_seconds"])
+            if kind == "pause":
+                # The server is down or throttling us; stop the batch.
+                logger.warning("Email outbox drain paused for %ss after a failed send.", retry_delay)
+                break
+    finally:
+        sender.close()
+        connection.delete(DRAIN_PENDING_KEY)
+        # A producer may have pushed after our last pop; don't strand it.
+        if connection.llen(OUTBOX_KEY) or connection.llen(PROCESSING_KEY):
+            _schedule_drain(queue, retry_delay)
+
+    logger.info("Email outbox drained: sent=%s failed=%s", sent, failed)
+    return {"sent": sent, "failed": failed}
@@ -0,0 +1,220 @@
+"""Periodic housekeeping jobs (``flask maintenance``, run from a systemd timer).
+
+These writes used to happen inside GET handlers on every page view. Each job
+is idempotent: running it twice, or after a long gap, leaves the same state.
+A Redis lock keeps two runs of the same job from overlapping when Redis is
+available.
+"""
+import logging
+import os
+import shutil
+import time
+from datetime import date
+
+from flask import current_app
+from sqlalchemy import func
+
+from .audit_log import maintain_audit_log
+from .dish_clusters import refresh_dish_clusters
+from .tenant_metrics import refresh_tenant_metrics
+
+logger = logging.getLogger(__name__)
+
+LOCK_KEY_PREFIX = "ajs-pantry:maintenance"
+LOCK_SECONDS = 600
+
+
+def complete_past_tea_tasks():
+    """Mark pending tea tasks dated before today as completed (all tenants)."""
+    from app import db
+    from models import TeaTask
+
+    updated = TeaTask.query.filter(
+        TeaTask.date < date.today(),
+        TeaTask.status == 'pending',
+    ).update({TeaTask.status: 'completed'}, synchronize_session=False)
+    db.session.commit()
+    return updated
+
+
+def remove_duplicate_print_reports():
+    """Keep only the newest ExpensePrintReport per (tenant, active cycle, floor)."""
+    from app import db
+    from models import ExpensePrintReport, ExpensePrintReportBill, FacultyBudgetCycle, FacultyReportSubmission
+    from .faculty.routes import _safe_remove_file
+
+    groups = (
+        db.session.query(ExpensePrintReport.tenant_id, ExpensePrintReport.cycle_id, ExpensePrintReport.floor)
+        .join(FacultyBudgetCycle, FacultyBudgetCycle.id == ExpensePrintReport.cycle_id)
+        .filter(FacultyBudgetCycle.status == 'active')
+        .group_by(ExpensePrintReport.tenant_id, ExpensePrintReport.cycle_id, ExpensePrintReport.floor)
+        .having(func.count(ExpensePrintReport.id) > 1)
+        .all()
+    )
+
+    removed = 0
+    for tenant_id, cycle_id, floor in groups:
+        reports = ExpensePrintReport.query.filter_by(
+            tenant_id=tenant_id,
+            cycle_id=cycle_id,
+            floor=floor,
+        ).order_by(ExpensePrintReport.created_at.desc()).all()
+        latest = reports[0]
+        submission = FacultyReportSubmission.query.filter_by(
+            tenant_id=tenant_id,
+            cycle_id=cycle_id,
+            floor=floor,
+        ).first()
+
+        for dup in reports[1:]:
+            if submission and submission.print_report_id == dup.id:
+                submission.print_report_id = latest.id
+            ExpensePrintReportBill.query.filter_by(tenant_id=tenant_id, print_report_id=dup.id).delete()
+            if dup.storage_path and dup.storage_path != latest.storage_path:
+                _safe_remove_file(dup.storage_path)
+            db.session.delete(dup)
+            removed += 1
+        db.session.commit()
+    return removed
+
+
+def _receipt_temp_file_ttl_seconds():
+    try:
+        return int(current_app.config.get("RECEIPT_TEMP_FILE_TTL_SECONDS") or 300)
+    except Exception:
+        return 300
+
+
+def cleanup_receipt_temp_files():
+    """Delete receipt uploads the worker never picked up, and expired batch folders."""
+    from .finance.receipt_batches import BATCH_TTL_SECONDS
+    from .finance.routes import _receipt_temp_dir
+
+    temp_dir = _receipt_temp_dir()
+    ttl_seconds = _receipt_temp_file_ttl_seconds()
+    now = time.time()
+    removed = 0
+
+    if ttl_seconds <= 0 or not os.path.isdir(temp_dir):
+        return removed
+
+    for entry in os.scandir(temp_dir):
+        try:
+            if entry.is_file() and now - entry.stat().st_mtime > ttl_seconds:
+                os.remove(entry.path)
+                removed += 1
+                logger.info("Deleted stale receipt temp file: %s", entry.path)
+        except Exception as exc:
+            logger.warning("Unable to delete stale receipt temp file %s: %s", getattr(entry, "path", "unknown"), exc)
+
+    # Batch files wait behind the rest of their batch, so they get the batch TTL.
+    batches_dir = os.path.join(temp_dir, 'batches')
+    if os.path.isdir(batches_dir):
+        for entry in os.scandir(batches_dir):
+            try:
+                if not entry.is_dir():
+                    continue
+                if not os.listdir(entry.path) or now - entry.stat().st_mtime > BATCH_TTL_SECONDS:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    removed += 1
+            except Exception as exc:
+                logger.warning("Unable to delete receipt batch folder %s: %s", entry.path, exc)
+    return removed
+
+
+def prune_push_subscriptions():
+    """Drop push subscriptions of deactivated users and duplicate endpoint rows."""
+    from app import db
+    from models import PushSubscription, User
+
+    inactive_user_ids = db.session.query(User.id).filter(User.is_active.is_(False))
+    removed = PushSubscription.query.filter(
+        PushSubscription.user_id.in_(inactive_user_ids)
+    ).delete(synchronize_session=False)
+
+    # Re-subscribing from the same browser should update one row; older
+    # duplicates of an endpoint only cause double deliveries.
+    newest_ids = (
+        db.session.query(func.max(PushSubscription.id))
+        .group_by(PushSubscription.user_id, PushSubscription.endpoint)
+    )
+    removed += PushSubscription.query.filter(
+        PushSubscription.id.notin_(newest_ids)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return removed
+
+
+def freeze_budget_period_snapshots():
+    """Snapshot settled budget periods for every floor of every active tenant."""
+    from app import db
+    from models import Budget, Tenant
+    from .budgeting import freeze_settled_budget_periods
+
+    frozen = 0
+    for tenant in Tenant.query.filter_by(is_active=True).all():
+        floors = (
+            db.session.query(Budget.floor)
+            .filter(Budget.tenant_id == tenant.id)
+            .distinct()
+            .all()
+        )
+        for floor, in floors:
+            frozen += freeze_settled_budget_periods(
+                floor,
+                tenant_id=tenant.id,
+                faculty_workflow_enabled=tenant.faculty_workflow_enabled,
+            )
+        db.session.commit()
+    return frozen
+
+
+MAINTENANCE_JOBS = {
+    "tea-autocomplete": complete_past_tea_tasks,
+    "print-report-dedupe": remove_duplicate_print_reports,
+    "receipt-temp-cleanup": cleanup_receipt_temp_files,
+    "push-subscription-prune": prune_push_subscriptions,
+    "budget-period-snapshots": freeze_budget_period_snapshots,
+    "audit-log": maintain_audit_log,
+    "tenant-metrics": refresh_tenant_metrics,
+    "dish-duplicates": refresh_dish_clusters,
+}
+
+
+def _lock_connection():
+    queue = getattr(current_app, "task_queue", None)
+    return getattr(queue, "connection", None)
+
+
+def run_maintenance(job_names=None):
+    """Run the named jobs (all by default); returns ``{name: result}``."""
+    from app import db
+
+    connection = _lock_connection()
+    results = {}
+    for name in job_names or MAINTENANCE_JOBS:
+        job = MAINTENANCE_JOBS[name]
+        lock_key = f"{LOCK_KEY_PREFIX}:{name}:lock"
+        if connection is not None:
+            try:
+                if not connection.set(lock_key, "1", nx=True, ex=LOCK_SECONDS):
+                    results[name] = "skipped (already running)"
+                    continue
+            except Exception:
+                connection = None
+
+        started = time.monotonic()
+        try:
+            results[name] = job()
+            logger.info("Maintenance job %s done: result=%s duration=%.2fs", name, results[name], time.monotonic() - started)
+        except Exception as exc:
+            db.session.rollback()
+            logger.exception("Maintenance job %s failed", name)
+            results[name] = f"failed: {exc}"
+        finally:
+            if connection is not None:
+                try:
+                    connection.delete(lock_key)
+                except Exception:
+                    pass
+    return results
@@ -0,0 +1,214 @@
+"""Per-recipient coalescing in front of the push and email queues.
+
+A planning session (editing a week of menus, adding procurement items,
+assigning tea duty) fires many notifications at the same people within
+seconds. Each notification is buffered in Redis for a short window per
+recipient; exact duplicates (same content key) are dropped, and when the
+window closes one flush job delivers either the single notification as-is or
+a merged digest. Email digests list each message's subject with a short text
+excerpt and its first link rather than nesting the full documents.
+"""
+import hashlib
+import json
+import logging
+import re
+from datetime import timedelta
+from html.parser import HTMLParser
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ajs-pantry:coalesce"
+DIGEST_MAX_LINES = 5
+DEFAULT_PUSH_URL = "/dashboard"
+EMAIL_DIGEST_TEMPLATE = "emails/notification_digest.html"
+DIGEST_EXCERPT_CHARS = 240
+
+
+def coalesce_window_seconds():
+    try:
+        return max(0, int(current_app.config.get("NOTIFICATION_COALESCE_SECONDS") or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _keys(channel, recipient):
+    base = f"{KEY_PREFIX}:{channel}:{recipient}"
+    return f"{base}:buffer", f"{base}:seen", f"{base}:flush-pending"
+
+
+def content_key(*parts):
+    raw = "\x1f".join("" if part is None else str(part) for part in parts)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _buffer(queue, channel, recipient, payload, dedupe_key, flush_func, window):
+    """Buffer ``payload`` for ``recipient``; returns False when it was a duplicate."""
+    connection = queue.connection
+    buffer_key, seen_key, pending_key = _keys(channel, recipient)
+    ttl = window * 4 + 60
+
+    pipe = connection.pipeline()
+    pipe.sadd(seen_key, dedupe_key)
+    pipe.expire(seen_key, ttl)
+    is_new = pipe.execute()[0]
+    if not is_new:
+        return False
+
+    pipe = connection.pipeline()
+    pipe.rpush(buffer_key, json.dumps(payload))
+    pipe.expire(buffer_key, ttl)
+    pipe.execute()
+
+    # First notification in the window schedules the flush; later ones just join the buffer.
+    if connection.set(pending_key, "1", nx=True, ex=ttl):
+        queue.enqueue_in(timedelta(seconds=window), flush_func, recipient)
+    return True
+
+
+def _drain(connection, channel, recipient):
+    buffer_key, seen_key, pending_key = _keys(channel, recipient)
+    pipe = connection.pipeline(transaction=True)
+    pipe.lrange(buffer_key, 0, -1)
+    pipe.delete(buffer_key, seen_key, pending_key)
+    raw_items, _ = pipe.execute()
+    return [json.loads(raw) for raw in raw_items]
+
+
+def _digest_lines(entries, max_lines=DIGEST_MAX_LINES):
+    lines = entries[:max_lines]
+    if len(entries) > max_lines:
+        lines.append(f"+{len(entries) - max_lines} more")
+    return lines
+
+
+def buffer_push(queue, user_id, title, body, icon=None, url=None):
+    payload = {"title": title, "body": body, "icon": icon, "url": url}
+    return _buffer(
+        queue,
+        "push",
+        user_id,
+        payload,
+        content_key(title, body, url),
+        "blueprints.notification_coalescer.flush_push_notifications",
+        coalesce_window_seconds(),
+    )
+
+
+def buffer_email(queue, to_email, subject, html_content):
+    payload = {"subject": subject, "html": html_content}
+    return _buffer(
+        queue,
+        "email",
+        to_email.strip().lower(),
+        payload,
+        content_key(subject, html_content),
+        "blueprints.notification_coalescer.flush_email_notifications",
+        coalesce_window_seconds(),
+    )
+
+
+def merge_push_notifications(items):
+    """Collapse buffered pushes into one ``(title, body, icon, url)``."""
+    if len(items) == 1:
+        item = items[0]
+        return item["title"], item["body"], item.get("icon"), item.get("url")
+
+    urls = {item.get("url") for item in items}
+    url = urls.pop() if len(urls) == 1 else DEFAULT_PUSH_URL
+    body = "\n".join(_digest_lines([item["title"] for item in items]))
+    return f"{len(items)} new updates", body, items[0].get("icon"), url
+
+
+class _EmailSummary(HTMLParser):
+    """Visible text and first web link of an email body."""
+
+    SKIPPED_TAGS = {"head", "style", "script", "title"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.link = None
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self._skipping += 1
+        elif tag == "a" and self.link is None:
+            href = dict(attrs).get("href") or ""
+            if href.startswith(("http://", "https://", "/")):
+                self.link = href
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS and self._skipping:
+            self._skipping -= 1
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def summarize_email(html_content, max_chars=DIGEST_EXCERPT_CHARS):
+    """``(excerpt, link)`` for one email: its text shortened to ``max_chars``."""
+    parser = _EmailSummary()
+    try:
+        parser.feed(html_content or "")
+        parser.close()
+    except Exception:
+        logger.debug("Unable to parse email body for digest", exc_info=True)
+    text = re.sub(r"\s+", " ", "".join(parser.parts)).strip()
+    if len(text) > max_chars:
+        text = text[:max_chars].rsplit(" ", 1)[0] + "…"
+    return text, parser.link
+
+
+def merge_email_notifications(items):
+    """Collapse buffered emails into one ``(subject, html)``."""
+    if len(items) == 1:
+        return items[0]["subject"], items[0]["html"]
+
+    from app import app
+
+    subject = f"{len(items)} new updates: " + "; ".join(_digest_lines([item["subject"] for item in items], 2))
+    entries = []
+    for item in items:
+        excerpt, link = summarize_email(item["html"])
+        entries.append({"subject": item["subject"], "excerpt": excerpt, "link": link})
+    # Rendered from the app's Jinja env: flush jobs run without a request.
+    html = app.jinja_env.get_template(EMAIL_DIGEST_TEMPLATE).render(items=entries)
+    return subject, html
+
+
+def flush_push_notifications(user_id):
+    """RQ job: deliver everything buffered for ``user_id`` as one push."""
+    from app import app
+    from .utils import send_push_worker
+
+    queue = getattr(app, "notification_queue", None)
+    if queue is None:
+        return False
+    items = _drain(queue.connection, "push", user_id)
+    if not items:
+        return False
+    if len(items) > 1:
+        logger.info("Coalesced %s push notifications for user_id=%s", len(items), user_id)
+    title, body, icon, url = merge_push_notifications(items)
+    return send_push_worker(user_id, title, body, icon, url)
+
+
+def flush_email_notifications(to_email):
+    """RQ job: hand the buffered emails for ``to_email`` to the mailer as one message."""
+    from app import app
+    from .mailer import enqueue_email
+
+    queue = getattr(app, "email_queue", None)
+    if queue is None:
+        return False
+    items = _drain(queue.connection, "email", to_email)
+    if not items:
+        return False
+    if len(items) > 1:
+        logger.info("Coalesced %s emails for %s", len(items), to_email)
+    subject, html_content = merge_email_notifications(items)
+    return enqueue_email(queue, to_email, subject, html_content)
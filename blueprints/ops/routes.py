@@ -3,7 +3,7 @@ from flask import render_template, request, redirect, url_for, flash, jsonify, a
 from app import db
 from models import User, TeaTask, Request, ProcurementItem
 from datetime import datetime, date
-from sqlalchemy import or_, func
+from sqlalchemy import and_, or_, func
 from sqlalchemy.orm import joinedload
 from . import ops_bp
 from ..utils import (
@@ -15,6 +15,7 @@ from ..utils import (
     send_push_notification,
     send_email_notification
 )
+from ..bulk_writes import bulk_insert
 from ..dashboard_cache import clear_dashboard_cache as _clear_dashboard_cache
 
 @ops_bp.route('/tea', methods=['GET', 'POST'])
@@ -69,14 +70,6 @@ def tea():
         flash('tea task added successfully', 'success')
         return redirect(url_for('ops.tea'))
 
-    # Auto-complete past pending tasks for this floor
-    tenant_filter(TeaTask.query).filter(
-        TeaTask.floor == floor,
-        TeaTask.date < date.today(),
-        TeaTask.status == 'pending'
-    ).update({TeaTask.status: 'completed'}, synchronize_session=False)
-    db.session.commit()
-
     month_param = (request.args.get('month') or '').strip()
     today = date.today()
     if month_param:
@@ -106,7 +99,12 @@ def tea():
             TeaTask.floor == floor,
             TeaTask.date >= month_start,
             TeaTask.date < month_end,
-            TeaTask.status == 'completed',
+            # Past pending tasks are auto-completed by `flask maintenance`;
+            # count them already so the tally does not lag behind it.
+            or_(
+                TeaTask.status == 'completed',
+                and_(TeaTask.status == 'pending', TeaTask.date < today),
+            ),
             TeaTask.assigned_to_id.isnot(None),
         )
         .group_by(TeaTask.assigned_to_id)
@@ -176,7 +174,7 @@ def bulk_assign_tea():
 
     current_date = start_date
     user_index = 0
-    tasks_created = 0
+    new_tasks = []
     from datetime import timedelta
 
     # Optimization: Pre-fetch existing tasks and approved absences to avoid N+1 queries
@@ -213,15 +211,12 @@ def bulk_assign_tea():
 
                 if not is_absent:
                     # Found an available user
-                    new_task = TeaTask(
-                        date=current_date,
-                        assigned_to_id=target_user_id,
-                        floor=floor,
-                        created_by_id=user.id,
-                        tenant_id=getattr(g, 'tenant_id', None)
-                    )
-                    db.session.add(new_task)
-                    tasks_created += 1
+                    new_tasks.append({
+                        'date': current_date,
+                        'assigned_to_id': target_user_id,
+                        'floor': floor,
+                        'created_by_id': user.id,
+                    })
                     user_index += 1 # Move to next user for next date
                     found_user = True
                     break
@@ -233,6 +228,7 @@ def bulk_assign_tea():
         
         current_date += timedelta(days=1)
 
+    tasks_created = len(bulk_insert(TeaTask, new_tasks))
     db.session.commit()
     _clear_dashboard_cache(getattr(g, 'tenant_id', None), floor)
     flash(f'Successfully generated {tasks_created} tea tasks.', 'success')
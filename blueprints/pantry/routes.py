@@ -1,11 +1,15 @@
-from flask import render_template, request, redirect, url_for, session, flash, abort, jsonify, g
+from flask import render_template, request, redirect, url_for, session, flash, abort, jsonify, g, current_app
 from app import db
 from models import User, Dish, DishAuditLog, Menu, MenuSuggestion, Feedback, Request, ProcurementItem, Team, TeamMember, TeaTask, FloorLendBorrow, SpecialEvent, Announcement, Suggestion, SuggestionVote, Expense, Budget, FacultyBudgetCycle, FacultyReportSubmission, FacultyMessage, FacultyMessageFloor, normalize_dish_name, DishChampion, RoomRotationSettings, RoomRotationOrder, RoomRotationException
 from datetime import datetime, date, timedelta
 from sqlalchemy import or_, func
 from sqlalchemy.orm import joinedload
+import logging
+import uuid
 from . import pantry_bp
 from ..budgeting import build_floor_budget_ledger
+from ..keyset import keyset_paginate
+from ..mailer import get_delivery_status
 from ..utils import (
     current_tenant_faculty_workflow_enabled,
     _require_user,
@@ -19,6 +23,7 @@ from ..utils import (
     FLOOR_MAX,
 )
 from app import db, cache
+from .workers import _meal_label_for, _menu_date_label, render_meal_assignment_email
 
 def _clear_dashboard_cache(tenant_id, floor):
     """Helper to clear cached dashboard stats for a specific tenant and floor."""
@@ -882,12 +887,11 @@ def people():
     all_users = tenant_filter(User.query).filter_by(floor=floor).all()
     all_users.sort(key=lambda u: (u.full_name or u.username or u.email or "").lower())
     
-    page = request.args.get('page', 1, type=int)
-    users_pagination = (
-        tenant_filter(User.query)
-        .filter_by(floor=floor)
-        .order_by(func.lower(func.coalesce(User.full_name, User.username, User.email)).asc())
-        .paginate(page=page, per_page=10, error_out=False)
+    users_pagination = keyset_paginate(
+        tenant_filter(User.query).filter_by(floor=floor),
+        [func.lower(func.coalesce(User.full_name, User.username, User.email)).asc(), User.id.asc()],
+        cursor=request.args.get('cursor'),
+        per_page=10,
     )
     users = users_pagination.items
 
@@ -1695,13 +1699,13 @@ def menus():
     )
     
     # Fetch all menus with pagination for history
-    page = request.args.get('page', 1, type=int)
-    menus_pagination = (
+    menus_pagination = keyset_paginate(
         tenant_filter(Menu.query)
         .options(joinedload(Menu.assigned_to), joinedload(Menu.assigned_team), joinedload(Menu.dish), joinedload(Menu.side_dish))
-        .filter_by(floor=floor)
-        .order_by(Menu.date.desc())
-        .paginate(page=page, per_page=15, error_out=False)
+        .filter_by(floor=floor),
+        [Menu.date.desc(), Menu.id.desc()],
+        cursor=request.args.get('cursor'),
+        per_page=15,
     )
     floor_menus = menus_pagination.items
     
@@ -1837,10 +1841,8 @@ def send_single_menu_notification(menu_id):
         return jsonify({'status': 'error', 'message': 'Recipient not found'}), 404
 
     try:
-        meal_label = menu.dish.name if menu.dish else menu.title
-        if menu.side_dish:
-            meal_label = f"{meal_label} + {menu.side_dish.name}"
-        menu_date = menu.date.strftime('%d %b %Y') if menu.date else 'upcoming day'
+        meal_label = _meal_label_for(menu)
+        menu_date = _menu_date_label(menu)
 
         send_push_notification(
             user_id=recipient.id,
@@ -1850,135 +1852,78 @@ def send_single_menu_notification(menu_id):
             url='/menus',
         )
 
-        if recipient.email:
-            tenant_name = getattr(g, 'tenant_name', 'Maskan')
-            email_subject = f"[{tenant_name}] Meal Assignment: {meal_label}"
-            
-            # Fetch dish estimation for premium display
-            estimate_main = _estimate_payload_for(menu.dish) if menu.dish else None
-            
-            # Check if created by pantry head or admin for conditional instructions
-            creator = menu.created_by
-            is_created_by_pantry_head = creator and creator.role in ['pantryHead', 'admin']
-            creator_name = (creator.full_name or creator.username) if creator else 'Chef'
-            
-            # Build estimation section HTML (ingredients table + tips)
-            estimation_html = ""
-            if estimate_main and estimate_main.get('available'):
-                summary = estimate_main.get('summary', '').strip()
-                ingredients = estimate_main.get('ingredients', []) or []
-                tips = estimate_main.get('tips', []) or []
-                serving_count = estimate_main.get('serving_count', 30)
-                
-                # Build ingredients table
-                ingredients_table_html = ""
-                if ingredients:
-                    ingredients_rows = "".join([
-                        f"<tr><td style=\"padding: 10px; border-bottom: 1px solid #e8e8e8; color: #333; font-size: 14px;\">{ing.get('name', '').strip()}</td>"
-                        f"<td style=\"padding: 10px; border-bottom: 1px solid #e8e8e8; color: #333; text-align: center; font-size: 14px;\">{ing.get('qty', '')}</td>"
-                        f"<td style=\"padding: 10px; border-bottom: 1px solid #e8e8e8; color: #333; font-size: 14px;\">{ing.get('unit', '').strip()}</td></tr>"
-                        for ing in ingredients
-                    ])
-                    ingredients_table_html = f"""
-                    <table style="width: 100%; border-collapse: collapse; margin: 15px 0; background-color: #fafbfc; border: 1px solid #e0e0e0; border-radius: 4px; overflow: hidden;">
-                        <thead>
-                            <tr style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white;">
-                                <th style="padding: 12px; text-align: left; font-weight: 600; font-size: 14px;">Ingredient</th>
-                                <th style="padding: 12px; text-align: center; font-weight: 600; font-size: 14px;">Qty</th>
-                                <th style="padding: 12px; text-align: left; font-weight: 600; font-size: 14px;">Unit</th>
-                            </tr>
-                        </thead>
-                        <tbody>{ingredients_rows}</tbody>
-                    </table>
-                    <p style="font-size: 12px; color: #666; font-style: italic; margin: 8px 0; text-align: center;">Serves approximately {serving_count} people</p>
-                    """
-                
-                # Build tips section
-                tips_html = ""
-                if tips:
-                    tips_list = "".join([
-                        f"<li style=\"margin: 8px 0; color: #333; font-size: 14px; line-height: 1.5;\">{tip.strip()}</li>"
-                        for tip in tips
-                    ])
-                    tips_html = f"""
-                    <div style="margin: 20px 0;">
-                        <h4 style="color: #2c3e50; margin: 12px 0 15px 0; font-size: 15px; font-weight: 600;">💡 Cooking Tips</h4>
-                        <ul style="margin: 0; padding-left: 20px; color: #333;">{tips_list}</ul>
-                    </div>
-                    """
-                
-                # Combine estimation section
-                estimation_html = f"""
-                <div style="background-color: #f0f8ff; border-left: 4px solid #667eea; padding: 20px; margin: 25px 0; border-radius: 4px; border: 1px solid #d4e9f7;">
-                    <h3 style="color: #2c3e50; font-size: 18px; margin-top: 0; margin-bottom: 15px; font-weight: 600;">🍳 Dish Preparation Guide</h3>
-                    {f'<p style="color: #666; font-style: italic; margin-bottom: 20px; line-height: 1.6; font-size: 14px;">{summary}</p>' if summary else ''}
-                    {ingredients_table_html}
-                    {tips_html}
-                </div>
-                """
-            
-            # Build pantry-head instructions section (conditional)
-            pantry_head_section = ""
-            if is_created_by_pantry_head:
-                pantry_head_section = f"""
-                <div style="background-color: #fff3cd; border-left: 4px solid #ffc107; padding: 15px; margin: 20px 0; border-radius: 4px; border: 1px solid #ffeaa7;">
-                    <h3 style="color: #856404; margin-top: 0; margin-bottom: 10px; font-size: 15px; font-weight: 600;">👨‍🍳 Chef's Special Instructions</h3>
-                    <p style="color: #856404; font-size: 14px; margin: 8px 0; line-height: 1.5;">
-                        This meal has been thoughtfully prepared by <strong>{creator_name}</strong> from your pantry team. 
-                        Please refer to the preparation guide below for detailed ingredients and cooking tips.
-                    </p>
-                </div>
-                """
-            
-            # Build complete premium email HTML
-            email_html = f"""
-            <div style="font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; max-width: 600px; margin: 0 auto; background-color: #f5f5f5; padding: 0;">
-                <!-- Header with Gradient -->
-                <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 30px 20px; text-align: center; color: white;">
-                    <h1 style="margin: 0; font-size: 28px; font-weight: 600; letter-spacing: 0.5px;">Your Next Meal Assignment</h1>
-                </div>
-                
-                <!-- Main Content -->
-                <div style="background-color: white; padding: 30px 20px; margin: 15px; border-radius: 8px; box-shadow: 0 2px 8px rgba(0,0,0,0.08);">
-                    <!-- Meal Highlight -->
-                    <div style="background: linear-gradient(to right, #f0f4f8, #ffffff); border-left: 5px solid #667eea; padding: 20px; border-radius: 4px; margin-bottom: 25px;">
-                        <h2 style="color: #2c3e50; margin-top: 0; margin-bottom: 12px; font-size: 22px; font-weight: 600;">{meal_label}</h2>
-                        <p style="margin: 8px 0; font-size: 15px; color: #666;"><strong>📅 Date:</strong> {menu_date}</p>
-                        {f'<p style="margin: 8px 0; font-size: 14px; color: #666; line-height: 1.5;"><strong>📝 Description:</strong> {menu.description}</p>' if menu.description else ''}
-                    </div>
-                    
-                    {pantry_head_section}
-                    {estimation_html}
-                    
-                    <!-- Login Button (Prominent CTA) -->
-                    <div style="text-align: center; margin: 30px 0;">
-                        <a href="https://140-245-12-63.sslip.io/login" style="display: inline-block; background: linear-gradient(135deg, #28a745 0%, #20c997 100%); color: white; padding: 16px 50px; text-decoration: none; border-radius: 6px; font-size: 16px; font-weight: 600; box-shadow: 0 4px 12px rgba(40, 167, 69, 0.3); transition: transform 0.2s ease, box-shadow 0.2s ease; cursor: pointer;" onmouseover="this.style.transform='translateY(-2px)'; this.style.boxShadow='0 6px 16px rgba(40, 167, 69, 0.4)';" onmouseout="this.style.transform='translateY(0)'; this.style.boxShadow='0 4px 12px rgba(40, 167, 69, 0.3)';">
-                            ✓ View Full Details on Dashboard
-                        </a>
-                    </div>
-                </div>
-                
-                <!-- Footer -->
-                <div style="background-color: #f5f5f5; padding: 20px; text-align: center; color: #888; font-size: 12px; line-height: 1.6;">
-                    <p style="margin: 8px 0;">
-                        This is an automated message from <strong>{tenant_name}</strong> pantry scheduling system.
-                    </p>
-                    <p style="margin: 8px 0; color: #aaa;">
-                        © 2026 Pantry Management. All rights reserved.
-                    </p>
-                </div>
-            </div>
-            """
-            email_sent = send_email_worker(recipient.email, email_subject, email_html)
-            if not email_sent:
-                return jsonify({'status': 'error', 'message': 'Email delivery failed'}), 500
-
-            return jsonify({'status': 'success'})
-
-        return jsonify({'status': 'warning', 'message': 'Recipient has no email address'})
+        if not recipient.email:
+            return jsonify({'status': 'warning', 'message': 'Recipient has no email address'})
+
+        tenant_name = getattr(g, 'tenant_name', 'Maskan')
+        if hasattr(current_app, 'email_queue') and current_app.email_queue:
+            # The email worker renders and hands the message to the pooled
+            # outbox; the client polls the delivery status.
+            delivery_id = str(uuid.uuid4())
+            current_app.email_queue.enqueue(
+                'blueprints.pantry.workers._send_meal_assignment_email_worker',
+                menu.id,
+                recipient.id,
+                menu.tenant_id,
+                tenant_name,
+                delivery_id=delivery_id,
+                job_id=delivery_id,
+                result_ttl=3600,
+                failure_ttl=86400,
+            )
+            return jsonify({'status': 'queued', 'delivery_id': delivery_id}), 202
+
+        # Sync Fallback
+        email_subject, email_html = render_meal_assignment_email(menu, tenant_name)
+        email_sent = send_email_worker(recipient.email, email_subject, email_html)
+        if not email_sent:
+            return jsonify({'status': 'error', 'message': 'Email delivery failed'}), 500
+
+        return jsonify({'status': 'success'})
     except Exception:
+        logging.exception("Menu notification dispatch failed: menu_id=%s", menu_id)
         return jsonify({'status': 'error', 'message': 'Failed to dispatch notification'}), 500
 
+@pantry_bp.route('/menus/notifications/<delivery_id>/status', methods=['GET'])
+def menu_notification_status(delivery_id):
+    """Reports whether a queued meal-assignment email was sent."""
+    user = _require_user()
+    if not user or user.role not in ['admin', 'pantryHead']:
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 403
+
+    if not hasattr(current_app, 'email_queue') or not current_app.email_queue:
+        return jsonify({'status': 'error', 'message': 'Background processing not configured'}), 400
+
+    job = current_app.email_queue.fetch_job(delivery_id)
+    if not job or job.func_name != 'blueprints.pantry.workers._send_meal_assignment_email_worker':
+        return jsonify({'status': 'not_found'}), 404
+
+    # args: (menu_id, recipient_id, tenant_id, tenant_name)
+    job_tenant_id = job.args[2] if len(job.args) > 2 else None
+    if getattr(g, 'tenant_id', None) and str(job_tenant_id) != str(g.tenant_id):
+        return jsonify({'status': 'not_found'}), 404
+
+    if job.is_finished:
+        result = job.result
+        if isinstance(result, dict) and result.get('error'):
+            return jsonify({'status': 'failed', 'error': result['error']})
+        if not (isinstance(result, dict) and result.get('queued')):
+            return jsonify({'status': 'sent'})
+        # Rendered and on the outbox: the drain records the SMTP outcome.
+        delivery_status = get_delivery_status(current_app.email_queue.connection, delivery_id)
+        if delivery_status == 'sent':
+            return jsonify({'status': 'sent'})
+        if delivery_status == 'failed':
+            return jsonify({'status': 'failed', 'error': 'EMAIL_DELIVERY_FAILED'})
+        return jsonify({'status': 'sending'})
+
+    if job.is_failed:
+        return jsonify({'status': 'failed', 'error': 'EMAIL_JOB_FAILED'})
+
+    job_status = job.get_status(refresh=True)
+    job_status = getattr(job_status, 'value', str(job_status))
+    return jsonify({'status': 'sending' if job_status == 'started' else 'queued'})
+
 @pantry_bp.route('/menus/<int:menu_id>/delete', methods=['POST'])
 def delete_menu(menu_id):
     user = _require_user()
@@ -2799,14 +2744,13 @@ def feedbacks():
         flash('Evaluation saved successfully.', 'success')
         return redirect(url_for('pantry.feedbacks'))
 
-    page = request.args.get('page', 1, type=int)
-    
-    feedbacks_pagination = (
+    feedbacks_pagination = keyset_paginate(
         tenant_filter(Feedback.query)
         .options(joinedload(Feedback.user), joinedload(Feedback.menu).joinedload(Menu.dish))
-        .filter_by(floor=floor)
-        .order_by(Feedback.created_at.desc())
-        .paginate(page=page, per_page=15, error_out=False)
+        .filter_by(floor=floor),
+        [Feedback.created_at.desc(), Feedback.id.desc()],
+        cursor=request.args.get('cursor'),
+        per_page=15,
     )
     visible_feedbacks = feedbacks_pagination.items
 
@@ -0,0 +1,90 @@
+"""Background job workers for meal-assignment notifications."""
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+MEAL_ASSIGNMENT_EMAIL_TEMPLATE = "emails/meal_assignment.html"
+
+
+def _meal_label_for(menu):
+    meal_label = menu.dish.name if menu.dish else menu.title
+    if menu.side_dish:
+        meal_label = f"{meal_label} + {menu.side_dish.name}"
+    return meal_label
+
+
+def _menu_date_label(menu):
+    return menu.date.strftime('%d %b %Y') if menu.date else 'upcoming day'
+
+
+def render_meal_assignment_email(menu, tenant_name):
+    """Return ``(subject, html)`` for a meal-assignment email."""
+    from flask import current_app
+    from ..email_fragments import render_dish_preparation_guide
+
+    meal_label = _meal_label_for(menu)
+    creator = menu.created_by
+    is_created_by_pantry_head = creator and creator.role in ['pantryHead', 'admin']
+    creator_name = (creator.full_name or creator.username) if creator else 'Chef'
+
+    # Rendered straight from the app's Jinja env: the compiled template is
+    # cached and no request-bound context processors run inside the worker.
+    template = current_app.jinja_env.get_template(MEAL_ASSIGNMENT_EMAIL_TEMPLATE)
+    html = template.render(
+        meal_label=meal_label,
+        menu_date=_menu_date_label(menu),
+        description=menu.description,
+        creator_name=creator_name if is_created_by_pantry_head else None,
+        # Same HTML for every member of the team; cached per estimate version.
+        estimate_html=render_dish_preparation_guide(menu.dish),
+        tenant_name=tenant_name,
+    )
+    subject = f"[{tenant_name}] Meal Assignment: {meal_label}"
+    return subject, html
+
+
+def _send_meal_assignment_email_worker(menu_id, recipient_id, tenant_id, tenant_name, delivery_id=None):
+    """RQ Worker: renders one meal-assignment email and queues it on the outbox.
+
+    The pooled outbox drain does the SMTP send and records the outcome under
+    ``delivery_id`` (see ``mailer.get_delivery_status``).
+    """
+    from app import app
+    from models import Menu, User
+    from ..mailer import enqueue_email
+    from ..utils import send_email_worker
+
+    with app.app_context():
+        started = time.monotonic()
+        menu = Menu.query.filter_by(id=menu_id, tenant_id=tenant_id).first()
+        recipient = User.query.filter_by(id=recipient_id, tenant_id=tenant_id).first()
+        if not menu or not recipient or not recipient.email:
+            logger.warning(
+                "Meal assignment email skipped: menu_id=%s recipient_id=%s",
+                menu_id,
+                recipient_id,
+            )
+            return {'error': 'RECIPIENT_OR_MENU_MISSING'}
+
+        subject, html = render_meal_assignment_email(menu, tenant_name)
+        queue = getattr(app, 'email_queue', None)
+        if queue is None:
+            if not send_email_worker(recipient.email, subject, html):
+                logger.warning(
+                    "Meal assignment email failed: menu_id=%s recipient_id=%s duration=%.2fs",
+                    menu_id,
+                    recipient_id,
+                    time.monotonic() - started,
+                )
+                return {'error': 'EMAIL_DELIVERY_FAILED'}
+            return {'sent': True}
+
+        enqueue_email(queue, recipient.email, subject, html, delivery_id=delivery_id)
+        logger.info(
+            "Meal assignment email queued: menu_id=%s recipient_id=%s duration=%.2fs",
+            menu_id,
+            recipient_id,
+            time.monotonic() - started,
+        )
+        return {'queued': True, 'delivery_id': delivery_id}
@@ -1,7 +1,10 @@
 """RQ queue health helpers used by admin diagnostics and import polling."""
 from __future__ import annotations
 
+import json
+import logging
 import os
+import time
 from datetime import datetime, timezone
 
 from flask import current_app
@@ -130,6 +133,15 @@ def _queue_job_ids(queue):
     return []
 
 
+def _ocr_cache_stats(connection):
+    try:
+        from .finance.receipt_cache import receipt_cache_stats
+
+        return receipt_cache_stats(connection)
+    except Exception:
+        return None
+
+
 def _serialize_worker(worker):
     last_heartbeat = _as_aware(getattr(worker, "last_heartbeat", None))
     state = getattr(worker, "state", None)
@@ -161,6 +173,7 @@ def get_queue_health(queue_attr="task_queue"):
         "workers": [],
         "recent_failed_jobs": [],
         "oldest_queued_job_age_seconds": None,
+        "ocr_cache": None,
         "error": None,
     }
 
@@ -197,6 +210,9 @@ def get_queue_health(queue_attr="task_queue"):
                 getattr(oldest_job, "enqueued_at", None) or getattr(oldest_job, "created_at", None)
             )
 
+        if queue_attr == "task_queue":
+            health["ocr_cache"] = _ocr_cache_stats(connection)
+
         health["healthy"] = health["redis_connected"] and health["worker_count"] > 0
         if not health["healthy"]:
             health["error"] = f"No active RQ workers are registered for {health['queue_name']}."
@@ -214,8 +230,141 @@ def get_all_queues_health():
     }
 
 
+SNAPSHOT_KEY_PREFIX = "ajs-pantry:queue-health"
+SNAPSHOT_INTERVAL_SECONDS = 5
+SNAPSHOT_MAX_AGE_SECONDS = 15
+SNAPSHOT_REFRESH_LOCK_SECONDS = 10
+
+
+def _snapshot_key(queue_attr):
+    return f"{SNAPSHOT_KEY_PREFIX}:{queue_attr}"
+
+
+def _snapshot_connection():
+    for attr in KNOWN_QUEUES:
+        queue = getattr(current_app, attr, None)
+        if queue and getattr(queue, "connection", None):
+            return queue.connection
+    return None
+
+
+def _store_snapshot(connection, queue_attr, health):
+    health = dict(health, sampled_at=time.time())
+    connection.set(
+        _snapshot_key(queue_attr),
+        json.dumps(health, default=str),
+        ex=SNAPSHOT_MAX_AGE_SECONDS * 4,
+    )
+    return health
+
+
+def write_queue_health_snapshots():
+    """Sample every known queue once and publish the results to Redis."""
+    connection = _snapshot_connection()
+    snapshots = {}
+    for attr in KNOWN_QUEUES:
+        health = get_queue_health(queue_attr=attr)
+        if connection is not None:
+            try:
+                health = _store_snapshot(connection, attr, health)
+            except Exception as exc:
+                logging.warning("Unable to store queue health snapshot for %s: %s", attr, exc)
+        snapshots[attr] = health
+    return snapshots
+
+
+def _fresh_snapshot(raw, max_age):
+    if not raw:
+        return None
+    try:
+        health = json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+    age = time.time() - float(health.get("sampled_at") or 0)
+    health["snapshot_age_seconds"] = max(0, int(age))
+    health["snapshot_stale"] = age > max_age
+    return health
+
+
+def _snapshot_or_live(connection, queue_attr, raw, max_age):
+    health = _fresh_snapshot(raw, max_age)
+    if health and not health["snapshot_stale"]:
+        return health
+
+    # Sampler is behind or not running: one caller refreshes, the rest reuse
+    # the stale copy rather than all walking the registries at once.
+    lock_key = f"{_snapshot_key(queue_attr)}:refresh"
+    try:
+        acquired = connection.set(lock_key, "1", nx=True, ex=SNAPSHOT_REFRESH_LOCK_SECONDS)
+    except Exception:
+        acquired = True
+    if health and not acquired:
+        return health
+
+    live = get_queue_health(queue_attr=queue_attr)
+    try:
+        live = _store_snapshot(connection, queue_attr, live)
+    except Exception:
+        pass
+    live["snapshot_age_seconds"] = 0
+    live["snapshot_stale"] = False
+    return live
+
+
+def get_queue_health_snapshot(queue_attr="task_queue", max_age=SNAPSHOT_MAX_AGE_SECONDS):
+    """Cheap read of the sampled health for one queue (falls back to a live sample)."""
+    connection = _snapshot_connection()
+    if connection is None:
+        return get_queue_health(queue_attr=queue_attr)
+    try:
+        raw = connection.get(_snapshot_key(queue_attr))
+    except Exception:
+        return get_queue_health(queue_attr=queue_attr)
+    return _snapshot_or_live(connection, queue_attr, raw, max_age)
+
+
+def get_all_queues_health_snapshot(max_age=SNAPSHOT_MAX_AGE_SECONDS):
+    """Sampled health for every named queue, fetched with a single MGET."""
+    connection = _snapshot_connection()
+    if connection is None:
+        return get_all_queues_health()
+    attrs = list(KNOWN_QUEUES)
+    try:
+        raws = connection.mget([_snapshot_key(attr) for attr in attrs])
+    except Exception:
+        return get_all_queues_health()
+    return {
+        KNOWN_QUEUES[attr]: _snapshot_or_live(connection, attr, raw, max_age)
+        for attr, raw in zip(attrs, raws)
+    }
+
+
+def run_queue_health_sampler(interval=SNAPSHOT_INTERVAL_SECONDS, iterations=None, metrics_interval=None):
+    """Blocking loop that refreshes the snapshots every ``interval`` seconds.
+
+    Every ``metrics_interval`` seconds the same sample is also appended to the
+    queue metrics time series.
+    """
+    from .queue_metrics import METRICS_INTERVAL_SECONDS, record_queue_metrics
+
+    metrics_interval = metrics_interval or METRICS_INTERVAL_SECONDS
+    next_metrics_at = 0.0
+    count = 0
+    while iterations is None or count < iterations:
+        started = time.monotonic()
+        try:
+            snapshots = write_queue_health_snapshots()
+            if started >= next_metrics_at:
+                record_queue_metrics(snapshots)
+                next_metrics_at = started + metrics_interval
+        except Exception:
+            logging.exception("Queue health sampling failed")
+        count += 1
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
 def active_worker_count():
-    return get_queue_health().get("worker_count", 0)
+    return get_queue_health_snapshot().get("worker_count", 0)
 
 
 def job_age_seconds(job):
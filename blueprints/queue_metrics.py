@@ -0,0 +1,227 @@
+"""Queue metrics time series for capacity planning.
+
+Once a minute the queue health sampler appends one point per queue to a
+fixed-size Redis list (LPUSH + LTRIM ring buffer): queue length, oldest job
+age, started/failed registry counts, plus throughput, wait time and run time
+of the jobs that finished since the previous point.
+
+Registry scores are expiry times and TTLs differ per job, so the registries
+cannot be asked which jobs ended recently. Instead ``MetricsWorker`` (used by
+``flask run-workers``) appends each job's timings to a per-queue list as it
+finishes or finally fails, and each sample takes and clears that list.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import time
+from datetime import datetime, timezone
+
+from flask import current_app
+
+from .queue_health import KNOWN_QUEUES, _as_aware
+
+try:
+    from rq import Worker
+    from rq.job import JobStatus
+except Exception:  # pragma: no cover - lets app boot without RQ installed
+    Worker = None
+    JobStatus = None
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY_PREFIX = "ajs-pantry:queue-metrics"
+METRICS_INTERVAL_SECONDS = 60
+# 24 hours of one-minute points per queue.
+METRICS_MAX_POINTS = 1440
+# Ended-job records kept per queue between samples; older ones are dropped.
+MAX_JOBS_PER_SAMPLE = 2000
+
+
+def _series_key(queue_attr):
+    return f"{METRICS_KEY_PREFIX}:{queue_attr}:points"
+
+
+def _cursor_key(queue_attr):
+    return f"{METRICS_KEY_PREFIX}:{queue_attr}:cursor"
+
+
+def _ended_key(queue_name):
+    return f"{METRICS_KEY_PREFIX}:{queue_name}:ended"
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return round(ordered[index], 2)
+
+
+def _timestamp(value):
+    value = _as_aware(value)
+    return value.timestamp() if value else None
+
+
+def record_job_end(connection, job, failed):
+    """Append ``job``'s timings to its queue's ended list; never raises."""
+    try:
+        record = {
+            "enqueued": _timestamp(getattr(job, "enqueued_at", None)),
+            "started": _timestamp(getattr(job, "started_at", None)),
+            "ended": _timestamp(getattr(job, "ended_at", None)) or time.time(),
+            "failed": bool(failed),
+        }
+        key = _ended_key(job.origin)
+        pipe = connection.pipeline()
+        pipe.rpush(key, json.dumps(record))
+        pipe.ltrim(key, -MAX_JOBS_PER_SAMPLE, -1)
+        pipe.execute()
+    except Exception:
+        logger.exception("Unable to record queue metrics for job %s", getattr(job, "id", None))
+
+
+def _take_ended_jobs(connection, queue_name):
+    """Ended-job records since the previous sample, clearing the list."""
+    pipe = connection.pipeline()
+    pipe.lrange(_ended_key(queue_name), 0, -1)
+    pipe.delete(_ended_key(queue_name))
+    raws, _ = pipe.execute()
+    records = []
+    for raw in raws:
+        try:
+            records.append(json.loads(raw))
+        except (TypeError, ValueError):
+            continue
+    return records
+
+
+def _job_timings(records):
+    waits, durations = [], []
+    for record in records:
+        enqueued, started, ended = record.get("enqueued"), record.get("started"), record.get("ended")
+        if enqueued and started:
+            waits.append(max(0.0, started - enqueued))
+        if started and ended:
+            durations.append(max(0.0, ended - started))
+    return waits, durations
+
+
+if Worker is not None:
+    class MetricsWorker(Worker):
+        """RQ worker that records each job's timings for the metrics series."""
+
+        def handle_job_success(self, job, queue, started_job_registry):
+            super().handle_job_success(job, queue, started_job_registry)
+            record_job_end(self.connection, job, failed=False)
+
+        def handle_job_failure(self, job, queue, started_job_registry=None, exc_string=''):
+            super().handle_job_failure(job, queue, started_job_registry=started_job_registry, exc_string=exc_string)
+            # Jobs requeued for a retry have not ended yet.
+            if job.get_status(refresh=False) == JobStatus.FAILED:
+                record_job_end(self.connection, job, failed=True)
+else:  # pragma: no cover
+    MetricsWorker = None
+
+
+def build_metrics_point(queue_attr, health, now=None):
+    """One time-series point for ``queue_attr`` from its health sample."""
+    now = now or time.time()
+    point = {
+        "ts": int(now),
+        "queue_length": health.get("queue_length"),
+        "oldest_age_seconds": health.get("oldest_queued_job_age_seconds"),
+        "started_count": health.get("started_count"),
+        "failed_count": health.get("failed_count"),
+        "worker_count": health.get("worker_count"),
+        "finished": 0,
+        "failed": 0,
+        "throughput_per_min": 0.0,
+        "wait_p50_seconds": None,
+        "wait_p95_seconds": None,
+        "duration_avg_seconds": None,
+        "duration_p95_seconds": None,
+    }
+
+    queue = getattr(current_app, queue_attr, None)
+    connection = getattr(queue, "connection", None)
+    if queue is None or connection is None:
+        return point
+
+    cursor_key = _cursor_key(queue_attr)
+    since = float(connection.get(cursor_key) or (now - METRICS_INTERVAL_SECONDS))
+    ended = _take_ended_jobs(connection, queue.name)
+    connection.set(cursor_key, now)
+
+    failed = sum(1 for record in ended if record.get("failed"))
+    finished = len(ended) - failed
+    waits, durations = _job_timings(ended)
+    elapsed_minutes = max((now - since) / 60, 1 / 60)
+    point.update({
+        "finished": finished,
+        "failed": failed,
+        "throughput_per_min": round(finished / elapsed_minutes, 2),
+        "wait_p50_seconds": _percentile(waits, 50),
+        "wait_p95_seconds": _percentile(waits, 95),
+        "duration_avg_seconds": round(sum(durations) / len(durations), 2) if durations else None,
+        "duration_p95_seconds": _percentile(durations, 95),
+    })
+    return point
+
+
+def record_queue_metrics(snapshots, now=None):
+    """Append a point per queue to its ring buffer; ``snapshots`` maps attr -> health."""
+    now = now or time.time()
+    for queue_attr, health in snapshots.items():
+        queue = getattr(current_app, queue_attr, None)
+        connection = getattr(queue, "connection", None)
+        if connection is None:
+            continue
+        try:
+            point = build_metrics_point(queue_attr, health, now=now)
+            pipe = connection.pipeline()
+            pipe.lpush(_series_key(queue_attr), json.dumps(point))
+            pipe.ltrim(_series_key(queue_attr), 0, METRICS_MAX_POINTS - 1)
+            pipe.execute()
+        except Exception:
+            logger.exception("Unable to record queue metrics for %s", queue_attr)
+
+
+def get_queue_metrics(queue_attr, limit=METRICS_MAX_POINTS):
+    """Stored points for ``queue_attr``, oldest first."""
+    queue = getattr(current_app, queue_attr, None)
+    connection = getattr(queue, "connection", None)
+    if connection is None:
+        return []
+    try:
+        raws = connection.lrange(_series_key(queue_attr), 0, max(0, limit - 1))
+    except Exception:
+        return []
+    points = []
+    for raw in reversed(raws):
+        try:
+            points.append(json.loads(raw))
+        except (TypeError, ValueError):
+            continue
+    return points
+
+
+def get_all_queue_metrics(limit=METRICS_MAX_POINTS):
+    """Chart-ready series for every named queue, keyed by label."""
+    series = {}
+    for attr, label in KNOWN_QUEUES.items():
+        points = get_queue_metrics(attr, limit=limit)
+        waits = [p["wait_p95_seconds"] for p in points if p.get("wait_p95_seconds") is not None]
+        series[label] = {
+            "queue_attr": attr,
+            "labels": [
+                datetime.fromtimestamp(p["ts"], timezone.utc).strftime("%H:%M") for p in points
+            ],
+            "points": points,
+            "total_finished": sum(p.get("finished") or 0 for p in points),
+            "total_failed": sum(p.get("failed") or 0 for p in points),
+            "peak_queue_length": max((p.get("queue_length") or 0 for p in points), default=0),
+            "worst_wait_p95_seconds": max(waits) if waits else None,
+        }
+    return series
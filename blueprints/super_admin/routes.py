@@ -2,12 +2,21 @@ import logging
 from flask import render_template, request, redirect, url_for, session, flash, abort, g, jsonify
 from werkzeug.security import check_password_hash, generate_password_hash
 from app import db, limiter
-from models import User, Tenant, Dish, DishEstimate, DishAuditLog, Menu, TeaTask, ProcurementItem, Feedback, Expense, PlatformAudit, Budget, FloorLendBorrow, Suggestion, normalize_dish_name, TenantAuditLog
+from models import User, Tenant, Dish, DishEstimate, DishAuditLog, DishDuplicateCluster, DishDuplicateClusterMember, DishUsageStats, Menu, TeaTask, ProcurementItem, Feedback, Expense, PlatformAudit, Budget, FloorLendBorrow, Suggestion, normalize_dish_name, TenantAuditLog
 from . import super_admin_bp
-from ..queue_health import get_queue_health, get_all_queues_health
+from ..audit_log import audit_log_stats
+from ..dish_clusters import discard_clusters_for_dishes, dismiss_cluster, suggested_canonical_id
+from ..dish_usage import dish_usage_counts, reconcile_dish_usage
+from ..email_fragments import clear_dish_preparation_guide
+from ..keyset import estimated_row_count, keyset_paginate
+from ..maintenance import run_maintenance
+from ..queue_health import get_queue_health, get_queue_health_snapshot, get_all_queues_health_snapshot
+from ..queue_metrics import get_all_queue_metrics
 from ..rate_limit_keys import client_ip_key, platform_admin_login_identifier_key
+from ..tenant_metrics import platform_dashboard_metrics
 from ..utils import require_super_admin, visible_budget_condition
 from sqlalchemy import func, or_
+from sqlalchemy.orm import selectinload
 from datetime import datetime, timedelta
 
 def log_platform_action(action, description):
@@ -54,21 +63,29 @@ def _database_health():
 @super_admin_bp.route('/platform-admin/system-health')
 def system_health():
     require_super_admin()
-    queues = get_all_queues_health()
+    queues = get_all_queues_health_snapshot()
     database = _database_health()
     overall_healthy = database["connected"] and all(q["healthy"] for q in queues.values())
     return render_template(
         'super_admin/system_health.html',
         queues=queues,
+        queue_metrics=get_all_queue_metrics(),
         database=database,
         overall_healthy=overall_healthy,
     )
 
 
+@super_admin_bp.route('/platform-admin/queue-metrics.json')
+def queue_metrics_json():
+    require_super_admin()
+    limit = request.args.get('limit', 1440, type=int)
+    return jsonify(get_all_queue_metrics(limit=max(1, min(limit, 1440))))
+
+
 @super_admin_bp.route('/platform-admin/system-health.json')
 def system_health_json():
     require_super_admin()
-    queues = get_all_queues_health()
+    queues = get_all_queues_health_snapshot()
     database = _database_health()
     overall_healthy = database["connected"] and all(q["healthy"] for q in queues.values())
     status_code = 200 if overall_healthy else 503
@@ -86,6 +103,12 @@ def _log_dish_audit(action, description, dish=None, details=None, target_dish=No
         actor_tenant_id=user.tenant_id if user else None,
     ))
 
+DUPLICATE_QUEUE_ORDER = (
+    DishDuplicateCluster.similarity.desc(),
+    DishDuplicateCluster.total_references.desc(),
+    DishDuplicateCluster.id.asc(),
+)
+
 def _parse_ingredient_lines(raw_text):
     items = []
     for line in (raw_text or '').splitlines():
@@ -102,21 +125,6 @@ def _parse_ingredient_lines(raw_text):
 def _parse_tip_lines(raw_text):
     return [line.strip() for line in (raw_text or '').splitlines() if line.strip()]
 
-def _dish_reference_counts(dish_ids):
-    if not dish_ids:
-        return {}
-    main_rows = db.session.query(Menu.dish_id, func.count(Menu.id)).filter(Menu.dish_id.in_(dish_ids)).group_by(Menu.dish_id).all()
-    side_rows = db.session.query(Menu.side_dish_id, func.count(Menu.id)).filter(Menu.side_dish_id.in_(dish_ids)).group_by(Menu.side_dish_id).all()
-    suggestion_rows = db.session.query(Suggestion.dish_id, func.count(Suggestion.id)).filter(Suggestion.dish_id.in_(dish_ids)).group_by(Suggestion.dish_id).all()
-    counts = {dish_id: {'main_menus': 0, 'side_menus': 0, 'suggestions': 0} for dish_id in dish_ids}
-    for dish_id, count in main_rows:
-        counts.setdefault(dish_id, {'main_menus': 0, 'side_menus': 0, 'suggestions': 0})['main_menus'] = count
-    for dish_id, count in side_rows:
-        counts.setdefault(dish_id, {'main_menus': 0, 'side_menus': 0, 'suggestions': 0})['side_menus'] = count
-    for dish_id, count in suggestion_rows:
-        counts.setdefault(dish_id, {'main_menus': 0, 'side_menus': 0, 'suggestions': 0})['suggestions'] = count
-    return counts
-
 @super_admin_bp.route('/platform-admin/login', methods=['GET', 'POST'])
 @limiter.limit("10 per minute", key_func=client_ip_key, methods=["POST"])
 @limiter.limit("50 per hour", key_func=client_ip_key, methods=["POST"])
@@ -142,115 +150,10 @@ def login():
 @super_admin_bp.route('/platform-admin/dashboard')
 def dashboard():
     require_super_admin()
-    queue_health = get_queue_health()
-    
-    # 1. Platform-Wide KPIs
-    total_tenants = Tenant.query.count()
-    total_users = User.query.filter(User.tenant_id.isnot(None)).count()
-    active_infrastructure = db.session.query(func.sum(Tenant.floor_count)).scalar() or 0
-    
-    # 2. Financial Utilization
-    total_budget = db.session.query(func.sum(Budget.amount_allocated)).filter(
-        visible_budget_condition()
-    ).scalar() or 0
-    total_spent_proc = db.session.query(func.sum(ProcurementItem.actual_cost)).filter(ProcurementItem.status == 'completed').scalar() or 0
-    total_spent_legacy = db.session.query(func.sum(Expense.amount)).scalar() or 0
-    total_spent = float(total_spent_proc or 0) + float(total_spent_legacy or 0)
-    financial_utilization = (total_spent / float(total_budget) * 100) if total_budget and total_budget > 0 else 0
-
-    # 3. Operational Completion Rate
-    total_tea = TeaTask.query.count()
-    completed_tea = TeaTask.query.filter_by(status='completed').count()
-    total_proc = ProcurementItem.query.count()
-    completed_proc = ProcurementItem.query.filter_by(status='completed').count()
-    
-    total_tasks = total_tea + total_proc
-    completed_tasks = completed_tea + completed_proc
-    completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-
-    # 4. Satisfaction Index
-    avg_rating = db.session.query(func.avg(Feedback.rating)).scalar() or 0
-    
-    # 5. Activity Heatbeat (Last 30 Days)
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    
-    def get_daily_counts(model):
-        return db.session.query(
-            func.date(model.created_at), 
-            func.count(model.id)
-        ).filter(model.created_at >= thirty_days_ago)\
-         .group_by(func.date(model.created_at)).all()
-
-    activity_trend = {}
-    for date_obj, count in get_daily_counts(Menu): activity_trend[str(date_obj)] = activity_trend.get(str(date_obj), 0) + count
-    for date_obj, count in get_daily_counts(TeaTask): activity_trend[str(date_obj)] = activity_trend.get(str(date_obj), 0) + count
-    for date_obj, count in get_daily_counts(ProcurementItem): activity_trend[str(date_obj)] = activity_trend.get(str(date_obj), 0) + count
-    for date_obj, count in get_daily_counts(Feedback): activity_trend[str(date_obj)] = activity_trend.get(str(date_obj), 0) + count
+    queue_health = get_queue_health_snapshot()
     
-    sorted_dates = sorted(activity_trend.keys())
-    activity_labels = [datetime.strptime(d, '%Y-%m-%d').strftime('%b %d') for d in sorted_dates]
-    activity_values = [activity_trend[d] for d in sorted_dates]
-
-    # 6. Financial Category Breakdown
-    categories = db.session.query(
-        ProcurementItem.category, 
-        func.sum(ProcurementItem.actual_cost)
-    ).filter(ProcurementItem.status == 'completed')\
-     .group_by(ProcurementItem.category).all()
-    
-    cat_labels = [c[0] for c in categories]
-    cat_values = [float(c[1] or 0) for c in categories]
-
-    # 7. Resource Sharing
-    total_shared = FloorLendBorrow.query.filter(FloorLendBorrow.created_at >= thirty_days_ago).count()
+    stats, at_risk_tenants, metrics_refreshed_at = platform_dashboard_metrics()
 
-    # 8. Tenant Performance Matrix & At-Risk
-    tenants_list = Tenant.query.all()
-    tenant_stats = []
-    at_risk_tenants = []
-    
-    for t in tenants_list:
-        u_count = User.query.filter_by(tenant_id=t.id).count()
-        f_rating = db.session.query(func.avg(Feedback.rating)).filter_by(tenant_id=t.id).scalar() or 0
-        t_spent_proc = db.session.query(func.sum(ProcurementItem.actual_cost)).filter_by(tenant_id=t.id, status='completed').scalar() or 0
-        t_spent_legacy = db.session.query(func.sum(Expense.amount)).filter_by(tenant_id=t.id).scalar() or 0
-        t_spent = float(t_spent_proc or 0) + float(t_spent_legacy or 0)
-        
-        last_activity = db.session.query(func.max(PlatformAudit.created_at)).filter_by(performed_by_id=User.id).join(User).filter(User.tenant_id == t.id).scalar()
-        
-        stat = {
-            'id': t.id,
-            'name': t.name,
-            'users': u_count,
-            'rating': round(float(f_rating), 1),
-            'spent': t_spent
-        }
-        tenant_stats.append(stat)
-        
-        # At-Risk logic
-        is_inactive = not last_activity or last_activity < (datetime.utcnow() - timedelta(days=7))
-        if f_rating > 0 and f_rating < 3.0 or is_inactive:
-            at_risk_tenants.append({
-                'name': t.name,
-                'reason': 'Low Satisfaction' if f_rating < 3.0 and f_rating > 0 else 'Inactivity',
-                'id': t.id
-            })
-
-    stats = {
-        'tenant_count': total_tenants,
-        'user_count': total_users,
-        'active_infra': active_infrastructure,
-        'financial_util': round(financial_utilization, 1),
-        'completion_rate': round(completion_rate, 1),
-        'avg_rating': round(float(avg_rating), 1),
-        'activity_labels': activity_labels,
-        'activity_values': activity_values,
-        'cat_labels': cat_labels,
-        'cat_values': cat_values,
-        'total_shared': total_shared,
-        'tenant_matrix': tenant_stats
-    }
-    
     recent_tenants = Tenant.query.order_by(Tenant.created_at.desc()).limit(5).all()
     recent_audits = PlatformAudit.query.order_by(PlatformAudit.created_at.desc()).limit(10).all()
         
@@ -259,8 +162,20 @@ def dashboard():
                            stats=stats, 
                            audits=recent_audits,
                            at_risk=at_risk_tenants,
+                           metrics_refreshed_at=metrics_refreshed_at,
                            queue_health=queue_health)
 
+
+@super_admin_bp.route('/platform-admin/metrics/refresh', methods=['POST'])
+def refresh_dashboard_metrics():
+    require_super_admin()
+    result = run_maintenance(['tenant-metrics'])['tenant-metrics']
+    if isinstance(result, dict):
+        flash(f"Dashboard metrics refreshed for {result['tenants']} tenant(s).", 'success')
+    else:
+        flash(f"Dashboard metrics were not refreshed: {result}.", 'error')
+    return redirect(url_for('super_admin.dashboard'))
+
 @super_admin_bp.route('/platform-admin/dishes')
 def global_dishes():
     # Allow super_admins here; other roles should use the pantry menus flow.
@@ -296,39 +211,24 @@ def global_dishes():
     )
     dishes = dishes_pagination.items
     dish_ids = [dish.id for dish in dishes]
-    reference_counts = _dish_reference_counts(dish_ids)
-
-    duplicate_rows = (
-        db.session.query(Dish.normalized_name, func.count(Dish.id).label('dish_count'))
-        .filter(Dish.is_archived == False, Dish.normalized_name.isnot(None), Dish.normalized_name != '')
-        .group_by(Dish.normalized_name)
-        .having(func.count(Dish.id) > 1)
-        .order_by(func.count(Dish.id).desc(), Dish.normalized_name.asc())
-        .limit(20)
+    reference_counts = dish_usage_counts(dish_ids)
+
+    open_clusters = DishDuplicateCluster.query.filter_by(status='open')
+    duplicate_clusters = (
+        open_clusters
+        .options(selectinload(DishDuplicateCluster.members).joinedload(DishDuplicateClusterMember.dish))
+        .order_by(*DUPLICATE_QUEUE_ORDER)
+        .limit(5)
         .all()
     )
-    duplicate_groups = []
-    for normalized_name, dish_count in duplicate_rows:
-        group_dishes = (
-            Dish.query
-            .filter(Dish.is_archived == False, Dish.normalized_name == normalized_name)
-            .order_by(Dish.id.asc())
-            .all()
-        )
-        group_counts = _dish_reference_counts([dish.id for dish in group_dishes])
-        duplicate_groups.append({
-            'normalized_name': normalized_name,
-            'dish_count': dish_count,
-            'dishes': group_dishes,
-            'counts': group_counts,
-        })
 
+    menu_count = func.coalesce(func.sum(DishUsageStats.menus), 0)
     usage_rows = (
-        db.session.query(Dish.id, Dish.name, func.count(Menu.id).label('menu_count'))
-        .outerjoin(Menu, or_(Menu.dish_id == Dish.id, Menu.side_dish_id == Dish.id))
+        db.session.query(Dish.id, Dish.name, menu_count.label('menu_count'))
+        .outerjoin(DishUsageStats, DishUsageStats.dish_id == Dish.id)
         .filter(Dish.is_archived == False)
         .group_by(Dish.id, Dish.name)
-        .order_by(func.count(Menu.id).desc(), func.lower(Dish.name).asc())
+        .order_by(menu_count.desc(), func.lower(Dish.name).asc())
         .limit(8)
         .all()
     )
@@ -338,7 +238,7 @@ def global_dishes():
         'active': Dish.query.filter(Dish.is_archived == False).count(),
         'archived': Dish.query.filter(Dish.is_archived == True).count(),
         'with_estimates': DishEstimate.query.count(),
-        'duplicate_groups': len(duplicate_rows),
+        'duplicate_groups': open_clusters.count(),
     }
     audit_logs = DishAuditLog.query.order_by(DishAuditLog.created_at.desc()).limit(20).all()
 
@@ -347,7 +247,8 @@ def global_dishes():
         dishes=dishes,
         pagination=dishes_pagination,
         reference_counts=reference_counts,
-        duplicate_groups=duplicate_groups,
+        duplicate_clusters=duplicate_clusters,
+        suggested_canonical_id=suggested_canonical_id,
         usage_rows=usage_rows,
         stats=stats,
         audit_logs=audit_logs,
@@ -475,6 +376,8 @@ def update_dish_estimate(dish_id):
     if not estimate:
         estimate = DishEstimate(dish=dish)
         db.session.add(estimate)
+    else:
+        clear_dish_preparation_guide(estimate)
 
     estimate.serving_count = serving_count
     estimate.summary = summary
@@ -510,6 +413,50 @@ def update_dish_estimate(dish_id):
     flash('Dish estimate updated.', 'success')
     return redirect(url_for('super_admin.global_dishes', q=dish.name))
 
+@super_admin_bp.route('/platform-admin/dishes/duplicates')
+def dish_duplicate_queue():
+    require_super_admin()
+    page = request.args.get('page', 1, type=int)
+    clusters = (
+        DishDuplicateCluster.query
+        .filter_by(status='open')
+        .options(selectinload(DishDuplicateCluster.members).joinedload(DishDuplicateClusterMember.dish))
+        .order_by(*DUPLICATE_QUEUE_ORDER)
+        .paginate(page=page, per_page=20, error_out=False)
+    )
+    last_run = db.session.query(func.max(DishDuplicateCluster.created_at)).filter_by(status='open').scalar()
+    return render_template(
+        'super_admin/dish_duplicates.html',
+        clusters=clusters.items,
+        pagination=clusters,
+        last_run=last_run,
+        suggested_canonical_id=suggested_canonical_id,
+    )
+
+@super_admin_bp.route('/platform-admin/dishes/duplicates/refresh', methods=['POST'])
+def refresh_dish_duplicate_queue():
+    require_super_admin()
+    result = run_maintenance(['dish-duplicates'])['dish-duplicates']
+    if isinstance(result, dict):
+        flash(f"Found {result['clusters']} duplicate candidate group(s) among {result['dishes']} active dishes.", 'success')
+    else:
+        flash(f"Duplicate scan did not run: {result}.", 'error')
+    return redirect(url_for('super_admin.dish_duplicate_queue'))
+
+@super_admin_bp.route('/platform-admin/dishes/duplicates/<int:cluster_id>/dismiss', methods=['POST'])
+def dismiss_dish_duplicate_cluster(cluster_id):
+    require_super_admin()
+    cluster = DishDuplicateCluster.query.get_or_404(cluster_id)
+    dismiss_cluster(cluster, session.get('user_id'))
+    _log_dish_audit(
+        'duplicate_dismissed',
+        f'Dismissed duplicate candidates: {", ".join(m.dish.name for m in cluster.members if m.dish)}.',
+        details={'dish_ids': [m.dish_id for m in cluster.members]},
+    )
+    db.session.commit()
+    flash('Candidate group dismissed. It will not be suggested again unless the group changes.', 'success')
+    return redirect(request.referrer or url_for('super_admin.dish_duplicate_queue'))
+
 @super_admin_bp.route('/platform-admin/dishes/merge/preview', methods=['POST'])
 def preview_dish_merge():
     require_super_admin()
@@ -531,7 +478,7 @@ def preview_dish_merge():
         flash('Choose one canonical dish and at least one duplicate to merge.', 'error')
         return redirect(url_for('super_admin.global_dishes'))
 
-    counts = _dish_reference_counts([dish.id for dish in sources])
+    counts = dish_usage_counts([dish.id for dish in sources])
     totals = {
         'main_menus': sum(c['main_menus'] for c in counts.values()),
         'side_menus': sum(c['side_menus'] for c in counts.values()),
@@ -570,6 +517,9 @@ def confirm_dish_merge():
     side_count = Menu.query.filter(Menu.side_dish_id.in_(source_ids)).update({Menu.side_dish_id: canonical.id}, synchronize_session=False)
     suggestion_count = Suggestion.query.filter(Suggestion.dish_id.in_(source_ids)).update({Suggestion.dish_id: canonical.id}, synchronize_session=False)
     canonical.is_archived = False
+    # Bulk updates skip the usage flush hook, so recount the merged dishes.
+    reconcile_dish_usage(source_ids + [canonical.id])
+    discard_clusters_for_dishes(source_ids + [canonical.id])
 
     for source in sources:
         source.is_archived = True
@@ -853,11 +803,10 @@ from sqlalchemy.orm import joinedload
 @super_admin_bp.route('/platform-admin/logs')
 def tenant_audit_logs():
     require_super_admin()
-    queue_health = get_queue_health()
+    queue_health = get_queue_health_snapshot()
     
     tenant_id_filter = request.args.get('tenant_id')
     action_filter = request.args.get('action')
-    page = request.args.get('page', 1, type=int)
     
     query = TenantAuditLog.query.options(joinedload(TenantAuditLog.tenant), joinedload(TenantAuditLog.actor_user))
     
@@ -866,39 +815,26 @@ def tenant_audit_logs():
     if action_filter:
         query = query.filter(TenantAuditLog.action == action_filter)
         
-    logs_pagination = query.order_by(TenantAuditLog.created_at.desc()).paginate(
-        page=page, per_page=50, error_out=False
+    logs_pagination = keyset_paginate(
+        query,
+        [TenantAuditLog.created_at.desc(), TenantAuditLog.id.desc()],
+        cursor=request.args.get('cursor'),
+        per_page=50,
+        total=None if (tenant_id_filter or action_filter) else estimated_row_count(TenantAuditLog),
     )
     
-    # Analytics / Trends
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    
-    # Total logs
-    total_logs = TenantAuditLog.query.count()
+    # Analytics / Trends, from the daily rollup plus a live count of the days after it
+    audit_stats = audit_log_stats(trend_days=30)
+    total_logs = audit_stats['total_logs']
+    action_labels = list(audit_stats['action_counts'])
+    action_values = list(audit_stats['action_counts'].values())
     
-    # Action distribution
-    action_counts = db.session.query(
-        TenantAuditLog.action, func.count(TenantAuditLog.id)
-    ).group_by(TenantAuditLog.action).all()
-    action_labels = [a[0] for a in action_counts]
-    action_values = [a[1] for a in action_counts]
-    
-    # Daily trend over last 30 days
-    daily_counts = db.session.query(
-        func.date(TenantAuditLog.created_at), func.count(TenantAuditLog.id)
-    ).filter(TenantAuditLog.created_at >= thirty_days_ago)\
-     .group_by(func.date(TenantAuditLog.created_at)).all()
-     
-    trend_dict = {}
-    for date_obj, count in daily_counts:
-        trend_dict[str(date_obj)] = count
-        
-    sorted_dates = sorted(trend_dict.keys())
+    sorted_dates = sorted(audit_stats['daily_counts'])
     trend_labels = [datetime.strptime(d, '%Y-%m-%d').strftime('%b %d') for d in sorted_dates]
-    trend_values = [trend_dict[d] for d in sorted_dates]
+    trend_values = [audit_stats['daily_counts'][d] for d in sorted_dates]
     
     tenants = Tenant.query.order_by(Tenant.name.asc()).all()
-    actions = [a[0] for a in db.session.query(TenantAuditLog.action).distinct().all()]
+    actions = audit_stats['actions']
     
     stats = {
         'total_logs': total_logs,
@@ -0,0 +1,286 @@
+"""Platform dashboard metrics, precomputed per tenant.
+
+The dashboard used to aggregate every tenant's budgets, spend, tasks and
+feedback on each page load, then run five more queries per tenant. Now the
+maintenance job (``flask maintenance --job tenant-metrics``) fills two tables
+and the dashboard only sums them:
+
+* ``tenant_metrics_snapshot`` holds one row of running totals per tenant.
+  Each refresh runs a fixed set of grouped queries, however many tenants
+  there are. Last activity only scans audits newer than the previous refresh.
+* ``tenant_activity_daily_count`` holds the 30-day engagement trend per
+  tenant and UTC day. Days before the last one counted are final; each
+  refresh recounts only from that day onwards.
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import case, delete, func
+
+from .utils import visible_budget_condition
+
+ACTIVITY_TREND_DAYS = 30
+INACTIVE_AFTER_DAYS = 7
+LOW_RATING = 3.0
+
+
+def _as_date(value):
+    # func.date() yields a date on Postgres and an ISO string on SQLite.
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def _grouped(query):
+    return {row[0]: row[1:] for row in query.all()}
+
+
+def refresh_tenant_snapshots():
+    """Recompute ``tenant_metrics_snapshot`` for every tenant; returns the tenant count."""
+    from app import db
+    from models import (
+        Budget, Expense, Feedback, PlatformAudit, ProcurementItem, TeaTask, Tenant,
+        TenantMetricsSnapshot, User,
+    )
+
+    now = datetime.utcnow()
+    tenant_ids = [tenant_id for tenant_id, in db.session.query(Tenant.id).all()]
+    snapshots = {snapshot.tenant_id: snapshot for snapshot in TenantMetricsSnapshot.query.all()}
+
+    users = _grouped(
+        db.session.query(User.tenant_id, func.count(User.id))
+        .filter(User.tenant_id.isnot(None))
+        .group_by(User.tenant_id)
+    )
+    ratings = _grouped(
+        db.session.query(Feedback.tenant_id, func.sum(Feedback.rating), func.count(Feedback.rating))
+        .filter(Feedback.tenant_id.isnot(None))
+        .group_by(Feedback.tenant_id)
+    )
+    budgets = _grouped(
+        db.session.query(Budget.tenant_id, func.sum(Budget.amount_allocated))
+        .filter(Budget.tenant_id.isnot(None), visible_budget_condition())
+        .group_by(Budget.tenant_id)
+    )
+    expenses = _grouped(
+        db.session.query(Expense.tenant_id, func.sum(Expense.amount))
+        .filter(Expense.tenant_id.isnot(None))
+        .group_by(Expense.tenant_id)
+    )
+    tea = _grouped(
+        db.session.query(
+            TeaTask.tenant_id,
+            func.count(TeaTask.id),
+            func.sum(case((TeaTask.status == 'completed', 1), else_=0)),
+        )
+        .filter(TeaTask.tenant_id.isnot(None))
+        .group_by(TeaTask.tenant_id)
+    )
+    procurement_completed = ProcurementItem.status == 'completed'
+    procurement = {}
+    for tenant_id, category, total, completed, spent in (
+        db.session.query(
+            ProcurementItem.tenant_id,
+            ProcurementItem.category,
+            func.count(ProcurementItem.id),
+            func.sum(case((procurement_completed, 1), else_=0)),
+            func.sum(case((procurement_completed, ProcurementItem.actual_cost), else_=None)),
+        )
+        .filter(ProcurementItem.tenant_id.isnot(None))
+        .group_by(ProcurementItem.tenant_id, ProcurementItem.category)
+        .all()
+    ):
+        entry = procurement.setdefault(tenant_id, {'total': 0, 'completed': 0, 'spent': Decimal('0'), 'categories': {}})
+        entry['total'] += total
+        entry['completed'] += int(completed or 0)
+        if completed:
+            entry['spent'] += Decimal(spent or 0)
+            entry['categories'][category] = float(spent or 0)
+
+    # Last activity only moves forward, so only audits since the oldest
+    # previous refresh need to be read.
+    since = None
+    if tenant_ids and all(tenant_id in snapshots for tenant_id in tenant_ids):
+        since = min(snapshots[tenant_id].refreshed_at for tenant_id in tenant_ids)
+    activity_query = (
+        db.session.query(User.tenant_id, func.max(PlatformAudit.created_at))
+        .join(User, User.id == PlatformAudit.performed_by_id)
+        .filter(User.tenant_id.isnot(None))
+    )
+    if since is not None:
+        activity_query = activity_query.filter(PlatformAudit.created_at >= since)
+    last_activity = _grouped(activity_query.group_by(User.tenant_id))
+
+    for tenant_id in tenant_ids:
+        snapshot = snapshots.get(tenant_id)
+        if snapshot is None:
+            snapshot = TenantMetricsSnapshot(tenant_id=tenant_id)
+            db.session.add(snapshot)
+        rating_sum, rating_count = ratings.get(tenant_id, (0, 0))
+        tea_total, tea_completed = tea.get(tenant_id, (0, 0))
+        proc = procurement.get(tenant_id, {'total': 0, 'completed': 0, 'spent': 0, 'categories': {}})
+
+        snapshot.user_count = users.get(tenant_id, (0,))[0]
+        snapshot.rating_sum = int(rating_sum or 0)
+        snapshot.rating_count = int(rating_count or 0)
+        snapshot.budget_allocated = budgets.get(tenant_id, (0,))[0] or 0
+        snapshot.expense_spent = Decimal(str(round(expenses.get(tenant_id, (0,))[0] or 0, 2)))
+        snapshot.procurement_spent = proc['spent']
+        snapshot.category_spend = proc['categories']
+        snapshot.tea_total = tea_total or 0
+        snapshot.tea_completed = int(tea_completed or 0)
+        snapshot.procurement_total = proc['total']
+        snapshot.procurement_completed = proc['completed']
+        latest = last_activity.get(tenant_id, (None,))[0]
+        if latest is not None and (snapshot.last_activity_at is None or latest > snapshot.last_activity_at):
+            snapshot.last_activity_at = latest
+        snapshot.refreshed_at = now
+
+    for tenant_id, snapshot in snapshots.items():
+        if tenant_id not in tenant_ids:
+            db.session.delete(snapshot)
+    db.session.commit()
+    return len(tenant_ids)
+
+
+def rollup_tenant_activity(trend_days=ACTIVITY_TREND_DAYS):
+    """Recount daily activity from the last counted day and drop days outside the trend."""
+    from app import db
+    from models import FloorLendBorrow, Feedback, Menu, ProcurementItem, TeaTask, TenantActivityDailyCount
+
+    today = datetime.utcnow().date()
+    window_start = today - timedelta(days=trend_days - 1)
+    last_day = db.session.query(func.max(TenantActivityDailyCount.day)).scalar()
+    # The last counted day may have been partial, so it is recounted.
+    start = max(last_day, window_start) if last_day is not None else window_start
+    start_at = datetime.combine(start, datetime.min.time())
+
+    counts = {}
+
+    def add_counts(model, field):
+        day = func.date(model.created_at)
+        rows = (
+            db.session.query(model.tenant_id, day, func.count(model.id))
+            .filter(model.tenant_id.isnot(None), model.created_at >= start_at)
+            .group_by(model.tenant_id, day)
+            .all()
+        )
+        for tenant_id, day_value, count in rows:
+            entry = counts.setdefault((tenant_id, _as_date(day_value)), {'activity_count': 0, 'shared_count': 0})
+            entry[field] += count
+
+    for model in (Menu, TeaTask, ProcurementItem, Feedback):
+        add_counts(model, 'activity_count')
+    add_counts(FloorLendBorrow, 'shared_count')
+
+    db.session.execute(
+        delete(TenantActivityDailyCount).where(
+            (TenantActivityDailyCount.day >= start) | (TenantActivityDailyCount.day < window_start)
+        )
+    )
+    db.session.add_all(
+        TenantActivityDailyCount(tenant_id=tenant_id, day=day, **entry)
+        for (tenant_id, day), entry in counts.items()
+    )
+    db.session.commit()
+    return len(counts)
+
+
+def refresh_tenant_metrics():
+    """Refresh the tenant snapshots and the daily activity trend."""
+    return {
+        'tenants': refresh_tenant_snapshots(),
+        'activity_rows': rollup_tenant_activity(),
+    }
+
+
+def platform_dashboard_metrics(trend_days=ACTIVITY_TREND_DAYS):
+    """
+    Dashboard figures summed from the snapshot tables: ``(stats, at_risk,
+    refreshed_at)``. Tenants created since the last refresh show zeros.
+    """
+    from app import db
+    from models import Tenant, TenantActivityDailyCount, TenantMetricsSnapshot
+
+    rows = (
+        db.session.query(Tenant, TenantMetricsSnapshot)
+        .outerjoin(TenantMetricsSnapshot, TenantMetricsSnapshot.tenant_id == Tenant.id)
+        .order_by(Tenant.created_at.asc())
+        .all()
+    )
+
+    now = datetime.utcnow()
+    inactive_before = now - timedelta(days=INACTIVE_AFTER_DAYS)
+    totals = {
+        'users': 0, 'rating_sum': 0, 'rating_count': 0, 'budget': 0.0, 'spent': 0.0,
+        'tasks': 0, 'completed_tasks': 0, 'floors': 0,
+    }
+    categories = {}
+    tenant_matrix = []
+    at_risk = []
+    refreshed_at = None
+
+    for tenant, snapshot in rows:
+        totals['floors'] += tenant.floor_count or 0
+        if snapshot is None:
+            tenant_matrix.append({'id': tenant.id, 'name': tenant.name, 'users': 0, 'rating': 0.0, 'spent': 0.0})
+            continue
+
+        spent = float(snapshot.procurement_spent or 0) + float(snapshot.expense_spent or 0)
+        rating = snapshot.rating_sum / snapshot.rating_count if snapshot.rating_count else 0
+        totals['users'] += snapshot.user_count
+        totals['rating_sum'] += snapshot.rating_sum
+        totals['rating_count'] += snapshot.rating_count
+        totals['budget'] += float(snapshot.budget_allocated or 0)
+        totals['spent'] += spent
+        totals['tasks'] += snapshot.tea_total + snapshot.procurement_total
+        totals['completed_tasks'] += snapshot.tea_completed + snapshot.procurement_completed
+        for category, amount in (snapshot.category_spend or {}).items():
+            categories[category] = categories.get(category, 0) + amount
+        if refreshed_at is None or snapshot.refreshed_at > refreshed_at:
+            refreshed_at = snapshot.refreshed_at
+
+        tenant_matrix.append({
+            'id': tenant.id,
+            'name': tenant.name,
+            'users': snapshot.user_count,
+            'rating': round(rating, 1),
+            'spent': spent,
+        })
+
+        low_rating = 0 < rating < LOW_RATING
+        is_inactive = not snapshot.last_activity_at or snapshot.last_activity_at < inactive_before
+        if low_rating or is_inactive:
+            at_risk.append({
+                'name': tenant.name,
+                'reason': 'Low Satisfaction' if low_rating else 'Inactivity',
+                'id': tenant.id,
+            })
+
+    trend_start = now.date() - timedelta(days=trend_days - 1)
+    trend = (
+        db.session.query(
+            TenantActivityDailyCount.day,
+            func.sum(TenantActivityDailyCount.activity_count),
+            func.sum(TenantActivityDailyCount.shared_count),
+        )
+        .filter(TenantActivityDailyCount.day >= trend_start)
+        .group_by(TenantActivityDailyCount.day)
+        .order_by(TenantActivityDailyCount.day.asc())
+        .all()
+    )
+    active_days = [(day, int(activity or 0)) for day, activity, _ in trend if activity]
+
+    stats = {
+        'tenant_count': len(rows),
+        'user_count': totals['users'],
+        'active_infra': totals['floors'],
+        'financial_util': round(totals['spent'] / totals['budget'] * 100, 1) if totals['budget'] > 0 else 0,
+        'completion_rate': round(totals['completed_tasks'] / totals['tasks'] * 100, 1) if totals['tasks'] else 0,
+        'avg_rating': round(totals['rating_sum'] / totals['rating_count'], 1) if totals['rating_count'] else 0,
+        'activity_labels': [day.strftime('%b %d') for day, _ in active_days],
+        'activity_values': [count for _, count in active_days],
+        'cat_labels': list(categories),
+        'cat_values': list(categories.values()),
+        'total_shared': sum(int(shared or 0) for _, _, shared in trend),
+        'tenant_matrix': tenant_matrix,
+    }
+    return stats, at_risk, refreshed_at
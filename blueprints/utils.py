@@ -248,39 +248,32 @@ def _get_current_user():
 import os
 import json
 import logging
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from pywebpush import webpush, WebPushException
+from .vapid_cache import DEFAULT_VAPID_SUBJECT, vapid_header_cache
 
-def send_email_notification(to_email, subject, html_content):
+def send_email_notification(to_email, subject, html_content, coalesce=True):
     """Dispatches an email notification, using the background queue if available."""
     if hasattr(current_app, 'email_queue') and current_app.email_queue:
-        current_app.email_queue.enqueue('blueprints.utils.send_email_worker', to_email, subject, html_content)
-        return True
+        from .notification_coalescer import buffer_email, coalesce_window_seconds
+        if coalesce and coalesce_window_seconds():
+            buffer_email(current_app.email_queue, to_email, subject, html_content)
+            return True
+        from .mailer import enqueue_email
+        return enqueue_email(current_app.email_queue, to_email, subject, html_content)
     return send_email_worker(to_email, subject, html_content)
 
 def send_email_worker(to_email, subject, html_content):
     """Synchronous worker that performs the actual email delivery."""
-    gmail_user = os.environ.get("GMAIL_USER")
-    gmail_pass = os.environ.get("GMAIL_PASS")
+    from .mailer import SMTPBatchSender
 
-    if not gmail_user or not gmail_pass:
+    sender = SMTPBatchSender()
+    if not sender.configured:
         logging.warning("Email notification failed: GMAIL credentials not found.")
         return False
 
-    msg = MIMEMultipart("alternative")
-    msg["From"] = gmail_user
-    msg["To"] = to_email
-    msg["Subject"] = subject
-    msg.attach(MIMEText(html_content, "html"))
-
     try:
-        server = smtplib.SMTP_SSL("smtp.gmail.com", 465)
-        server.login(gmail_user, gmail_pass)
-        server.sendmail(gmail_user, to_email, msg.as_string())
-        server.quit()
-        return True
+        with sender:
+            return sender.send(to_email, subject, html_content)
     except Exception as e:
         logging.error(f"Email Error: {e}")
         return False
@@ -288,6 +281,10 @@ def send_email_worker(to_email, subject, html_content):
 def send_push_notification(user_id, title, body, icon=None, url=None):
     """Dispatches a push notification, using the background queue if available."""
     if hasattr(current_app, 'notification_queue') and current_app.notification_queue:
+        from .notification_coalescer import buffer_push, coalesce_window_seconds
+        if coalesce_window_seconds():
+            buffer_push(current_app.notification_queue, user_id, title, body, icon, url)
+            return True
         current_app.notification_queue.enqueue('blueprints.utils.send_push_worker', user_id, title, body, icon, url)
         return True
     return send_push_worker(user_id, title, body, icon, url)
@@ -305,7 +302,7 @@ def send_push_worker(user_id, title, body, icon=None, url=None):
 
         vapid_private_key = os.environ.get("VAPID_PRIVATE_KEY")
         vapid_public_key = os.environ.get("VAPID_PUBLIC_KEY")
-        vapid_claims = {"sub": "mailto:admin@maskan.local"}
+        vapid_subject = os.environ.get("VAPID_CLAIMS_SUB") or DEFAULT_VAPID_SUBJECT
 
         if not vapid_private_key or not vapid_public_key:
             logging.warning("Push Notification failed: VAPID keys not found in environment.")
@@ -330,8 +327,8 @@ def send_push_worker(user_id, title, body, icon=None, url=None):
                         }
                     },
                     data=json.dumps(notification_data),
-                    vapid_private_key=vapid_private_key,
-                    vapid_claims=vapid_claims
+                    # Signed once per push-service origin and reused until near expiry.
+                    headers=vapid_header_cache.headers_for(sub.endpoint, vapid_private_key, vapid_subject)
                 )
                 success_count += 1
             except WebPushException as ex:
@@ -0,0 +1,82 @@
+"""Process-wide cache of signed VAPID headers for web push delivery.
+
+A VAPID JWT only depends on the push service origin (the ``aud`` claim), the
+contact ``sub`` and its expiry, so a worker can sign one token per origin and
+reuse it for every subscription on that service until shortly before expiry.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from urllib.parse import urlparse
+
+try:
+    from py_vapid import Vapid02 as Vapid
+except Exception:  # pragma: no cover - lets app boot without pywebpush installed
+    Vapid = None
+
+
+DEFAULT_VAPID_SUBJECT = "mailto:admin@maskan.local"
+
+# Push services reject tokens valid for more than 24h; pywebpush defaults to 12h.
+TOKEN_TTL_SECONDS = 12 * 60 * 60
+# Re-sign this long before expiry so a queued send never carries a stale token.
+REFRESH_MARGIN_SECONDS = 10 * 60
+
+
+def endpoint_origin(endpoint):
+    """Return the ``scheme://host[:port]`` audience for a push endpoint."""
+    parsed = urlparse(endpoint or "")
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+class VapidHeaderCache:
+    """Holds the parsed VAPID key and one signed header set per push origin."""
+
+    def __init__(self, ttl_seconds=TOKEN_TTL_SECONDS, refresh_margin_seconds=REFRESH_MARGIN_SECONDS, clock=time.time):
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._headers = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _signer(self, private_key):
+        signer = self._keys.get(private_key)
+        if signer is None:
+            if Vapid is None:
+                raise RuntimeError("py_vapid is not installed.")
+            signer = Vapid.from_string(private_key=private_key)
+            self._keys[private_key] = signer
+        return signer
+
+    def headers_for(self, endpoint, private_key, subject=DEFAULT_VAPID_SUBJECT):
+        """Return VAPID request headers for ``endpoint``, signing only on a miss."""
+        origin = endpoint_origin(endpoint)
+        cache_key = (private_key, subject, origin)
+        now = self._clock()
+
+        with self._lock:
+            cached = self._headers.get(cache_key)
+            if cached and cached[1] - self.refresh_margin_seconds > now:
+                self.hits += 1
+                return dict(cached[0])
+
+            expires_at = int(now) + self.ttl_seconds
+            claims = {"sub": subject, "aud": origin, "exp": expires_at}
+            headers = self._signer(private_key).sign(claims)
+            self._headers[cache_key] = (dict(headers), expires_at)
+            self.misses += 1
+            return dict(headers)
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+            self._headers.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+vapid_header_cache = VapidHeaderCache()
@@ -0,0 +1,146 @@
+"""Supervisor for per-queue RQ worker processes (``flask run-workers``).
+
+One ``rq worker`` listening on every queue lets a three-minute OCR job hold
+up every push and email behind it. The supervisor runs separate pools
+instead: OCR workers only take ``ajs_pantry_tasks``, while notification and
+email workers never take OCR jobs, so that capacity stays reserved for quick
+jobs. Crashed workers are restarted with backoff, and each worker exits after
+``max_jobs`` jobs (exit code 0) so it is recycled before Tesseract/pdfplumber
+memory creep builds up.
+"""
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import signal
+import time
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+TASK_QUEUE = "ajs_pantry_tasks"
+NOTIFICATION_QUEUE = "ajs_pantry_notifications"
+EMAIL_QUEUE = "ajs_pantry_emails"
+
+# Pool name -> queues in priority order. Notification and email pools back
+# each other up but never listen on the OCR queue.
+POOL_QUEUES = {
+    "tasks": [TASK_QUEUE],
+    "notifications": [NOTIFICATION_QUEUE, EMAIL_QUEUE],
+    "emails": [EMAIL_QUEUE, NOTIFICATION_QUEUE],
+}
+
+MAX_RESTART_BACKOFF_SECONDS = 60
+STOP_TIMEOUT_SECONDS = 190
+
+
+@dataclass
+class WorkerSlot:
+    pool: str
+    index: int
+    queues: list
+    max_jobs: int | None
+    process: multiprocessing.Process | None = None
+    crashes: int = 0
+    restart_at: float = 0.0
+    recycled: int = 0
+
+
+def _run_worker(redis_url, queues, max_jobs, with_scheduler):
+    """Child process entry point: one RQ worker until max_jobs or shutdown."""
+    from redis import Redis
+    from rq import Queue
+
+    from .queue_metrics import MetricsWorker
+
+    connection = Redis.from_url(redis_url)
+    worker = MetricsWorker([Queue(name, connection=connection) for name in queues], connection=connection)
+    worker.work(with_scheduler=with_scheduler, max_jobs=max_jobs or None)
+
+
+class WorkerSupervisor:
+    def __init__(self, redis_url, pool_sizes, max_jobs, with_scheduler=True):
+        self.redis_url = redis_url
+        self.with_scheduler = with_scheduler
+        # Spawned children start clean instead of inheriting the Flask app,
+        # DB pool and Redis sockets of the supervisor.
+        self._context = multiprocessing.get_context("spawn")
+        self._stopping = False
+        self.slots = [
+            WorkerSlot(pool=pool, index=index, queues=POOL_QUEUES[pool], max_jobs=max_jobs.get(pool))
+            for pool, size in pool_sizes.items()
+            for index in range(size)
+        ]
+
+    def _start(self, slot):
+        slot.process = self._context.Process(
+            target=_run_worker,
+            args=(self.redis_url, slot.queues, slot.max_jobs, self.with_scheduler),
+            name=f"rq-{slot.pool}-{slot.index}",
+            daemon=False,
+        )
+        slot.process.start()
+        logger.info(
+            "Started %s worker %s (pid=%s queues=%s max_jobs=%s)",
+            slot.pool,
+            slot.index,
+            slot.process.pid,
+            ",".join(slot.queues),
+            slot.max_jobs,
+        )
+
+    def _check(self, slot, now):
+        process = slot.process
+        if process is not None and process.is_alive():
+            return
+        if process is not None:
+            exitcode = process.exitcode
+            process.join(0)
+            slot.process = None
+            if exitcode == 0:
+                # Reached max_jobs: recycle straight away.
+                slot.crashes = 0
+                slot.recycled += 1
+                slot.restart_at = now
+                logger.info("Recycling %s worker %s after max_jobs", slot.pool, slot.index)
+            else:
+                slot.crashes += 1
+                delay = min(MAX_RESTART_BACKOFF_SECONDS, 2 ** min(slot.crashes, 6))
+                slot.restart_at = now + delay
+                logger.warning(
+                    "%s worker %s exited with code %s; restarting in %ss",
+                    slot.pool,
+                    slot.index,
+                    exitcode,
+                    delay,
+                )
+        if now >= slot.restart_at:
+            self._start(slot)
+
+    def stop(self, *_):
+        self._stopping = True
+
+    def _shutdown(self):
+        running = [slot.process for slot in self.slots if slot.process is not None and slot.process.is_alive()]
+        # SIGTERM is a warm shutdown for RQ: current jobs finish first.
+        for process in running:
+            process.terminate()
+        deadline = time.monotonic() + STOP_TIMEOUT_SECONDS
+        for process in running:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning("Worker pid=%s did not stop in time; killing", process.pid)
+                process.kill()
+                process.join(5)
+
+    def run(self, poll_interval=1.0):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        try:
+            while not self._stopping:
+                now = time.monotonic()
+                for slot in self.slots:
+                    self._check(slot, now)
+                time.sleep(poll_interval)
+        finally:
+            self._shutdown()
@@ -0,0 +1,72 @@
+"""add dish_usage_stats counters
+
+Revision ID: a5c9e3b1f746
+Revises: f4b8d2a0e635
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5c9e3b1f746'
+down_revision = 'f4b8d2a0e635'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'dish_usage_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tenant_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('dish_id', sa.Integer(), nullable=False),
+        sa.Column('main_menus', sa.Integer(), nullable=False),
+        sa.Column('side_menus', sa.Integer(), nullable=False),
+        sa.Column('suggestions', sa.Integer(), nullable=False),
+        sa.Column('votes', sa.Integer(), nullable=False),
+        sa.Column('feedback_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['dish_id'], ['dish.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('dish_id', 'tenant_id', name='uq_dish_usage_stats_dish_tenant'),
+    )
+    op.create_index(op.f('ix_dish_usage_stats_dish_id'), 'dish_usage_stats', ['dish_id'], unique=False)
+    op.create_index(op.f('ix_dish_usage_stats_tenant_id'), 'dish_usage_stats', ['tenant_id'], unique=False)
+
+    # Backfill so the write hooks start from correct counts;
+    # `flask reconcile-dish-usage` rebuilds the same numbers.
+    op.execute("""
+        INSERT INTO dish_usage_stats (dish_id, tenant_id, main_menus, side_menus, suggestions, votes, feedback_count)
+        SELECT dish_id, tenant_id, SUM(main_menus), SUM(side_menus), SUM(suggestions), SUM(votes), SUM(feedback_count)
+        FROM (
+            SELECT dish_id, tenant_id, 1 AS main_menus, 0 AS side_menus, 0 AS suggestions, 0 AS votes, 0 AS feedback_count
+            FROM menu WHERE dish_id IS NOT NULL
+            UNION ALL
+            SELECT side_dish_id, tenant_id, 0, 1, 0, 0, 0
+            FROM menu WHERE side_dish_id IS NOT NULL
+            UNION ALL
+            SELECT dish_id, tenant_id, 0, 0, 1, 0, 0
+            FROM suggestion WHERE dish_id IS NOT NULL
+            UNION ALL
+            SELECT s.dish_id, v.tenant_id, 0, 0, 0, 1, 0
+            FROM suggestion_vote v JOIN suggestion s ON s.id = v.suggestion_id
+            WHERE s.dish_id IS NOT NULL
+            UNION ALL
+            SELECT md.dish_id, f.tenant_id, 0, 0, 0, 0, 1
+            FROM feedback f JOIN (
+                SELECT id, dish_id FROM menu WHERE dish_id IS NOT NULL
+                UNION
+                SELECT id, side_dish_id FROM menu WHERE side_dish_id IS NOT NULL
+            ) md ON md.id = f.menu_id
+        ) dish_refs
+        GROUP BY dish_id, tenant_id
+    """)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_dish_usage_stats_tenant_id'), table_name='dish_usage_stats')
+    op.drop_index(op.f('ix_dish_usage_stats_dish_id'), table_name='dish_usage_stats')
+    op.drop_table('dish_usage_stats')
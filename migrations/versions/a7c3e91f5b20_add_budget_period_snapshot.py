@@ -0,0 +1,48 @@
+"""add budget_period_snapshot
+
+Revision ID: a7c3e91f5b20
+Revises: da3aec7ee317
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e91f5b20'
+down_revision = 'da3aec7ee317'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('budget_period_snapshot',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('floor', sa.Integer(), nullable=False),
+    sa.Column('source_type', sa.String(length=20), nullable=False),
+    sa.Column('source_id', sa.Integer(), nullable=False),
+    sa.Column('faculty_workflow_enabled', sa.Boolean(), nullable=False),
+    sa.Column('start_date', sa.Date(), nullable=False),
+    sa.Column('effective_end_date', sa.Date(), nullable=True),
+    sa.Column('allocated_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('opening_balance', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('spent_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('closing_balance', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('tenant_id', sa.UUID(), nullable=True),
+    sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('tenant_id', 'floor', 'source_type', 'source_id', name='uq_budget_period_snapshot_source')
+    )
+    with op.batch_alter_table('budget_period_snapshot', schema=None) as batch_op:
+        batch_op.create_index('idx_budget_period_snapshot_tenant_floor', ['tenant_id', 'floor'], unique=False)
+        batch_op.create_index(batch_op.f('ix_budget_period_snapshot_tenant_id'), ['tenant_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('budget_period_snapshot', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_budget_period_snapshot_tenant_id'))
+        batch_op.drop_index('idx_budget_period_snapshot_tenant_floor')
+
+    op.drop_table('budget_period_snapshot')
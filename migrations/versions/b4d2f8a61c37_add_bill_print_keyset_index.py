@@ -0,0 +1,30 @@
+"""add bill keyset index for the print module
+
+Revision ID: b4d2f8a61c37
+Revises: a7c3e91f5b20
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4d2f8a61c37'
+down_revision = 'a7c3e91f5b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('bill', schema=None) as batch_op:
+        batch_op.create_index(
+            'idx_bill_tenant_floor_archived_date',
+            ['tenant_id', 'floor', 'is_archived', 'bill_date', 'id'],
+            unique=False,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('bill', schema=None) as batch_op:
+        batch_op.drop_index('idx_bill_tenant_floor_archived_date')
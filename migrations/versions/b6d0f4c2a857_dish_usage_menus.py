@@ -0,0 +1,42 @@
+"""add dish_usage_stats.menus
+
+Revision ID: b6d0f4c2a857
+Revises: a5c9e3b1f746
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d0f4c2a857'
+down_revision = 'a5c9e3b1f746'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'dish_usage_stats',
+        sa.Column('menus', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+    # Distinct menus per dish: one serving the dish as main and side counts once.
+    op.execute("""
+        UPDATE dish_usage_stats
+        SET menus = (
+            SELECT COUNT(*) FROM (
+                SELECT id, tenant_id, dish_id FROM menu WHERE dish_id IS NOT NULL
+                UNION
+                SELECT id, tenant_id, side_dish_id FROM menu WHERE side_dish_id IS NOT NULL
+            ) md
+            WHERE md.dish_id = dish_usage_stats.dish_id
+              AND (md.tenant_id = dish_usage_stats.tenant_id
+                   OR (md.tenant_id IS NULL AND dish_usage_stats.tenant_id IS NULL))
+        )
+    """)
+
+
+def downgrade():
+    op.drop_column('dish_usage_stats', 'menus')
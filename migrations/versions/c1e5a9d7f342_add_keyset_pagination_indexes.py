@@ -0,0 +1,39 @@
+"""add keyset pagination indexes
+
+Revision ID: c1e5a9d7f342
+Revises: b4d2f8a61c37
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c1e5a9d7f342'
+down_revision = 'b4d2f8a61c37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keyset cursors cannot point at a NULL sort key; these columns were
+    # always meant to be set on insert.
+    op.execute("UPDATE feedback SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP) WHERE created_at IS NULL")
+    op.execute("UPDATE tenant_audit_log SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+
+    with op.batch_alter_table('feedback', schema=None) as batch_op:
+        batch_op.create_index('idx_feedback_tenant_floor_created', ['tenant_id', 'floor', 'created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('tenant_audit_log', schema=None) as batch_op:
+        batch_op.create_index('idx_tenant_audit_log_created_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('idx_tenant_audit_log_tenant_created', ['tenant_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('tenant_audit_log', schema=None) as batch_op:
+        batch_op.drop_index('idx_tenant_audit_log_tenant_created')
+        batch_op.drop_index('idx_tenant_audit_log_created_id')
+
+    with op.batch_alter_table('feedback', schema=None) as batch_op:
+        batch_op.drop_index('idx_feedback_tenant_floor_created')
@@ -0,0 +1,116 @@
+"""partition tenant_audit_log by month and add daily rollups
+
+Revision ID: d2f6b0c8e413
+Revises: c1e5a9d7f342
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from datetime import date, datetime
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f6b0c8e413'
+down_revision = 'c1e5a9d7f342'
+branch_labels = None
+depends_on = None
+
+PARTITION_PREFIX = 'tenant_audit_log_p'
+MONTHS_AHEAD = 2
+
+AUDIT_COLUMNS = 'id, tenant_id, actor_user_id, action, target_type, target_id, description, details_json, created_at'
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_audit_table(name, partitioned):
+    primary_key = 'PRIMARY KEY (id, created_at)' if partitioned else 'PRIMARY KEY (id)'
+    op.execute(f"""
+        CREATE TABLE {name} (
+            id INTEGER NOT NULL DEFAULT nextval('tenant_audit_log_id_seq'),
+            tenant_id UUID REFERENCES tenants (id),
+            actor_user_id INTEGER REFERENCES "user" (id),
+            action VARCHAR(100) NOT NULL,
+            target_type VARCHAR(80),
+            target_id VARCHAR(80),
+            description TEXT,
+            details_json JSON,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            {primary_key}
+        ){' PARTITION BY RANGE (created_at)' if partitioned else ''}
+    """)
+
+
+def _swap_audit_table(new_name):
+    """Copy rows into ``new_name`` and put it in place of tenant_audit_log."""
+    op.execute("ALTER SEQUENCE tenant_audit_log_id_seq OWNED BY NONE")
+    op.execute(f"INSERT INTO {new_name} ({AUDIT_COLUMNS}) SELECT {AUDIT_COLUMNS} FROM tenant_audit_log")
+    op.execute("DROP TABLE tenant_audit_log CASCADE")
+    op.execute(f"ALTER TABLE {new_name} RENAME TO tenant_audit_log")
+    op.execute(f"ALTER TABLE tenant_audit_log RENAME CONSTRAINT {new_name}_pkey TO tenant_audit_log_pkey")
+    op.execute("ALTER SEQUENCE tenant_audit_log_id_seq OWNED BY tenant_audit_log.id")
+
+    op.create_index(op.f('ix_tenant_audit_log_action'), 'tenant_audit_log', ['action'], unique=False)
+    op.create_index(op.f('ix_tenant_audit_log_actor_user_id'), 'tenant_audit_log', ['actor_user_id'], unique=False)
+    op.create_index(op.f('ix_tenant_audit_log_created_at'), 'tenant_audit_log', ['created_at'], unique=False)
+    op.create_index(op.f('ix_tenant_audit_log_tenant_id'), 'tenant_audit_log', ['tenant_id'], unique=False)
+    op.create_index('idx_tenant_audit_log_created_id', 'tenant_audit_log', ['created_at', 'id'], unique=False)
+    op.create_index('idx_tenant_audit_log_tenant_created', 'tenant_audit_log', ['tenant_id', 'created_at', 'id'], unique=False)
+
+
+def upgrade():
+    op.create_table(
+        'tenant_audit_daily_count',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tenant_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('action', sa.String(length=100), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('event_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_tenant_audit_daily_count_tenant_id'), 'tenant_audit_daily_count', ['tenant_id'], unique=False)
+    op.create_index('idx_tenant_audit_daily_count_day', 'tenant_audit_daily_count', ['day', 'action'], unique=False)
+    # Rollups are backfilled by the first `flask maintenance --job audit-log` run.
+
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        with op.batch_alter_table('tenant_audit_log', schema=None) as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+        return
+
+    _create_audit_table('tenant_audit_log_partitioned', partitioned=True)
+
+    first_event = bind.execute(sa.text("SELECT MIN(created_at) FROM tenant_audit_log")).scalar()
+    current = date(datetime.utcnow().year, datetime.utcnow().month, 1)
+    month = date(first_event.year, first_event.month, 1) if first_event else current
+    last = _add_months(current, MONTHS_AHEAD)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE {PARTITION_PREFIX}{month:%Y%m} PARTITION OF tenant_audit_log_partitioned "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        month = _add_months(month, 1)
+    # Catches rows outside the prepared months if the maintenance job stops running.
+    op.execute("CREATE TABLE tenant_audit_log_default PARTITION OF tenant_audit_log_partitioned DEFAULT")
+
+    _swap_audit_table('tenant_audit_log_partitioned')
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        _create_audit_table('tenant_audit_log_plain', partitioned=False)
+        _swap_audit_table('tenant_audit_log_plain')
+    with op.batch_alter_table('tenant_audit_log', schema=None) as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
+
+    op.drop_index('idx_tenant_audit_daily_count_day', table_name='tenant_audit_daily_count')
+    op.drop_index(op.f('ix_tenant_audit_daily_count_tenant_id'), table_name='tenant_audit_daily_count')
+    op.drop_table('tenant_audit_daily_count')
@@ -0,0 +1,65 @@
+"""add tenant metrics snapshot and daily activity tables
+
+Revision ID: e3a7c1f9d524
+Revises: d2f6b0c8e413
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a7c1f9d524'
+down_revision = 'd2f6b0c8e413'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'tenant_metrics_snapshot',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tenant_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('user_count', sa.Integer(), nullable=False),
+        sa.Column('rating_sum', sa.Integer(), nullable=False),
+        sa.Column('rating_count', sa.Integer(), nullable=False),
+        sa.Column('budget_allocated', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('procurement_spent', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('expense_spent', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('category_spend', sa.JSON(), nullable=True),
+        sa.Column('tea_total', sa.Integer(), nullable=False),
+        sa.Column('tea_completed', sa.Integer(), nullable=False),
+        sa.Column('procurement_total', sa.Integer(), nullable=False),
+        sa.Column('procurement_completed', sa.Integer(), nullable=False),
+        sa.Column('last_activity_at', sa.DateTime(), nullable=True),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('tenant_id', name='uq_tenant_metrics_snapshot_tenant'),
+    )
+    op.create_index(op.f('ix_tenant_metrics_snapshot_tenant_id'), 'tenant_metrics_snapshot', ['tenant_id'], unique=False)
+
+    op.create_table(
+        'tenant_activity_daily_count',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tenant_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('activity_count', sa.Integer(), nullable=False),
+        sa.Column('shared_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_tenant_activity_daily_count_tenant_id'), 'tenant_activity_daily_count', ['tenant_id'], unique=False)
+    op.create_index('idx_tenant_activity_daily_count_day', 'tenant_activity_daily_count', ['day'], unique=False)
+    # Both tables are filled by the first `flask maintenance --job tenant-metrics` run.
+
+
+def downgrade():
+    op.drop_index('idx_tenant_activity_daily_count_day', table_name='tenant_activity_daily_count')
+    op.drop_index(op.f('ix_tenant_activity_daily_count_tenant_id'), table_name='tenant_activity_daily_count')
+    op.drop_table('tenant_activity_daily_count')
+
+    op.drop_index(op.f('ix_tenant_metrics_snapshot_tenant_id'), table_name='tenant_metrics_snapshot')
+    op.drop_table('tenant_metrics_snapshot')
@@ -0,0 +1,66 @@
+"""add dish duplicate cluster review queue
+
+Revision ID: f4b8d2a0e635
+Revises: e3a7c1f9d524
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4b8d2a0e635'
+down_revision = 'e3a7c1f9d524'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'dish_duplicate_cluster',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('member_key', sa.String(length=40), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('similarity', sa.Float(), nullable=False),
+        sa.Column('dish_count', sa.Integer(), nullable=False),
+        sa.Column('total_references', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('reviewed_at', sa.DateTime(), nullable=True),
+        sa.Column('reviewed_by_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['reviewed_by_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_dish_duplicate_cluster_member_key'), 'dish_duplicate_cluster', ['member_key'], unique=False)
+    op.create_index(
+        'idx_dish_duplicate_cluster_queue',
+        'dish_duplicate_cluster',
+        ['status', 'similarity', 'total_references', 'id'],
+        unique=False,
+    )
+
+    op.create_table(
+        'dish_duplicate_cluster_member',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cluster_id', sa.Integer(), nullable=False),
+        sa.Column('dish_id', sa.Integer(), nullable=False),
+        sa.Column('main_menus', sa.Integer(), nullable=False),
+        sa.Column('side_menus', sa.Integer(), nullable=False),
+        sa.Column('suggestions', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['cluster_id'], ['dish_duplicate_cluster.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['dish_id'], ['dish.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_dish_duplicate_cluster_member_cluster_id'), 'dish_duplicate_cluster_member', ['cluster_id'], unique=False)
+    op.create_index(op.f('ix_dish_duplicate_cluster_member_dish_id'), 'dish_duplicate_cluster_member', ['dish_id'], unique=False)
+    # The queue is filled by the first `flask maintenance --job dish-duplicates` run.
+
+
+def downgrade():
+    op.drop_index(op.f('ix_dish_duplicate_cluster_member_dish_id'), table_name='dish_duplicate_cluster_member')
+    op.drop_index(op.f('ix_dish_duplicate_cluster_member_cluster_id'), table_name='dish_duplicate_cluster_member')
+    op.drop_table('dish_duplicate_cluster_member')
+
+    op.drop_index('idx_dish_duplicate_cluster_queue', table_name='dish_duplicate_cluster')
+    op.drop_index(op.f('ix_dish_duplicate_cluster_member_key'), table_name='dish_duplicate_cluster')
+    op.drop_table('dish_duplicate_cluster')
@@ -2,8 +2,9 @@ from app import db
 from datetime import datetime
 from enum import Enum
 import uuid
+from collections import defaultdict
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy import event
+from sqlalchemy import event, func, inspect, select
 from sqlalchemy.orm import with_loader_criteria
 from flask import g
 
@@ -44,6 +45,10 @@ class TenantMixin:
 
 class TenantAuditLog(db.Model, TenantMixin):
     __tablename__ = 'tenant_audit_log'
+    __table_args__ = (
+        db.Index('idx_tenant_audit_log_created_id', 'created_at', 'id'),
+        db.Index('idx_tenant_audit_log_tenant_created', 'tenant_id', 'created_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     actor_user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True, index=True)
@@ -52,11 +57,60 @@ class TenantAuditLog(db.Model, TenantMixin):
     target_id = db.Column(db.String(80), nullable=True)
     description = db.Column(db.Text, nullable=True)
     details_json = db.Column(db.JSON, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    # Partition key of the monthly partitions on Postgres, so never NULL.
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
 
     actor_user = db.relationship('User', foreign_keys=[actor_user_id])
     tenant = db.relationship('Tenant', foreign_keys='TenantAuditLog.tenant_id')
 
+
+class TenantAuditDailyCount(db.Model, TenantMixin):
+    """Audit events per (tenant, action, UTC day), rolled up by the maintenance job."""
+    __tablename__ = 'tenant_audit_daily_count'
+    __table_args__ = (
+        db.Index('idx_tenant_audit_daily_count_day', 'day', 'action'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    action = db.Column(db.String(100), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    event_count = db.Column(db.Integer, nullable=False, default=0)
+
+class TenantMetricsSnapshot(db.Model, TenantMixin):
+    """Per-tenant totals for the platform dashboard, refreshed by the maintenance job."""
+    __tablename__ = 'tenant_metrics_snapshot'
+    __table_args__ = (
+        db.UniqueConstraint('tenant_id', name='uq_tenant_metrics_snapshot_tenant'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_count = db.Column(db.Integer, nullable=False, default=0)
+    # Sum and count of non-null ratings, so platform averages weight by feedback.
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    budget_allocated = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    procurement_spent = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    expense_spent = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    category_spend = db.Column(db.JSON, nullable=True)  # {category: completed procurement spend}
+    tea_total = db.Column(db.Integer, nullable=False, default=0)
+    tea_completed = db.Column(db.Integer, nullable=False, default=0)
+    procurement_total = db.Column(db.Integer, nullable=False, default=0)
+    procurement_completed = db.Column(db.Integer, nullable=False, default=0)
+    last_activity_at = db.Column(db.DateTime, nullable=True)
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class TenantActivityDailyCount(db.Model, TenantMixin):
+    """Menus, tea tasks, procurement items and feedback created per tenant and UTC day."""
+    __tablename__ = 'tenant_activity_daily_count'
+    __table_args__ = (
+        db.Index('idx_tenant_activity_daily_count_day', 'day'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    activity_count = db.Column(db.Integer, nullable=False, default=0)
+    shared_count = db.Column(db.Integer, nullable=False, default=0)  # FloorLendBorrow requests
+
 class User(db.Model, TenantMixin):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), nullable=True)
@@ -123,6 +177,58 @@ class DishAuditLog(db.Model):
     performed_by = db.relationship('User', foreign_keys=[performed_by_id])
     actor_tenant = db.relationship('Tenant', foreign_keys=[actor_tenant_id])
 
+class DishDuplicateCluster(db.Model):
+    """A group of near-duplicate dishes found by the clustering job, awaiting review."""
+    __tablename__ = 'dish_duplicate_cluster'
+    __table_args__ = (
+        db.Index('idx_dish_duplicate_cluster_queue', 'status', 'similarity', 'total_references', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    # sha1 of the sorted member ids; a dismissed set stays dismissed on later runs.
+    member_key = db.Column(db.String(40), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default='open')  # open, dismissed
+    similarity = db.Column(db.Float, nullable=False)  # weakest link that joined the cluster
+    dish_count = db.Column(db.Integer, nullable=False)
+    total_references = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    reviewed_at = db.Column(db.DateTime, nullable=True)
+    reviewed_by_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+
+    reviewed_by = db.relationship('User', foreign_keys=[reviewed_by_id])
+    members = db.relationship(
+        'DishDuplicateClusterMember',
+        back_populates='cluster',
+        cascade='all, delete-orphan',
+        order_by='DishDuplicateClusterMember.id',
+    )
+
+class DishDuplicateClusterMember(db.Model):
+    __tablename__ = 'dish_duplicate_cluster_member'
+    id = db.Column(db.Integer, primary_key=True)
+    cluster_id = db.Column(db.Integer, db.ForeignKey('dish_duplicate_cluster.id', ondelete='CASCADE'), nullable=False, index=True)
+    dish_id = db.Column(db.Integer, db.ForeignKey('dish.id', ondelete='CASCADE'), nullable=False, index=True)
+    main_menus = db.Column(db.Integer, nullable=False, default=0)
+    side_menus = db.Column(db.Integer, nullable=False, default=0)
+    suggestions = db.Column(db.Integer, nullable=False, default=0)
+
+    cluster = db.relationship('DishDuplicateCluster', back_populates='members')
+    dish = db.relationship('Dish')
+
+class DishUsageStats(db.Model, TenantMixin):
+    """Reference counters per (dish, tenant), kept current by the flush hook below."""
+    __tablename__ = 'dish_usage_stats'
+    __table_args__ = (
+        db.UniqueConstraint('dish_id', 'tenant_id', name='uq_dish_usage_stats_dish_tenant'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    dish_id = db.Column(db.Integer, db.ForeignKey('dish.id', ondelete='CASCADE'), nullable=False, index=True)
+    main_menus = db.Column(db.Integer, nullable=False, default=0)
+    side_menus = db.Column(db.Integer, nullable=False, default=0)
+    menus = db.Column(db.Integer, nullable=False, default=0)  # distinct menus serving it as main or side
+    suggestions = db.Column(db.Integer, nullable=False, default=0)
+    votes = db.Column(db.Integer, nullable=False, default=0)  # votes on suggestions of the dish
+    feedback_count = db.Column(db.Integer, nullable=False, default=0)  # feedback on menus serving the dish
+
 class RoomRotationSettings(db.Model, TenantMixin):
     __tablename__ = 'room_rotation_settings'
     __table_args__ = (
@@ -286,6 +392,7 @@ class SuggestionVote(db.Model, TenantMixin):
 class Feedback(db.Model, TenantMixin):
     __table_args__ = (
         db.Index('idx_feedback_tenant_floor', 'tenant_id', 'floor'),
+        db.Index('idx_feedback_tenant_floor_created', 'tenant_id', 'floor', 'created_at', 'id'),
     )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
@@ -322,6 +429,7 @@ class Request(db.Model, TenantMixin):
 class Bill(db.Model, TenantMixin):
     __table_args__ = (
         db.Index('idx_bill_tenant_floor', 'tenant_id', 'floor'),
+        db.Index('idx_bill_tenant_floor_archived_date', 'tenant_id', 'floor', 'is_archived', 'bill_date', 'id'),
     )
     id = db.Column(db.Integer, primary_key=True)
     bill_no = db.Column(db.String(100), nullable=False)
@@ -500,6 +608,26 @@ class ExpensePrintReportBill(db.Model, TenantMixin):
     bill = db.relationship('Bill', foreign_keys=[bill_id])
 
 
+class BudgetPeriodSnapshot(db.Model, TenantMixin):
+    __tablename__ = 'budget_period_snapshot'
+    __table_args__ = (
+        db.UniqueConstraint('tenant_id', 'floor', 'source_type', 'source_id', name='uq_budget_period_snapshot_source'),
+        db.Index('idx_budget_period_snapshot_tenant_floor', 'tenant_id', 'floor'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    floor = db.Column(db.Integer, nullable=False)
+    source_type = db.Column(db.String(20), nullable=False)  # faculty_cycle, manual
+    source_id = db.Column(db.Integer, nullable=False)
+    faculty_workflow_enabled = db.Column(db.Boolean, nullable=False)
+    start_date = db.Column(db.Date, nullable=False)
+    effective_end_date = db.Column(db.Date, nullable=True)
+    allocated_amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    opening_balance = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    spent_amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    closing_balance = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 class FloorLendBorrow(db.Model, TenantMixin):
     id = db.Column(db.Integer, primary_key=True)
     lender_floor = db.Column(db.Integer, nullable=False, index=True)
@@ -622,3 +750,175 @@ def _add_tenant_filter(execute_state):
                 include_aliases=True
             )
         )
+
+
+# --- dish_usage_stats upkeep -------------------------------------------------
+# Menus, suggestions, votes and feedback are written from many routes, so the
+# counters are adjusted from the flush itself rather than at each call site.
+# Bulk Query.update()/delete() skip this hook; callers that rewrite dish
+# references in bulk (the dish merge) reconcile the affected dishes instead.
+DISH_USAGE_COLUMNS = ('main_menus', 'side_menus', 'menus', 'suggestions', 'votes', 'feedback_count')
+_DISH_USAGE_MODELS = (Menu, Suggestion, SuggestionVote, Feedback)
+
+
+@event.listens_for(Menu.dish_id, 'set', active_history=True)
+@event.listens_for(Menu.side_dish_id, 'set', active_history=True)
+@event.listens_for(Suggestion.dish_id, 'set', active_history=True)
+@event.listens_for(SuggestionVote.suggestion_id, 'set', active_history=True)
+@event.listens_for(Feedback.menu_id, 'set', active_history=True)
+def _load_previous_dish_reference(target, value, oldvalue, initiator):
+    # active_history loads the old value before it is replaced, so the flush
+    # hook can tell which dish a reference moved away from.
+    pass
+
+
+def _value_before_flush(obj, attr):
+    state = inspect(obj)
+    if state.pending:
+        return getattr(obj, attr)
+    history = state.attrs[attr].load_history()
+    if history.deleted:
+        return history.deleted[0]
+    if history.added:
+        return None  # changed from NULL
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(obj, attr)
+
+
+@event.listens_for(db.session, "before_flush")
+def _load_deleted_dish_references(session, flush_context, instances):
+    # Rows are gone by after_flush; load what the hook needs while they exist.
+    for obj in session.deleted:
+        if isinstance(obj, Menu):
+            obj.tenant_id, obj.dish_id, obj.side_dish_id
+        elif isinstance(obj, Suggestion):
+            obj.tenant_id, obj.dish_id
+        elif isinstance(obj, SuggestionVote):
+            obj.tenant_id, obj.suggestion_id
+        elif isinstance(obj, Feedback):
+            obj.tenant_id, obj.menu_id
+
+
+@event.listens_for(db.session, "after_flush")
+def _update_dish_usage_stats(session, flush_context):
+    touched = (
+        [(obj, 1) for obj in session.new if isinstance(obj, _DISH_USAGE_MODELS)]
+        + [(obj, 0) for obj in session.dirty if isinstance(obj, _DISH_USAGE_MODELS)]
+        + [(obj, -1) for obj in session.deleted if isinstance(obj, _DISH_USAGE_MODELS)]
+    )
+    if not touched:
+        return
+
+    connection = session.connection()
+    in_flush = {(type(obj), obj.id): obj for obj, _ in touched}
+    deltas = defaultdict(lambda: defaultdict(int))
+
+    def bump(tenant_id, dish_ids, column, amount):
+        for dish_id in dish_ids:
+            if dish_id is not None and amount:
+                deltas[(tenant_id, dish_id)][column] += amount
+
+    def menu_dishes(menu_id):
+        # Dishes the menu served before this flush; a menu added in this
+        # flush counts with its new dishes.
+        if menu_id is None:
+            return set()
+        menu = in_flush.get((Menu, menu_id))
+        if menu is not None:
+            dishes = {_value_before_flush(menu, 'dish_id'), _value_before_flush(menu, 'side_dish_id')}
+        else:
+            row = connection.execute(select(Menu.dish_id, Menu.side_dish_id).where(Menu.id == menu_id)).first()
+            dishes = set(row) if row else set()
+        dishes.discard(None)
+        return dishes
+
+    def suggestion_dish(suggestion_id):
+        if suggestion_id is None:
+            return set()
+        suggestion = in_flush.get((Suggestion, suggestion_id))
+        if suggestion is not None:
+            dish_id = _value_before_flush(suggestion, 'dish_id')
+        else:
+            dish_id = connection.execute(select(Suggestion.dish_id).where(Suggestion.id == suggestion_id)).scalar()
+        return {dish_id} - {None}
+
+    for obj, sign in touched:
+        tenant_id = obj.tenant_id
+        if isinstance(obj, Menu):
+            if sign:
+                bump(tenant_id, [obj.dish_id], 'main_menus', sign)
+                bump(tenant_id, [obj.side_dish_id], 'side_menus', sign)
+                bump(tenant_id, {obj.dish_id, obj.side_dish_id}, 'menus', sign)
+                continue
+            old_main, old_side = _value_before_flush(obj, 'dish_id'), _value_before_flush(obj, 'side_dish_id')
+            if old_main != obj.dish_id:
+                bump(tenant_id, [old_main], 'main_menus', -1)
+                bump(tenant_id, [obj.dish_id], 'main_menus', 1)
+            if old_side != obj.side_dish_id:
+                bump(tenant_id, [old_side], 'side_menus', -1)
+                bump(tenant_id, [obj.side_dish_id], 'side_menus', 1)
+            old_dishes, new_dishes = {old_main, old_side} - {None}, {obj.dish_id, obj.side_dish_id} - {None}
+            if old_dishes != new_dishes:
+                bump(tenant_id, old_dishes - new_dishes, 'menus', -1)
+                bump(tenant_id, new_dishes - old_dishes, 'menus', 1)
+                feedback = connection.execute(
+                    select(func.count(Feedback.id)).where(Feedback.menu_id == obj.id)
+                ).scalar()
+                bump(tenant_id, old_dishes - new_dishes, 'feedback_count', -feedback)
+                bump(tenant_id, new_dishes - old_dishes, 'feedback_count', feedback)
+        elif isinstance(obj, Suggestion):
+            if sign:
+                bump(tenant_id, [obj.dish_id], 'suggestions', sign)
+                continue
+            old_dish = _value_before_flush(obj, 'dish_id')
+            if old_dish != obj.dish_id:
+                votes = connection.execute(
+                    select(func.count(SuggestionVote.id)).where(SuggestionVote.suggestion_id == obj.id)
+                ).scalar()
+                bump(tenant_id, [old_dish], 'suggestions', -1)
+                bump(tenant_id, [obj.dish_id], 'suggestions', 1)
+                bump(tenant_id, [old_dish], 'votes', -votes)
+                bump(tenant_id, [obj.dish_id], 'votes', votes)
+        elif isinstance(obj, SuggestionVote):
+            if sign:
+                bump(tenant_id, suggestion_dish(_value_before_flush(obj, 'suggestion_id')), 'votes', sign)
+            elif _value_before_flush(obj, 'suggestion_id') != obj.suggestion_id:
+                bump(tenant_id, suggestion_dish(_value_before_flush(obj, 'suggestion_id')), 'votes', -1)
+                bump(tenant_id, suggestion_dish(obj.suggestion_id), 'votes', 1)
+        elif isinstance(obj, Feedback):
+            if sign:
+                bump(tenant_id, menu_dishes(_value_before_flush(obj, 'menu_id')), 'feedback_count', sign)
+            elif _value_before_flush(obj, 'menu_id') != obj.menu_id:
+                bump(tenant_id, menu_dishes(_value_before_flush(obj, 'menu_id')), 'feedback_count', -1)
+                bump(tenant_id, menu_dishes(obj.menu_id), 'feedback_count', 1)
+
+    for (tenant_id, dish_id), changes in deltas.items():
+        changes = {column: amount for column, amount in changes.items() if amount}
+        if changes:
+            apply_dish_usage_delta(connection, tenant_id, dish_id, changes)
+
+
+def apply_dish_usage_delta(connection, tenant_id, dish_id, changes):
+    """Add ``changes`` (``{column: amount}``) to the (dish, tenant) counters."""
+    table = DishUsageStats.__table__
+    tenant_match = table.c.tenant_id.is_(None) if tenant_id is None else table.c.tenant_id == tenant_id
+    result = connection.execute(
+        table.update()
+        .where(table.c.dish_id == dish_id, tenant_match)
+        .values({column: table.c[column] + amount for column, amount in changes.items()})
+    )
+    if result.rowcount:
+        return
+    values = {column: max(changes.get(column, 0), 0) for column in DISH_USAGE_COLUMNS}
+    if tenant_id is not None and connection.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+        # A concurrent first write for the same pair lands in the same row.
+        statement = pg_insert(table).values(dish_id=dish_id, tenant_id=tenant_id, **values)
+        connection.execute(statement.on_conflict_do_update(
+            constraint='uq_dish_usage_stats_dish_tenant',
+            set_={column: table.c[column] + statement.excluded[column] for column in changes},
+        ))
+    else:
+        connection.execute(table.insert().values(dish_id=dish_id, tenant_id=tenant_id, **values))
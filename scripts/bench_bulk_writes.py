@@ -0,0 +1,127 @@
+import sys
+import time
+from pathlib import Path
+import argparse
+
+
+def main() -> int:
+    project_root = Path(__file__).resolve().parents[1]
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare per-row ORM writes with the set-based bulk_writes helpers: "
+            "statements sent to the database and wall time per batch size. "
+            "Runs against DATABASE_URL; every batch is rolled back."
+        )
+    )
+    parser.add_argument("--sizes", default="10,100,1000", help="Comma-separated batch sizes (default: 10,100,1000)")
+    parser.add_argument("--floor", type=int, default=1, help="Floor used for the sample rows (default: 1)")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+
+    from flask import g  # noqa: WPS433
+    from sqlalchemy import event  # noqa: WPS433
+    from app import app, db  # noqa: WPS433
+    from models import ProcurementItem, Tenant  # noqa: WPS433
+    from blueprints.bulk_writes import bulk_delete, bulk_insert, bulk_update  # noqa: WPS433
+    from blueprints.utils import tenant_filter  # noqa: WPS433
+
+    statements = [0]
+
+    def count_statement(*_):
+        statements[0] += 1
+
+    def sample_rows(count):
+        return [
+            {
+                'item_name': f"Bench item {index}",
+                'quantity': '1',
+                'category': 'other',
+                'status': 'completed',
+                'floor': args.floor,
+            }
+            for index in range(count)
+        ]
+
+    def legacy_insert(rows):
+        items = [ProcurementItem(**row, tenant_id=g.tenant_id) for row in rows]
+        for item in items:
+            db.session.add(item)
+        db.session.flush()
+        return [item.id for item in items]
+
+    def legacy_update(ids):
+        for item_id in ids:
+            item = tenant_filter(ProcurementItem.query).filter_by(id=item_id).first()
+            if item and item.floor == args.floor:
+                item.actual_cost = 12.5
+        db.session.flush()
+
+    def legacy_delete(ids):
+        for item in tenant_filter(ProcurementItem.query).filter(ProcurementItem.id.in_(ids)).all():
+            db.session.delete(item)
+        db.session.flush()
+
+    def bulk_insert_ids(rows):
+        return [item_id for item_id, in bulk_insert(ProcurementItem, rows)]
+
+    def bulk_update_ids(ids):
+        bulk_update(
+            ProcurementItem,
+            [{'id': item_id, 'actual_cost': 12.5} for item_id in ids],
+            where=[ProcurementItem.floor == args.floor],
+        )
+
+    def bulk_delete_ids(ids):
+        bulk_delete(ProcurementItem, ProcurementItem.id.in_(ids))
+
+    def measure(step, *step_args):
+        statements[0] = 0
+        started = time.perf_counter()
+        result = step(*step_args)
+        return result, statements[0], time.perf_counter() - started
+
+    strategies = {
+        'per-row ORM': (legacy_insert, legacy_update, legacy_delete),
+        'bulk_writes': (bulk_insert_ids, bulk_update_ids, bulk_delete_ids),
+    }
+
+    with app.test_request_context():
+        engine = db.engine
+        if engine.dialect.name == 'sqlite':
+            db.create_all()
+        event.listen(engine, "before_cursor_execute", count_statement)
+        try:
+            print(f"database: {engine.dialect.name}")
+            print(f"{'strategy':<12} {'rows':>6} | {'insert':>16} | {'update':>16} | {'delete':>16}")
+            for size in sizes:
+                for name, (insert_step, update_step, delete_step) in strategies.items():
+                    tenant = Tenant(name="Bulk write benchmark")
+                    db.session.add(tenant)
+                    db.session.flush()
+                    g.tenant_id = tenant.id
+                    db.session.expunge_all()
+
+                    ids, insert_count, insert_time = measure(insert_step, sample_rows(size))
+                    db.session.expunge_all()
+                    _, update_count, update_time = measure(update_step, ids)
+                    db.session.expunge_all()
+                    _, delete_count, delete_time = measure(delete_step, ids)
+                    db.session.rollback()
+
+                    print(
+                        f"{name:<12} {size:>6} | "
+                        f"{insert_count:>4} stmt {insert_time * 1000:>6.1f}ms | "
+                        f"{update_count:>4} stmt {update_time * 1000:>6.1f}ms | "
+                        f"{delete_count:>4} stmt {delete_time * 1000:>6.1f}ms"
+                    )
+        finally:
+            event.remove(engine, "before_cursor_execute", count_statement)
+            db.session.rollback()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
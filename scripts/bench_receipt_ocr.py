@@ -0,0 +1,190 @@
+import argparse
+import difflib
+import io
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+
+RECEIPT_ITEMS = [
+    ("TOOR DAL 1KG", 145.00),
+    ("BASMATI RICE 5KG", 589.00),
+    ("SUNFLOWER OIL 1L", 162.00),
+    ("AMUL BUTTER 500G", 275.00),
+    ("TATA SALT 1KG", 28.00),
+    ("MAGGI NOODLES 12P", 168.00),
+    ("BRU COFFEE 200G", 310.00),
+    ("SUGAR 2KG", 96.00),
+]
+
+
+def _synthetic_receipt(seed):
+    rng = random.Random(seed)
+    items = rng.sample(RECEIPT_ITEMS, k=rng.randint(3, 6))
+    order_no = f"{rng.randint(10000000, 99999999)}"
+    day, month = rng.randint(1, 28), rng.randint(1, 12)
+    lines = [
+        "AVENUE E-COMMERCE LIMITED",
+        "TAX INVOICE",
+        f"ORDER NUMBER: {order_no}",
+        f"INVOICE DATE: {day:02d}/{month:02d}/26",
+        "",
+    ]
+    total = 0.0
+    for name, price in items:
+        qty = rng.randint(1, 3)
+        value = price * qty
+        total += value
+        lines.append(f"{rng.randint(10 ** 9, 10 ** 10 - 1)} {name} {qty} {price:.2f} {value:.2f}")
+    lines += ["", f"Amount {total:.2f}"]
+    expected = {
+        "bill_no": order_no,
+        "bill_date": f"2026-{month:02d}-{day:02d}",
+        "total_amount": round(total, 2),
+    }
+    return "\n".join(lines), expected
+
+
+def _render(text, variant):
+    from PIL import Image, ImageDraw, ImageFont  # noqa: WPS433
+
+    try:
+        font = ImageFont.truetype("DejaVuSansMono.ttf", 22)
+    except OSError:
+        font = ImageFont.load_default()
+
+    lines = text.splitlines()
+    width, line_height = 900, 34
+    paper = Image.new("L", (width, line_height * (len(lines) + 2)), 255)
+    draw = ImageDraw.Draw(paper)
+    for index, line in enumerate(lines):
+        draw.text((30, line_height * (index + 1)), line, fill=0, font=font)
+
+    if variant == "clean_scan":
+        return paper
+    if variant == "small_screenshot":
+        return paper.resize((450, paper.height // 2))
+    if variant == "skewed":
+        return paper.rotate(-4, expand=True, fillcolor=255)
+    if variant == "phone_photo_12mp":
+        # Receipt on a darker table, slightly rotated, shot at 12 MP.
+        canvas = Image.new("L", (3000, 4000), 110)
+        photo = paper.resize((paper.width * 2, paper.height * 2)).rotate(3, expand=True, fillcolor=110)
+        canvas.paste(photo, ((canvas.width - photo.width) // 2, (canvas.height - photo.height) // 2))
+        return canvas
+    raise ValueError(f"Unknown variant: {variant}")
+
+
+def _legacy_extract_text(image):
+    """The pre-adaptive pipeline: grayscale, contrast, upscale narrow images, psm 3 then psm 6."""
+    import pytesseract  # noqa: WPS433
+    from PIL import Image, ImageEnhance, ImageOps  # noqa: WPS433
+
+    image = ImageOps.grayscale(image)
+    image = ImageEnhance.Contrast(image).enhance(1.8)
+    if image.width < 1500:
+        scale = 2000 / image.width
+        image = image.resize((int(image.width * scale), int(image.height * scale)), Image.Resampling.LANCZOS)
+    text = pytesseract.image_to_string(image, config="--psm 3")
+    if len(text.strip()) < 20:
+        text = pytesseract.image_to_string(image, config="--psm 6")
+    return text
+
+
+def _load_corpus(corpus_dir):
+    """Real receipts: ``name.jpg``/``name.png`` next to ``name.json`` holding the expected fields."""
+    from PIL import Image  # noqa: WPS433
+
+    samples = []
+    for expected_path in sorted(Path(corpus_dir).glob("*.json")):
+        for suffix in (".jpg", ".jpeg", ".png"):
+            image_path = expected_path.with_suffix(suffix)
+            if image_path.exists():
+                expected = json.loads(expected_path.read_text())
+                samples.append((image_path.name, Image.open(image_path), expected.pop("text", None), expected))
+                break
+    return samples
+
+
+def _field_accuracy(parsed, expected):
+    checks = []
+    for field, value in expected.items():
+        got = parsed.get(field)
+        if isinstance(value, float):
+            checks.append(got is not None and abs(float(got) - value) < 0.01)
+        else:
+            checks.append(str(got) == str(value))
+    return sum(checks) / len(checks) if checks else None
+
+
+def _png_bytes(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    buffer.seek(0)
+    return buffer
+
+
+def main() -> int:
+    project_root = Path(__file__).resolve().parents[1]
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+
+    parser = argparse.ArgumentParser(
+        description="Compare wall time and parse accuracy of the legacy and adaptive receipt OCR pipelines."
+    )
+    parser.add_argument("--receipts", type=int, default=4, help="Synthetic receipts per variant (default: 4)")
+    parser.add_argument("--corpus", help="Directory of real receipt images with matching .json expectations")
+    args = parser.parse_args()
+
+    from blueprints.finance.services.ocr_service import OCRService  # noqa: WPS433
+    from blueprints.finance.services.parser_factory import ParserFactory  # noqa: WPS433
+
+    samples = []
+    for variant in ("clean_scan", "small_screenshot", "skewed", "phone_photo_12mp"):
+        for seed in range(args.receipts):
+            text, expected = _synthetic_receipt(seed)
+            samples.append((f"{variant}#{seed}", _render(text, variant), text, expected))
+    if args.corpus:
+        samples += _load_corpus(args.corpus)
+
+    pipelines = {
+        "legacy": _legacy_extract_text,
+        "adaptive": lambda image: OCRService.extract_text(_png_bytes(image)),
+    }
+    print(f"{'sample':<24} {'pipeline':<9} {'seconds':>8} {'fields':>7} {'text':>6}")
+    totals = {name: {"seconds": 0.0, "fields": [], "text": []} for name in pipelines}
+    for name, image, truth_text, expected in samples:
+        for pipeline, extract in pipelines.items():
+            started = time.perf_counter()
+            text = extract(image.copy())
+            elapsed = time.perf_counter() - started
+            parsed = ParserFactory.get_parser(text).parse(text).to_dict() if text else {}
+            fields = _field_accuracy(parsed, expected)
+            similarity = difflib.SequenceMatcher(None, truth_text, text).ratio() if truth_text else None
+
+            totals[pipeline]["seconds"] += elapsed
+            if fields is not None:
+                totals[pipeline]["fields"].append(fields)
+            if similarity is not None:
+                totals[pipeline]["text"].append(similarity)
+            print(
+                f"{name:<24} {pipeline:<9} {elapsed:>8.2f} "
+                f"{'-' if fields is None else f'{fields:.0%}':>7} "
+                f"{'-' if similarity is None else f'{similarity:.0%}':>6}"
+            )
+
+    print()
+    for pipeline, total in totals.items():
+        fields = sum(total["fields"]) / len(total["fields"]) if total["fields"] else 0
+        text = sum(total["text"]) / len(total["text"]) if total["text"] else 0
+        print(
+            f"{pipeline:<9} total {total['seconds']:.2f}s over {len(samples)} receipts, "
+            f"field accuracy {fields:.0%}, text similarity {text:.0%}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,83 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+
+CORPUS_DIR = Path(__file__).resolve().parent / "receipt_corpus"
+GOLDEN_PATH = CORPUS_DIR / "golden.json"
+
+
+def _parse_corpus(ParserFactory, corpus):
+    results = {}
+    for name, text in corpus.items():
+        parser = ParserFactory.get_parser(text)
+        results[name] = {"parser": parser.__class__.__name__, "data": parser.parse(text).to_dict()}
+    return results
+
+
+def main() -> int:
+    project_root = Path(__file__).resolve().parents[1]
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+
+    parser = argparse.ArgumentParser(
+        description="Check receipt parsers against golden output and measure parse throughput."
+    )
+    parser.add_argument("--corpus", default=str(CORPUS_DIR), help="Directory of receipt .txt files")
+    parser.add_argument("--golden", default=str(GOLDEN_PATH), help="Golden output JSON")
+    parser.add_argument("--iterations", type=int, default=200, help="Benchmark passes over the corpus (default: 200)")
+    parser.add_argument("--update-golden", action="store_true", help="Rewrite the golden file from current output")
+    args = parser.parse_args()
+
+    from blueprints.finance.services.parser_factory import ParserFactory  # noqa: WPS433
+
+    corpus = {path.name: path.read_text(encoding="utf-8") for path in sorted(Path(args.corpus).glob("*.txt"))}
+    if not corpus:
+        print(f"No .txt receipts found in {args.corpus}")
+        return 1
+
+    results = _parse_corpus(ParserFactory, corpus)
+    golden_path = Path(args.golden)
+    if args.update_golden:
+        golden_path.write_text(json.dumps(results, indent=2, sort_keys=True, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"Wrote golden output for {len(results)} receipts to {golden_path}")
+        return 0
+
+    golden = json.loads(golden_path.read_text(encoding="utf-8")) if golden_path.exists() else {}
+    mismatches = [name for name in results if name in golden and results[name] != golden[name]]
+    missing = [name for name in results if name not in golden]
+    for name in mismatches:
+        print(f"MISMATCH {name}")
+        print(f"  expected: {json.dumps(golden[name], sort_keys=True, ensure_ascii=False)}")
+        print(f"  actual:   {json.dumps(results[name], sort_keys=True, ensure_ascii=False)}")
+    for name in missing:
+        print(f"NO GOLDEN {name} (run with --update-golden)")
+
+    total_chars = sum(len(text) for text in corpus.values())
+    texts = list(corpus.values())
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        for text in texts:
+            ParserFactory.get_parser(text)
+    select_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        for text in texts:
+            ParserFactory.get_parser(text).parse(text)
+    full_elapsed = time.perf_counter() - started
+
+    receipts = args.iterations * len(texts)
+    print(f"Golden: {len(results) - len(mismatches) - len(missing)}/{len(results)} receipts match")
+    print(f"Parser selection: {receipts / select_elapsed:,.0f} receipts/s")
+    print(
+        f"Select + parse:   {receipts / full_elapsed:,.0f} receipts/s "
+        f"({args.iterations * total_chars / full_elapsed / 1e6:.2f} MB/s of text)"
+    )
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,62 @@
+import sys
+import time
+from pathlib import Path
+import argparse
+
+
+def main() -> int:
+    project_root = Path(__file__).resolve().parents[1]
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+
+    parser = argparse.ArgumentParser(
+        description="Compare per-message VAPID signing against the per-origin header cache (no network)."
+    )
+    parser.add_argument("--subscriptions", type=int, default=500, help="Number of subscriptions (default: 500)")
+    args = parser.parse_args()
+
+    from py_vapid import Vapid02 as Vapid  # noqa: WPS433
+    from py_vapid.utils import b64urlencode  # noqa: WPS433
+    from blueprints.vapid_cache import DEFAULT_VAPID_SUBJECT, VapidHeaderCache, endpoint_origin  # noqa: WPS433
+
+    key = Vapid()
+    key.generate_keys()
+    raw_private = key.private_key.private_numbers().private_value.to_bytes(32, "big")
+    private_key = b64urlencode(raw_private)
+
+    # Spread subscriptions over the push services a floor usually mixes.
+    services = [
+        "https://fcm.googleapis.com/fcm/send/",
+        "https://updates.push.services.mozilla.com/wpush/v2/",
+        "https://web.push.apple.com/",
+    ]
+    endpoints = [f"{services[i % len(services)]}{i:06d}" for i in range(args.subscriptions)]
+
+    started = time.perf_counter()
+    for endpoint in endpoints:
+        # What pywebpush.webpush(vapid_private_key=..., vapid_claims=...) does per call.
+        signer = Vapid.from_string(private_key=private_key)
+        signer.sign({
+            "sub": DEFAULT_VAPID_SUBJECT,
+            "aud": endpoint_origin(endpoint),
+            "exp": int(time.time()) + 12 * 60 * 60,
+        })
+    uncached = time.perf_counter() - started
+
+    cache = VapidHeaderCache()
+    started = time.perf_counter()
+    for endpoint in endpoints:
+        cache.headers_for(endpoint, private_key)
+    cached = time.perf_counter() - started
+
+    print(f"subscriptions: {args.subscriptions}")
+    print(f"per-message signing: {uncached * 1000:.1f} ms ({uncached / args.subscriptions * 1e6:.0f} us/sub)")
+    print(f"cached headers:      {cached * 1000:.1f} ms ({cached / args.subscriptions * 1e6:.0f} us/sub)")
+    print(f"signatures: {cache.misses} (hits: {cache.hits})")
+    if cached:
+        print(f"speedup: {uncached / cached:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,485 @@
+import sys
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+import argparse
+
+
+def _legacy_ledger_builder():
+    """
+    The per-period ledger as it was before the set-based rewrite (several
+    queries per period), kept verbatim as the reference implementation.
+    """
+    from flask import g  # noqa: WPS433
+    from sqlalchemy import func  # noqa: WPS433
+    from sqlalchemy.orm import joinedload  # noqa: WPS433
+    from app import db  # noqa: WPS433
+    from models import (  # noqa: WPS433
+        Bill,
+        Budget,
+        Expense,
+        ExpensePrintReport,
+        ExpensePrintReportBill,
+        FacultyBudgetCycle,
+        FacultyReportSubmission,
+    )
+    from blueprints.budgeting import (  # noqa: WPS433
+        _coerce_float,
+        _make_period_from_budget,
+        _make_synthetic_active_cycle_period,
+        _tenant_scoped_query,
+    )
+    from blueprints.utils import visible_budget_condition  # noqa: WPS433
+
+    def _sum_period_bills(floor, start_date, end_date=None, cycle_id=None, tenant_id=None, faculty_workflow_enabled=False, is_current=False):
+        if faculty_workflow_enabled:
+            submission_id = None
+            target_cycle_id = cycle_id
+
+            if not target_cycle_id and is_current:
+                active_cycle = _tenant_scoped_query(FacultyBudgetCycle.query, tenant_id).filter_by(status='active').first()
+                if active_cycle:
+                    target_cycle_id = active_cycle.id
+
+            if target_cycle_id:
+                sub = _tenant_scoped_query(FacultyReportSubmission.query, tenant_id).filter_by(
+                    cycle_id=target_cycle_id,
+                    floor=floor
+                ).first()
+                if sub and sub.status in ['submitted', 'verified']:
+                    submission_id = sub.id
+
+            if submission_id:
+                # Submitted to Faculty: count bills linked to submission
+                query = _tenant_scoped_query(db.session.query(func.sum(Bill.total_amount)), tenant_id).filter(
+                    Bill.floor == floor,
+                    Bill.report_submission_id == submission_id
+                )
+                return _coerce_float(query.scalar())
+            else:
+                # Active / unsubmitted cycle in Faculty Mode:
+                # Spent amount is strictly synced to the floor's latest compiled Print Report!
+
+                print_report = None
+                if target_cycle_id:
+                    print_report = _tenant_scoped_query(ExpensePrintReport.query, tenant_id).filter_by(
+                        cycle_id=target_cycle_id,
+                        floor=floor
+                    ).order_by(ExpensePrintReport.created_at.desc()).first()
+
+                if not print_report:
+                    print_report = _tenant_scoped_query(ExpensePrintReport.query, tenant_id).filter_by(
+                        floor=floor
+                    ).order_by(ExpensePrintReport.created_at.desc()).first()
+
+                if print_report:
+                    linked_sum = _tenant_scoped_query(
+                        db.session.query(func.sum(Bill.total_amount))
+                        .join(ExpensePrintReportBill, ExpensePrintReportBill.bill_id == Bill.id),
+                        tenant_id
+                    ).filter(ExpensePrintReportBill.print_report_id == print_report.id).scalar()
+
+                    if linked_sum is not None:
+                        return _coerce_float(linked_sum)
+                    return float(print_report.total_spent or 0.0)
+
+                return 0.0
+        else:
+            # Non-faculty tenant: count unlinked bills in this period's date range
+            query = _tenant_scoped_query(db.session.query(func.sum(Bill.total_amount)), tenant_id).filter(
+                Bill.floor == floor,
+                Bill.report_submission_id.is_(None),
+                Bill.bill_date >= start_date
+            )
+            if end_date is not None:
+                query = query.filter(Bill.bill_date <= end_date)
+            return _coerce_float(query.scalar())
+
+
+    def _sum_period_legacy_expenses(floor, start_date, end_date=None, tenant_id=None):
+        query = _tenant_scoped_query(db.session.query(func.sum(Expense.amount)), tenant_id).filter(
+            Expense.floor == floor,
+            Expense.date >= start_date,
+        )
+        if end_date is not None:
+            query = query.filter(Expense.date <= end_date)
+        return _coerce_float(query.scalar())
+
+    def build_floor_budget_ledger(floor, tenant_id=None, faculty_workflow_enabled=True):
+        budgets = (
+            _tenant_scoped_query(Budget.query.options(joinedload(Budget.cycle)), tenant_id)
+            .filter(Budget.floor == floor, visible_budget_condition(True))
+            .order_by(Budget.start_date.asc(), Budget.created_at.asc(), Budget.id.asc())
+            .all()
+        )
+        periods = [_make_period_from_budget(budget) for budget in budgets]
+
+        active_cycle = None
+        active_cycle_allocation = None
+        if faculty_workflow_enabled:
+            active_cycle = (
+                _tenant_scoped_query(FacultyBudgetCycle.query, tenant_id)
+                .filter_by(status='active')
+                .order_by(FacultyBudgetCycle.start_date.desc(), FacultyBudgetCycle.created_at.desc())
+                .first()
+            )
+            if active_cycle:
+                active_cycle_allocation = next(
+                    (period for period in periods if period['cycle_id'] == active_cycle.id),
+                    None,
+                )
+                if not active_cycle_allocation:
+                    periods.append(_make_synthetic_active_cycle_period(active_cycle))
+
+        periods.sort(key=lambda row: (row['start_date'], row['created_at'], row['source_type'], row['source_id'] or 0))
+
+        running_balance = 0.0
+        for idx, period in enumerate(periods):
+            next_start = periods[idx + 1]['start_date'] if idx + 1 < len(periods) else None
+            if faculty_workflow_enabled:
+                # For Faculty cycle floors, remove date gaps so that all expenses
+                # recorded in between cycles are correctly carry-forwarded.
+                if next_start:
+                    effective_end = next_start - timedelta(days=1)
+                else:
+                    effective_end = None
+            else:
+                effective_end = period['end_date']
+                if effective_end is None and next_start and next_start > period['start_date']:
+                    effective_end = next_start - timedelta(days=1)
+                if effective_end and effective_end < period['start_date']:
+                    effective_end = period['start_date']
+
+            is_current_period = False
+            if faculty_workflow_enabled:
+                if active_cycle:
+                    is_current_period = (period['cycle_id'] == active_cycle.id)
+                else:
+                    is_current_period = (idx == len(periods) - 1)
+
+            spent_amount = _sum_period_bills(
+                floor=floor,
+                start_date=period['start_date'],
+                end_date=effective_end,
+                cycle_id=period['cycle_id'],
+                tenant_id=tenant_id,
+                faculty_workflow_enabled=faculty_workflow_enabled,
+                is_current=is_current_period
+            )
+            if not (faculty_workflow_enabled and (period['cycle_id'] or is_current_period)):
+                spent_amount += _sum_period_legacy_expenses(floor, period['start_date'], effective_end, tenant_id=tenant_id)
+
+            opening_balance = running_balance
+            available_budget = opening_balance + period['allocated_amount']
+            closing_balance = available_budget - spent_amount
+
+            period['effective_end_date'] = effective_end
+            period['opening_balance'] = opening_balance
+            period['available_budget'] = available_budget
+            period['spent_amount'] = spent_amount
+            period['closing_balance'] = closing_balance
+            period['is_current'] = False
+
+            running_balance = closing_balance
+
+        current_period = None
+        if active_cycle:
+            current_period = next((period for period in periods if period['cycle_id'] == active_cycle.id), None)
+
+        if not current_period and periods:
+            latest_period = periods[-1]
+            if faculty_workflow_enabled:
+                # For Faculty-active floors, if there is no active cycle,
+                # fall back to the latest period so they can see real-time updates.
+                current_period = latest_period
+            else:
+                # For non-faculty tenants, keep the original behavior.
+                current_period = latest_period if latest_period['source_type'] == 'manual' else None
+
+        if current_period:
+            current_period['is_current'] = True
+
+        latest_closing_balance = periods[-1]['closing_balance'] if periods else 0.0
+        carryforward_balance = current_period['closing_balance'] if current_period else latest_closing_balance
+
+        return {
+            'active_cycle': active_cycle,
+            'active_cycle_allocation': active_cycle_allocation,
+            'current_period': current_period,
+            'periods': list(reversed(periods)),
+            'current_allocated_amount': current_period['allocated_amount'] if current_period else 0.0,
+            'current_available_budget': current_period['available_budget'] if current_period else carryforward_balance,
+            'current_spent_amount': current_period['spent_amount'] if current_period else 0.0,
+            'current_remaining_balance': current_period['closing_balance'] if current_period else carryforward_balance,
+            'carryforward_balance': carryforward_balance,
+            'has_period_history': bool(periods),
+            'today': date.today(),
+        }
+
+    return build_floor_budget_ledger
+
+
+def _money(rng, low=50, high=5000):
+    return Decimal(rng.randint(low * 100, high * 100)) / 100
+
+
+def _build_scenario(rng, db, models, floor, faculty_enabled):
+    """One tenant with a random mix of budgets, cycles, bills, expenses and reports."""
+    tenant = models.Tenant(name="Ledger regression", faculty_workflow_enabled=faculty_enabled)
+    db.session.add(tenant)
+    db.session.flush()
+    tenant_id = tenant.id
+
+    user = models.User(
+        email=f"ledger-{tenant_id}@example.invalid",
+        role='pantryHead',
+        floor=floor,
+        tenant_id=tenant_id,
+    )
+    db.session.add(user)
+    db.session.flush()
+
+    origin = date(2024, 1, 1) + timedelta(days=rng.randint(0, 60))
+    created = datetime(2024, 1, 1)
+
+    def next_created():
+        nonlocal created
+        # Strictly increasing: the reference orders print reports by
+        # created_at alone, so ties would make its pick arbitrary.
+        created += timedelta(minutes=rng.randint(1, 3))
+        return created
+
+    cycles = []
+    cursor = origin
+    for index in range(rng.randint(0, 8)):
+        length = rng.choice([7, 14, 15, 30])
+        cycle = models.FacultyBudgetCycle(
+            title=f"Cycle {index + 1}",
+            start_date=cursor,
+            end_date=cursor + timedelta(days=length - 1),
+            submission_deadline=cursor + timedelta(days=length + 3),
+            status=rng.choice(['draft', 'closed', 'closed', 'active']),
+            created_by_id=user.id,
+            created_at=next_created(),
+            tenant_id=tenant_id,
+        )
+        db.session.add(cycle)
+        cycles.append(cycle)
+        cursor += timedelta(days=length + rng.choice([0, 0, 3, -2]))
+    db.session.flush()
+
+    for cycle in cycles:
+        if rng.random() < 0.8:
+            db.session.add(models.Budget(
+                floor=floor,
+                cycle_id=cycle.id,
+                amount_allocated=_money(rng, 500, 9000),
+                allocation_type='faculty',
+                start_date=cycle.start_date,
+                is_faculty_allocation=True,
+                created_at=next_created(),
+                tenant_id=tenant_id,
+            ))
+
+    manual_cursor = origin - timedelta(days=rng.randint(0, 30))
+    for _ in range(rng.randint(0, 20)):
+        allocation_type = rng.choice(['weekly', 'monthly', '15days', 'manual'])
+        length = {'weekly': 7, 'monthly': 30, '15days': 15, 'manual': rng.randint(1, 40)}[allocation_type]
+        end_date = manual_cursor + timedelta(days=length - 1) if rng.random() < 0.6 else None
+        db.session.add(models.Budget(
+            floor=floor,
+            amount_allocated=_money(rng, 100, 6000),
+            allocation_type=allocation_type,
+            start_date=manual_cursor,
+            end_date=end_date,
+            created_at=next_created(),
+            tenant_id=tenant_id,
+        ))
+        manual_cursor += timedelta(days=rng.choice([length, length, length - 3, length + 5, 0]))
+    db.session.flush()
+
+    submissions = []
+    for cycle in cycles:
+        if rng.random() < 0.6:
+            submission = models.FacultyReportSubmission(
+                cycle_id=cycle.id,
+                floor=floor,
+                uploaded_by_id=user.id,
+                report_title=f"{cycle.title} report",
+                status=rng.choice(['submitted', 'verified', 'rejected', 'draft']),
+                stored_filename=f"{cycle.id}.pdf",
+                original_filename=f"{cycle.id}.pdf",
+                storage_path=f"submissions/{cycle.id}.pdf",
+                tenant_id=tenant_id,
+            )
+            db.session.add(submission)
+            submissions.append(submission)
+    db.session.flush()
+
+    span_end = max(cursor, manual_cursor) + timedelta(days=20)
+    bills = []
+    for index in range(rng.randint(0, 120)):
+        bill_date = origin - timedelta(days=40) + timedelta(days=rng.randint(0, (span_end - origin).days + 40))
+        submission = rng.choice(submissions) if submissions and rng.random() < 0.3 else None
+        bill = models.Bill(
+            bill_no=f"B{index}",
+            bill_date=bill_date,
+            floor=rng.choice([floor, floor, floor, floor + 1]),
+            total_amount=_money(rng, 1, 900),
+            report_submission_id=submission.id if submission else None,
+            tenant_id=tenant_id,
+        )
+        db.session.add(bill)
+        bills.append(bill)
+    db.session.flush()
+
+    for index in range(rng.randint(0, 12)):
+        cycle = rng.choice(cycles) if cycles and rng.random() < 0.8 else None
+        report = models.ExpensePrintReport(
+            cycle_id=cycle.id if cycle else None,
+            floor=floor,
+            report_title=f"Print {index}",
+            total_spent=_money(rng, 0, 4000),
+            created_by_id=user.id,
+            created_at=next_created(),
+            tenant_id=tenant_id,
+        )
+        db.session.add(report)
+        db.session.flush()
+        for bill in rng.sample(bills, k=min(len(bills), rng.randint(0, 10))):
+            db.session.add(models.ExpensePrintReportBill(print_report_id=report.id, bill_id=bill.id, tenant_id=tenant_id))
+
+    for index in range(rng.randint(0, 40)):
+        db.session.add(models.Expense(
+            description=f"Expense {index}",
+            amount=round(rng.uniform(1, 500), 2),
+            category='other',
+            date=origin - timedelta(days=20) + timedelta(days=rng.randint(0, (span_end - origin).days + 20)),
+            floor=rng.choice([floor, floor, floor + 1]),
+            tenant_id=tenant_id,
+        ))
+    db.session.flush()
+    return tenant_id
+
+
+def _comparable(value, places=6):
+    if isinstance(value, dict):
+        return {key: _comparable(item, places) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_comparable(item, places) for item in value]
+    if isinstance(value, float):
+        # Expense.amount is a Float column: sums may differ in the last bits
+        # depending on the order the database adds them in.
+        return round(value, places)
+    if hasattr(value, '__table__'):
+        return (type(value).__name__, value.id)
+    return value
+
+
+def _first_difference(expected, actual, path="ledger"):
+    if type(expected) is not type(actual):
+        return f"{path}: {expected!r} != {actual!r}"
+    if isinstance(expected, dict):
+        for key in sorted(set(expected) | set(actual), key=str):
+            if key not in expected or key not in actual:
+                return f"{path}.{key}: missing on one side"
+            diff = _first_difference(expected[key], actual[key], f"{path}.{key}")
+            if diff:
+                return diff
+        return None
+    if isinstance(expected, list):
+        if len(expected) != len(actual):
+            return f"{path}: {len(expected)} entries != {len(actual)}"
+        for index, (left, right) in enumerate(zip(expected, actual)):
+            diff = _first_difference(left, right, f"{path}[{index}]")
+            if diff:
+                return diff
+        return None
+    return None if expected == actual else f"{path}: {expected!r} != {actual!r}"
+
+
+def main() -> int:
+    project_root = Path(__file__).resolve().parents[1]
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Regression check: the set-based build_floor_budget_ledger must match the "
+            "per-period reference on randomized ledgers. Runs against DATABASE_URL; "
+            "every scenario is rolled back."
+        )
+    )
+    parser.add_argument("--scenarios", type=int, default=200, help="Randomized ledgers to compare (default: 200)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first scenario (default: 0)")
+    parser.add_argument(
+        "--with-snapshots",
+        action="store_true",
+        help="Freeze settled periods first, so the ledger is rebuilt from budget_period_snapshot",
+    )
+    args = parser.parse_args()
+
+    from flask import g  # noqa: WPS433
+    from sqlalchemy import event  # noqa: WPS433
+    from app import app, db  # noqa: WPS433
+    import models  # noqa: WPS433
+    from blueprints.budgeting import build_floor_budget_ledger, freeze_settled_budget_periods  # noqa: WPS433
+
+    legacy_build = _legacy_ledger_builder()
+    statements = [0]
+
+    def count_statement(*_):
+        statements[0] += 1
+
+    # Snapshots store amounts rounded to cents.
+    places = 2 if args.with_snapshots else 6
+    failures = frozen = 0
+    legacy_queries = new_queries = 0
+    with app.test_request_context():
+        engine = db.engine
+        if engine.dialect.name == 'sqlite':
+            db.create_all()
+        event.listen(engine, "before_cursor_execute", count_statement)
+        try:
+            for seed in range(args.seed, args.seed + args.scenarios):
+                rng = random.Random(seed)
+                floor = rng.randint(1, 11)
+                faculty_enabled = rng.random() < 0.6
+                tenant_id = _build_scenario(rng, db, models, floor, faculty_enabled)
+                g.tenant_id = tenant_id
+
+                statements[0] = 0
+                expected = legacy_build(floor=floor, faculty_workflow_enabled=faculty_enabled)
+                legacy_queries += statements[0]
+                if args.with_snapshots:
+                    frozen += freeze_settled_budget_periods(floor=floor, faculty_workflow_enabled=faculty_enabled)
+                    db.session.expunge_all()
+                statements[0] = 0
+                actual = build_floor_budget_ledger(floor=floor, faculty_workflow_enabled=faculty_enabled)
+                new_queries += statements[0]
+
+                diff = _first_difference(_comparable(expected, places), _comparable(actual, places))
+                if diff:
+                    failures += 1
+                    print(f"seed {seed} (faculty={faculty_enabled}): {diff}")
+                db.session.rollback()
+                db.session.expunge_all()
+                g.tenant_id = None
+        finally:
+            event.remove(engine, "before_cursor_execute", count_statement)
+            db.session.rollback()
+
+    print(f"scenarios: {args.scenarios}, mismatches: {failures}")
+    if args.with_snapshots:
+        print(f"periods frozen: {frozen}")
+    if args.scenarios:
+        print(
+            f"queries per ledger: reference {legacy_queries / args.scenarios:.1f}, "
+            f"set-based {new_queries / args.scenarios:.1f}"
+        )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())